@@ -0,0 +1,406 @@
+import argparse
+import bz2
+import json
+import random
+import socketserver
+import struct
+import threading
+import uuid
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the StarRocks Stream Load HTTP API: the FE port answers
+# PUT /api/<db>/<table>/_stream_load with a 307 to the BE port before reading
+# the body (as the real FE does for "Expect: 100-continue"), the BE port
+# accepts the body (Content-Length or chunked) and replies with Stream Load JSON.
+# Several FE and BE ports can share one State: every FE redirects to the BEs
+# in turn, and SHOW BACKENDS on the query port lists the BE HTTP ports.
+
+# Saturation model: the BE absorbs at most capacity_mb MB/s shared evenly by
+# the loads in flight, adds latency_ms per load (plan/commit/publish), and
+# rejects loads with a memory error while more than max_inflight are running.
+class State:
+    def __init__(self, fail_rate: float = 0.0, capacity_mb: float = 0.0, latency_ms: int = 0, max_inflight: int = 0):
+        self.lock = threading.Lock()
+        self.txn = 0
+        self.requests = 0
+        self.bytes = 0
+        self.labels = set()
+        self.fail_rate = fail_rate
+        self.capacity = capacity_mb * 1024 * 1024
+        self.latency_ms = latency_ms
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.query_ms = 0
+        self.connections = 0
+        self.query_slots = None
+        self.running = {}
+        self.queries = 0
+        self.profiles = []
+        self.backends = []
+        self.next_be = 0
+        self.port_requests = {}
+        self.port_bytes = {}
+
+def decompressor(compression: str):
+    if compression == "gzip":
+        return zlib.decompressobj(47)
+    if compression == "bzip2":
+        return bz2.BZ2Decompressor()
+    if compression == "lz4_frame":
+        import lz4.frame
+        return lz4.frame.LZ4FrameDecompressor()
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+def read_body(handler: BaseHTTPRequestHandler):
+    rows = 0
+    size = 0
+    tail = b""
+    d = decompressor(handler.headers.get("compression", "").lower())
+    if handler.headers.get("Transfer-Encoding", "").lower() == "chunked":
+        while True:
+            n = int(handler.rfile.readline().split(b";")[0].strip(), 16)
+            if n == 0:
+                while handler.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            data = handler.rfile.read(n)
+            handler.rfile.readline()
+            if d is not None:
+                data = d.decompress(data)
+            rows += data.count(b"\n")
+            size += len(data)
+            tail = data[-1:] or tail
+    else:
+        left = int(handler.headers.get("Content-Length") or 0)
+        while left > 0:
+            data = handler.rfile.read(min(left, 1 << 20))
+            if not data:
+                break
+            left -= len(data)
+            if d is not None:
+                data = d.decompress(data)
+            rows += data.count(b"\n")
+            size += len(data)
+            tail = data[-1:] or tail
+    if size and tail != b"\n":
+        rows += 1
+    return rows, size
+
+def make_fe_handler(state: State):
+    class FEHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def handle_expect_100(self):
+            # Redirect without inviting the body.
+            return True
+
+        def do_PUT(self):
+            port = self.server.server_address[1]
+            with state.lock:
+                state.requests += 1
+                state.port_requests[port] = state.port_requests.get(port, 0) + 1
+                be_port = state.backends[state.next_be % len(state.backends)][1]
+                state.next_be += 1
+            host = self.headers.get("Host", "127.0.0.1").split(":")[0]
+            self.send_response(307)
+            self.send_header("Location", f"http://{host}:{be_port}{self.path}")
+            self.send_header("Content-Length", "0")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+    return FEHandler
+
+def make_be_handler(state: State):
+    class BEHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_PUT(self):
+            with state.lock:
+                state.inflight += 1
+            try:
+                self.load()
+            finally:
+                with state.lock:
+                    state.inflight -= 1
+
+        def load(self):
+            t0 = time.perf_counter()
+            rows, size = read_body(self)
+            label = self.headers.get("label")
+            with state.lock:
+                inflight = state.inflight
+            delay = state.latency_ms / 1000.0
+            if state.capacity > 0:
+                delay += size / (state.capacity / inflight) - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+            with state.lock:
+                state.txn += 1
+                txn = state.txn
+                if label and label in state.labels:
+                    status = "Label Already Exists"
+                elif state.max_inflight and inflight > state.max_inflight:
+                    status = "Overload"
+                elif random.random() < state.fail_rate:
+                    status = "Fail"
+                else:
+                    status = "Success"
+                    state.bytes += size
+                    port = self.server.server_address[1]
+                    state.port_bytes[port] = state.port_bytes.get(port, 0) + size
+                    if label:
+                        state.labels.add(label)
+            ms = int((time.perf_counter() - t0) * 1000)
+            if status != "Success":
+                out = {"TxnId": txn, "Label": label, "Status": "Fail" if status == "Overload" else status}
+                if status == "Overload":
+                    out["Message"] = "Memory of process exceed limit. QUERY Backend: 127.0.0.1, fragment: 0, Used: 1, Limit: 1"
+                elif status == "Fail":
+                    out["Message"] = "[E1008]Reached timeout=1000ms @127.0.0.1:8060"
+                else:
+                    out["ExistingJobStatus"] = "FINISHED"
+                    out["Message"] = f"Label [{label}] has already been used."
+                self.reply(out)
+                return
+            out = {
+                "TxnId": txn,
+                "Label": label or f"fake_{txn}",
+                "Status": "Success",
+                "Message": "OK",
+                "NumberTotalRows": rows,
+                "NumberLoadedRows": rows,
+                "NumberFilteredRows": 0,
+                "NumberUnselectedRows": 0,
+                "LoadBytes": size,
+                "LoadTimeMs": ms,
+                "BeginTxnTimeMs": 0,
+                "StreamLoadPlanTimeMs": 0,
+                "ReadDataTimeMs": ms,
+                "WriteDataTimeMs": ms,
+                "CommitAndPublishTimeMs": 0,
+            }
+            self.reply(out)
+
+        def reply(self, out: dict):
+            data = json.dumps(out, indent=4).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return BEHandler
+
+def packet(seq: int, payload: bytes) -> bytes:
+    return struct.pack("<I", len(payload))[:3] + bytes([seq & 0xFF]) + payload
+
+def lenenc(v: bytes) -> bytes:
+    if v is None:
+        return b"\xfb"
+    n = len(v)
+    if n < 0xFB:
+        return bytes([n]) + v
+    if n < 0x10000:
+        return b"\xfc" + struct.pack("<H", n) + v
+    return b"\xfd" + struct.pack("<I", n)[:3] + v
+
+OK_PACKET = b"\x00\x00\x00\x02\x00\x00\x00"
+EOF_PACKET = b"\xfe\x00\x00\x02\x00"
+
+# FE query port: enough of the MySQL protocol (native password handshake,
+# COM_QUERY text result sets, COM_PING, COM_QUIT) for tpch_run. Every SELECT
+# sleeps query_ms (at most query_slots at a time, cut short by KILL QUERY) and
+# returns one row; "select last_query_id()" and
+# "show profilelist" report the queries seen so far.
+def fake_profile(qid: str, ms: int) -> str:
+    return "\n".join([
+        "Query:",
+        "  Summary:",
+        f"     - Query ID: {qid}",
+        f"     - Total: {ms}ms",
+        "     - Query State: Finished",
+        "  Execution:",
+        "     - QueryPeakMemoryUsagePerNode: 12.500 MB",
+        "    Fragment 0:",
+        "      Pipeline (id=0):",
+        "        RESULT_SINK (plan_node_id=-1):",
+        "          CommonMetrics:",
+        f"             - OperatorTotalTime: {ms * 100}us",
+        "        AGGREGATE_BLOCKING_SOURCE (plan_node_id=2):",
+        "          CommonMetrics:",
+        f"             - OperatorTotalTime: {ms * 200}us",
+        "        OLAP_SCAN (plan_node_id=0):",
+        "          CommonMetrics:",
+        f"             - OperatorTotalTime: {ms * 700}us",
+        "          UniqueMetrics:",
+        "             - RawRowsRead: 6.001215M (6001215)",
+        "             - RowsRead: 1.234567M (1234567)",
+    ]) + "\n"
+
+def make_query_handler(state: State):
+    class QueryHandler(socketserver.StreamRequestHandler):
+        def read_packet(self):
+            head = self.rfile.read(4)
+            if len(head) < 4:
+                return None, 0
+            n = head[0] | (head[1] << 8) | (head[2] << 16)
+            return self.rfile.read(n), head[3]
+
+        def send(self, payloads, seq):
+            self.wfile.write(b"".join(packet(seq + i, p) for i, p in enumerate(payloads)))
+            self.wfile.flush()
+
+        def result(self, seq, columns, rows):
+            out = [bytes([len(columns)])]
+            for c in columns:
+                out.append(lenenc(b"def") + lenenc(b"") * 3 + lenenc(c.encode()) + lenenc(c.encode())
+                           + b"\x0c\x21\x00\x00\x01\x00\x00\xfd\x00\x00\x00\x00\x00")
+            out.append(EOF_PACKET)
+            for row in rows:
+                out.append(b"".join(lenenc(None if v is None else str(v).encode()) for v in row))
+            out.append(EOF_PACKET)
+            self.send(out, seq)
+
+        def handle(self):
+            salt = bytes(random.randrange(1, 128) for _ in range(20))
+            with state.lock:
+                state.connections += 1
+                conn_id = state.connections
+            hello = (b"\x0a" + b"5.1.0-fake\0" + struct.pack("<I", conn_id) + salt[:8] + b"\0"
+                     + struct.pack("<HBHH", 0xF7FF, 33, 2, 0x0008) + bytes([21]) + b"\0" * 10
+                     + salt[8:] + b"\0" + b"mysql_native_password\0")
+            self.send([hello], 0)
+            p, seq = self.read_packet()
+            if p is None:
+                return
+            self.send([OK_PACKET], seq + 1)
+            last_id = ""
+            while True:
+                p, seq = self.read_packet()
+                if not p or p[0] == 0x01:
+                    return
+                if p[0] == 0x0E:
+                    self.send([OK_PACKET], seq + 1)
+                    continue
+                sql = p[1:].decode("utf-8", "replace").strip()
+                low = sql.lower()
+                if low.startswith("select last_query_id()"):
+                    self.result(seq + 1, ["last_query_id()"], [[last_id or None]])
+                    continue
+                if low.startswith("select get_query_profile("):
+                    qid = sql.split("'")[1] if "'" in sql else ""
+                    with state.lock:
+                        ms = next((int(r[2][:-2]) for r in state.profiles if r[0] == qid), None)
+                    self.result(seq + 1, ["get_query_profile"], [[fake_profile(qid, ms) if ms is not None else ""]])
+                    continue
+                if low.startswith("explain"):
+                    plan = ["PLAN FRAGMENT 0(F00)", "  Output Exprs:1: result", "  0:OlapScanNode", "     table: fake, rollup: fake", "     cardinality: 1"]
+                    self.result(seq + 1, ["Explain String"], [[line] for line in plan])
+                    continue
+                if low.startswith("show backends"):
+                    cols = ["BackendId", "IP", "HeartbeatPort", "BePort", "HttpPort", "BrpcPort", "Alive", "SystemDecommissioned"]
+                    rows = [[10001 + i, h, 9050, 9060, port, 8060, "true", "false"] for i, (h, port) in enumerate(state.backends)]
+                    self.result(seq + 1, cols, rows)
+                    continue
+                if low.startswith("show profilelist"):
+                    with state.lock:
+                        rows = list(state.profiles[-100:])
+                    self.result(seq + 1, ["QueryId", "StartTime", "Time", "State", "Statement"], rows[::-1])
+                    continue
+                if low.startswith("kill"):
+                    target = int(low.split()[-1])
+                    with state.lock:
+                        ev = state.running.get(target)
+                    if ev is not None:
+                        ev.set()
+                    self.send([OK_PACKET], seq + 1)
+                    continue
+                if not (low.startswith("select") or low.startswith("with")):
+                    self.send([OK_PACKET], seq + 1)
+                    continue
+                t0 = time.perf_counter()
+                start = time.strftime("%Y-%m-%d %H:%M:%S")
+                cancel = threading.Event()
+                with state.lock:
+                    state.running[conn_id] = cancel
+                if state.query_slots is not None:
+                    with state.query_slots:
+                        cancel.wait(state.query_ms / 1000.0)
+                else:
+                    cancel.wait(state.query_ms / 1000.0)
+                with state.lock:
+                    state.running.pop(conn_id, None)
+                if cancel.is_set():
+                    self.send([b"\xff" + struct.pack("<H", 1317) + b"#70100Query was cancelled"], seq + 1)
+                    continue
+                last_id = str(uuid.uuid4())
+                ms = int((time.perf_counter() - t0) * 1000)
+                with state.lock:
+                    state.queries += 1
+                    state.profiles.append([last_id, start, f"{ms}ms", "Finished", sql[:64]])
+                self.result(seq + 1, ["result"], [[state.queries]])
+
+    return QueryHandler
+
+# fes/bes servers on consecutive ports from fe_port/be_port (0 picks free
+# ports). Returns ([FE servers], [BE servers], state).
+def start(fe_port: int = 0, be_port: int = 0, host: str = "127.0.0.1", fail_rate: float = 0.0, capacity_mb: float = 0.0, latency_ms: int = 0, max_inflight: int = 0, query_port: int = None, query_ms: int = 0, query_slots: int = 0, fes: int = 1, bes: int = 1):
+    state = State(fail_rate, capacity_mb, latency_ms, max_inflight)
+    state.query_ms = query_ms
+    if query_slots > 0:
+        state.query_slots = threading.Semaphore(query_slots)
+    be = [ThreadingHTTPServer((host, be_port + i if be_port else 0), make_be_handler(state)) for i in range(max(1, bes))]
+    state.backends = [(host, srv.server_address[1]) for srv in be]
+    fe = [ThreadingHTTPServer((host, fe_port + i if fe_port else 0), make_fe_handler(state)) for i in range(max(1, fes))]
+    servers = be + fe
+    if query_port is not None:
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        servers.append(socketserver.ThreadingTCPServer((host, query_port), make_query_handler(state)))
+    for srv in servers:
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return fe, be, state
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--fe-port", type=int, default=8030)
+    p.add_argument("--be-port", type=int, default=8040)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--capacity-mb", type=float, default=0.0)
+    p.add_argument("--latency-ms", type=int, default=0)
+    p.add_argument("--max-inflight", type=int, default=0)
+    p.add_argument("--query-port", type=int, default=9030)
+    p.add_argument("--query-ms", type=int, default=0)
+    p.add_argument("--query-slots", type=int, default=0)
+    p.add_argument("--fes", type=int, default=1)
+    p.add_argument("--bes", type=int, default=1)
+    args = p.parse_args()
+    fe, be, state = start(args.fe_port, args.be_port, args.host, args.fail_rate, args.capacity_mb, args.latency_ms, args.max_inflight, args.query_port, args.query_ms, args.query_slots, args.fes, args.bes)
+    fe_ports = ",".join(str(srv.server_address[1]) for srv in fe)
+    be_ports = ",".join(str(srv.server_address[1]) for srv in be)
+    print(f"fake FE http://{args.host}:{fe_ports} -> BE http://{args.host}:{be_ports}, query port {args.query_port}")
+    try:
+        while True:
+            time.sleep(10)
+            with state.lock:
+                per_port = " ".join(f"{p}={n}" for p, n in sorted(state.port_requests.items()))
+                per_be = " ".join(f"{p}={n}" for p, n in sorted(state.port_bytes.items()))
+                print(f"requests={state.requests} loads={state.txn} bytes={state.bytes} queries={state.queries} fe_requests[{per_port}] be_bytes[{per_be}]")
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import hashlib
+import re
+import socket
+import struct
+import sys
+import threading
+
+# Minimal MySQL client/server protocol (text protocol only) for talking to the
+# StarRocks FE query port without forking the mysql CLI per statement.
+
+CLIENT_LONG_PASSWORD = 0x1
+CLIENT_LONG_FLAG = 0x4
+CLIENT_CONNECT_WITH_DB = 0x8
+CLIENT_PROTOCOL_41 = 0x200
+CLIENT_TRANSACTIONS = 0x2000
+CLIENT_SECURE_CONNECTION = 0x8000
+CLIENT_MULTI_RESULTS = 0x20000
+CLIENT_PLUGIN_AUTH = 0x80000
+
+SERVER_MORE_RESULTS_EXISTS = 0x8
+
+COM_QUIT = 0x01
+COM_QUERY = 0x03
+COM_PING = 0x0E
+
+MAX_PACKET = 0xFFFFFF
+UTF8MB4_GENERAL_CI = 45
+
+class MySQLError(RuntimeError):
+    def __init__(self, code: int, state: str, message: str):
+        super().__init__(f"ERROR {code} ({state}): {message}")
+        self.code = code
+        self.state = state
+        self.message = message
+
+def scramble_native(password: str, salt: bytes) -> bytes:
+    if not password:
+        return b""
+    h1 = hashlib.sha1(password.encode("utf-8")).digest()
+    h2 = hashlib.sha1(h1).digest()
+    h3 = hashlib.sha1(salt + h2).digest()
+    return bytes(a ^ b for a, b in zip(h1, h3))
+
+def read_lenenc_int(buf: bytes, pos: int):
+    c = buf[pos]
+    if c < 0xFB:
+        return c, pos + 1
+    if c == 0xFB:
+        return None, pos + 1
+    if c == 0xFC:
+        return struct.unpack_from("<H", buf, pos + 1)[0], pos + 3
+    if c == 0xFD:
+        return int.from_bytes(buf[pos + 1:pos + 4], "little"), pos + 4
+    return struct.unpack_from("<Q", buf, pos + 1)[0], pos + 9
+
+def read_lenenc_str(buf: bytes, pos: int):
+    n, pos = read_lenenc_int(buf, pos)
+    if n is None:
+        return None, pos
+    return buf[pos:pos + n], pos + n
+
+def parse_error(payload: bytes) -> MySQLError:
+    code = struct.unpack_from("<H", payload, 1)[0]
+    if payload[3:4] == b"#":
+        state = payload[4:9].decode("ascii", "replace")
+        msg = payload[9:]
+    else:
+        state = "HY000"
+        msg = payload[3:]
+    return MySQLError(code, state, msg.decode("utf-8", "replace"))
+
+def parse_ok(payload: bytes) -> dict:
+    affected, pos = read_lenenc_int(payload, 1)
+    insert_id, pos = read_lenenc_int(payload, pos)
+    status, warnings = struct.unpack_from("<HH", payload, pos)
+    return {"affected_rows": affected, "insert_id": insert_id, "status": status, "warnings": warnings}
+
+def is_eof(payload: bytes) -> bool:
+    return payload[:1] == b"\xfe" and len(payload) < 9
+
+# Same escaping as "mysql --batch": one row per line, tab separated, NULL as NULL.
+def batch_escape(v: bytes) -> bytes:
+    if v is None:
+        return b"NULL"
+    if b"\\" in v or b"\t" in v or b"\n" in v or b"\0" in v:
+        v = v.replace(b"\\", b"\\\\").replace(b"\t", b"\\t").replace(b"\n", b"\\n").replace(b"\0", b"\\0")
+    return v
+
+class Connection:
+    def __init__(self, host: str, port: int, user: str, password: str, db: str = None, timeout: float = None):
+        self.host = host
+        self.port = port
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile("rb", buffering=256 * 1024)
+        self.seq = 0
+        self.broken = False
+        self.connection_id = None
+        self.server_version = None
+        try:
+            self.handshake(user, password, db)
+        except BaseException:
+            self.close()
+            raise
+
+    def read_packet(self) -> bytes:
+        parts = []
+        while True:
+            head = self.rfile.read(4)
+            if len(head) < 4:
+                self.broken = True
+                raise ConnectionError("connection closed by server")
+            n = head[0] | (head[1] << 8) | (head[2] << 16)
+            self.seq = (head[3] + 1) & 0xFF
+            data = self.rfile.read(n)
+            if len(data) < n:
+                self.broken = True
+                raise ConnectionError("connection closed by server")
+            parts.append(data)
+            if n < MAX_PACKET:
+                return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def write_packet(self, payload: bytes):
+        out = []
+        pos = 0
+        while True:
+            part = payload[pos:pos + MAX_PACKET]
+            out.append(struct.pack("<I", len(part))[:3] + bytes([self.seq]) + part)
+            self.seq = (self.seq + 1) & 0xFF
+            pos += MAX_PACKET
+            if len(part) < MAX_PACKET:
+                break
+        self.sock.sendall(b"".join(out))
+
+    def handshake(self, user: str, password: str, db: str):
+        p = self.read_packet()
+        if p[:1] == b"\xff":
+            raise parse_error(p)
+        pos = p.index(b"\0", 1)
+        self.server_version = p[1:pos].decode("utf-8", "replace")
+        pos += 1
+        self.connection_id = struct.unpack_from("<I", p, pos)[0]
+        pos += 4
+        salt = p[pos:pos + 8]
+        pos += 9
+        caps = struct.unpack_from("<H", p, pos)[0]
+        pos += 2
+        plugin = "mysql_native_password"
+        if len(p) > pos:
+            pos += 3
+            caps |= struct.unpack_from("<H", p, pos)[0] << 16
+            pos += 2
+            salt_len = p[pos]
+            pos += 11
+            if caps & CLIENT_SECURE_CONNECTION:
+                n = max(13, salt_len - 8)
+                salt += p[pos:pos + n].rstrip(b"\0")
+                pos += n
+            if caps & CLIENT_PLUGIN_AUTH:
+                end = p.find(b"\0", pos)
+                plugin = p[pos:end if end >= 0 else len(p)].decode("ascii", "replace") or plugin
+        flags = (CLIENT_LONG_PASSWORD | CLIENT_LONG_FLAG | CLIENT_PROTOCOL_41 | CLIENT_TRANSACTIONS
+                 | CLIENT_SECURE_CONNECTION | CLIENT_MULTI_RESULTS | CLIENT_PLUGIN_AUTH)
+        if db:
+            flags |= CLIENT_CONNECT_WITH_DB
+        flags &= caps | CLIENT_CONNECT_WITH_DB
+        auth = scramble_native(password, salt) if plugin == "mysql_native_password" else b""
+        out = struct.pack("<IIB", flags, MAX_PACKET, UTF8MB4_GENERAL_CI) + b"\0" * 23
+        out += user.encode("utf-8") + b"\0" + bytes([len(auth)]) + auth
+        if db:
+            out += db.encode("utf-8") + b"\0"
+        out += b"mysql_native_password\0"
+        self.write_packet(out)
+        while True:
+            p = self.read_packet()
+            if p[:1] == b"\x00":
+                return
+            if p[:1] == b"\xff":
+                raise parse_error(p)
+            if p[:1] == b"\xfe":
+                # Auth switch request: plugin name, then a fresh salt.
+                end = p.index(b"\0", 1)
+                plugin = p[1:end].decode("ascii", "replace")
+                if plugin != "mysql_native_password":
+                    raise MySQLError(2059, "HY000", f"authentication plugin {plugin} is not supported")
+                self.write_packet(scramble_native(password, p[end + 1:].rstrip(b"\0")))
+                continue
+            raise MySQLError(2027, "HY000", "malformed packet during authentication")
+
+    def command(self, cmd: int, arg: bytes = b""):
+        if self.broken:
+            raise ConnectionError("connection is broken")
+        self.seq = 0
+        try:
+            self.write_packet(bytes([cmd]) + arg)
+        except OSError:
+            self.broken = True
+            raise
+
+    def query(self, sql: str, out=None) -> dict:
+        # Runs sql and reads every result set. With out (a binary file) rows are
+        # streamed to it in "mysql --batch" format as they arrive and only
+        # counted; without it they are returned as lists of str/None.
+        self.command(COM_QUERY, sql.encode("utf-8"))
+        res = {"columns": [], "rows": [] if out is None else None, "row_count": 0, "affected_rows": 0, "warnings": 0}
+        try:
+            while True:
+                p = self.read_packet()
+                if p[:1] == b"\xff":
+                    raise parse_error(p)
+                if p[:1] == b"\x00":
+                    ok = parse_ok(p)
+                    res["affected_rows"] += ok["affected_rows"] or 0
+                    res["warnings"] += ok["warnings"]
+                    if not ok["status"] & SERVER_MORE_RESULTS_EXISTS:
+                        return res
+                    continue
+                if not self.read_result_set(p, res, out):
+                    return res
+        except socket.timeout:
+            self.broken = True
+            raise
+
+    def read_result_set(self, first: bytes, res: dict, out) -> bool:
+        ncols, _ = read_lenenc_int(first, 0)
+        columns = []
+        for _ in range(ncols):
+            p = self.read_packet()
+            pos = 0
+            for _ in range(4):
+                _, pos = read_lenenc_str(p, pos)
+            name, _ = read_lenenc_str(p, pos)
+            columns.append(name)
+        p = self.read_packet()
+        if not is_eof(p):
+            raise MySQLError(2027, "HY000", "malformed packet: expected EOF after column definitions")
+        res["columns"] = [c.decode("utf-8", "replace") for c in columns]
+        if out is not None:
+            out.write(b"\t".join(batch_escape(c) for c in columns) + b"\n")
+        while True:
+            p = self.read_packet()
+            if p[:1] == b"\xff":
+                raise parse_error(p)
+            if is_eof(p):
+                status = struct.unpack_from("<H", p, 3)[0] if len(p) >= 5 else 0
+                return bool(status & SERVER_MORE_RESULTS_EXISTS)
+            row = []
+            pos = 0
+            for _ in range(ncols):
+                v, pos = read_lenenc_str(p, pos)
+                row.append(v)
+            res["row_count"] += 1
+            if out is not None:
+                out.write(b"\t".join(batch_escape(v) for v in row) + b"\n")
+            else:
+                res["rows"].append([None if v is None else v.decode("utf-8", "replace") for v in row])
+
+    def ping(self) -> bool:
+        try:
+            self.command(COM_PING)
+            p = self.read_packet()
+            return p[:1] == b"\x00"
+        except OSError:
+            self.broken = True
+            return False
+
+    def settimeout(self, timeout: float):
+        self.sock.settimeout(timeout)
+
+    def close(self):
+        if not self.broken:
+            try:
+                self.command(COM_QUIT)
+            except OSError:
+                pass
+        self.broken = True
+        try:
+            self.rfile.close()
+        finally:
+            self.sock.close()
+
+# Persistent connections to one FE, shared by query threads. get() hands out an
+# idle connection (or opens one); put() returns it unless it broke mid-query.
+class Pool:
+    def __init__(self, host: str, port: int, user: str, password: str, db: str = None, max_idle: int = 64, timeout: float = None, init_sql=None):
+        self.args = (host, port, user, password, db, timeout)
+        self.max_idle = max_idle
+        self.init_sql = list(init_sql or [])
+        self.lock = threading.Lock()
+        self.idle = []
+        self.failed_init = set()
+
+    def connect(self) -> Connection:
+        # Session settings are best effort: a variable this FE version does
+        # not know is reported once and skipped.
+        conn = Connection(*self.args)
+        for sql in self.init_sql:
+            try:
+                conn.query(sql)
+            except MySQLError as e:
+                with self.lock:
+                    first = sql not in self.failed_init
+                    self.failed_init.add(sql)
+                if first:
+                    sys.stderr.write(f"warning: {sql}: {e}\n")
+        return conn
+
+    def get(self) -> Connection:
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+        if conn is None:
+            return self.connect()
+        return conn
+
+    def put(self, conn: Connection):
+        if conn.broken:
+            conn.close()
+            return
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            conns = self.idle
+            self.idle = []
+        for c in conns:
+            c.close()
+
+# StarRocks profile durations: "123ms", "1s234ms", "2m3s", "1.5s", "850us".
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 1e-3, "us": 1e-6, "ns": 1e-9}
+
+def parse_duration(text: str):
+    parts = re.findall(r"([0-9.]+)\s*(ms|us|ns|h|m|s)", text or "")
+    if not parts:
+        return None
+    return sum(float(v) * DURATION_UNITS[u] for v, u in parts)
+
+def server_query_time(conn: Connection):
+    # Server-side wall time of the previous statement on conn, read from the FE
+    # profile list (needs enable_profile=true on the session). Best effort:
+    # None when the profile is not (yet) available.
+    try:
+        qid = conn.query("select last_query_id()")["rows"]
+        if not qid or not qid[0][0]:
+            return None
+        res = conn.query("show profilelist")
+    except MySQLError:
+        return None
+    except OSError:
+        # a socket error leaves the stream mid-packet: never reuse it
+        conn.broken = True
+        return None
+    cols = [c.lower() for c in res["columns"]]
+    if "queryid" not in cols or "time" not in cols:
+        return None
+    for row in res["rows"]:
+        if row[cols.index("queryid")] == qid[0][0]:
+            return parse_duration(row[cols.index("time")])
+    return None
@@ -0,0 +1,179 @@
+import base64
+import http.client
+import select
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+CHUNK_BYTES = 256 * 1024
+EXPECT_WAIT_S = 1.0
+MAX_REDIRECTS = 3
+
+# Keep-alive HTTP connections shared by all loader threads, keyed by host:port.
+class ConnectionPool:
+    def __init__(self, max_idle_per_host: int = 64):
+        self.max_idle_per_host = max_idle_per_host
+        self.lock = threading.Lock()
+        self.idle = {}
+
+    def get(self, host: str, port: int, timeout: float):
+        with self.lock:
+            conns = self.idle.get((host, port))
+            conn = conns.pop() if conns else None
+        if conn is None:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+            conn.connect()
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return conn, False
+        conn.timeout = timeout
+        conn.sock.settimeout(timeout)
+        return conn, True
+
+    def put(self, conn: http.client.HTTPConnection):
+        key = (conn.host, conn.port)
+        with self.lock:
+            conns = self.idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_host:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            conns = [c for cs in self.idle.values() for c in cs]
+            self.idle.clear()
+        for c in conns:
+            c.close()
+
+POOL = ConnectionPool()
+
+def basic_auth(user: str, password: str) -> str:
+    return "Basic " + base64.b64encode(f"{user}:{password}".encode("utf-8")).decode("ascii")
+
+def await_continue(sock: socket.socket, wait_s: float) -> bool:
+    # Returns True when the body should be sent: either "100 Continue" arrived
+    # (and has been consumed) or the server stayed silent past wait_s, like curl.
+    # False means a final response (e.g. the FE 307) is waiting to be read.
+    r, _, _ = select.select([sock], [], [], wait_s)
+    if not r:
+        return True
+    while True:
+        head = sock.recv(4096, socket.MSG_PEEK)
+        if not head:
+            raise http.client.RemoteDisconnected("connection closed before response")
+        if len(head) >= 12 and head[9:12] != b"100":
+            return False
+        end = head.find(b"\r\n\r\n")
+        if len(head) >= 12 and end != -1:
+            break
+        time.sleep(0.001)
+    end += 4
+    while end > 0:
+        end -= len(sock.recv(end))
+    return True
+
+def send_chunk(sock: socket.socket, pieces: list, size: int):
+    sock.sendall(b"%x\r\n" % size)
+    sock.sendall(pieces[0] if len(pieces) == 1 else b"".join(pieces))
+    sock.sendall(b"\r\n")
+
+def send_body(conn: http.client.HTTPConnection, body, length):
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        conn.sock.sendall(body)
+    elif length is not None:
+        conn.sock.sendfile(body, body.tell(), length)
+    else:
+        # Small pieces are coalesced into CHUNK_BYTES chunks; large blocks go out
+        # as their own chunk without being copied again.
+        buf = []
+        size = 0
+        for piece in body:
+            if not piece:
+                continue
+            buf.append(piece)
+            size += len(piece)
+            if size >= CHUNK_BYTES:
+                send_chunk(conn.sock, buf, size)
+                buf = []
+                size = 0
+        if size:
+            send_chunk(conn.sock, buf, size)
+        conn.sock.sendall(b"0\r\n\r\n")
+
+# A redirect that arrived only after the body went out (the FE stayed silent
+# past EXPECT_WAIT_S) while the body was a one-shot iterable: it cannot be sent
+# again, the caller has to rebuild it and retry.
+class BodyNotReplayable(RuntimeError):
+    pass
+
+# PUT body to url, following 307 redirects with the same headers like curl
+# --location-trusted. body is bytes, a binary file positioned at the first byte
+# to send (length bytes go out via sendfile), or an iterable of bytes sent
+# chunked when length is None. A late redirect re-sends bytes and rewinds a
+# file; an iterable raises BodyNotReplayable. Returns (http_status,
+# response_body).
+def put(url: str, headers: dict, body, length=None, timeout_s: float = 3600, pool: ConnectionPool = POOL):
+    is_bytes = isinstance(body, (bytes, bytearray, memoryview))
+    replay = is_bytes or length is not None
+    start = None if is_bytes or length is None else body.tell()
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        for attempt in range(2):
+            conn, reused = pool.get(parts.hostname, parts.port or 80, timeout_s)
+            try:
+                conn.putrequest("PUT", path, skip_accept_encoding=True)
+                for k, v in headers.items():
+                    conn.putheader(k, v)
+                conn.putheader("Expect", "100-continue")
+                if isinstance(body, (bytes, bytearray, memoryview)):
+                    conn.putheader("Content-Length", str(len(body)))
+                elif length is not None:
+                    conn.putheader("Content-Length", str(length))
+                else:
+                    conn.putheader("Transfer-Encoding", "chunked")
+                conn.endheaders()
+                send = await_continue(conn.sock, EXPECT_WAIT_S)
+            except ConnectionError:
+                # A pooled keep-alive connection may have been closed by the server
+                # while idle; nothing of the body was consumed yet, so retry once.
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            break
+        send_error = None
+        try:
+            if send:
+                try:
+                    send_body(conn, body, length)
+                except ConnectionError as e:
+                    # A late 307 is often followed by the FE closing without
+                    # reading the body: the response may still be readable.
+                    send_error = e
+            resp = conn.getresponse()
+            data = resp.read()
+        except Exception:
+            conn.close()
+            if send_error is not None:
+                raise send_error
+            raise
+        redirect = resp.status in (301, 302, 307, 308) and resp.getheader("Location")
+        if send_error is not None and not redirect:
+            conn.close()
+            raise send_error
+        if resp.will_close or not send or send_error is not None:
+            conn.close()
+        else:
+            pool.put(conn)
+        if redirect:
+            url = resp.getheader("Location")
+            if send:
+                if not replay:
+                    raise BodyNotReplayable(f"redirect to {url} after the body was sent; the body cannot be sent again")
+                if start is not None:
+                    body.seek(start)
+            continue
+        return resp.status, data
+    raise RuntimeError(f"too many redirects for {url}")
@@ -1,38 +1,163 @@
 import argparse
 import json
+import math
 from pathlib import Path
 
-BASE_BUCKETS = {
-    "customer": 24,
-    "lineitem": 96,
-    "orders": 96,
-    "part": 24,
-    "partsupp": 24,
-    "supplier": 12,
-    "nation": 1,
-    "region": 1,
+from tpch_compress import codec_for_path
+from tpch_gen import SIZE_TO_SF, TABLES, row_counts
+
+# Average bytes per row of the generated text files (dbgen output at SF 1).
+ROW_BYTES = {
+    "customer": 163,
+    "lineitem": 127,
+    "nation": 89,
+    "orders": 115,
+    "part": 121,
+    "partsupp": 149,
+    "region": 78,
+    "supplier": 142,
 }
 
-SCALE = {
-    "10GB": 1,
-    "100GB": 1,
-    "1TB": 10,
-    "10TB": 100,
-    "100TB": 1000,
+# Text-to-compressed ratio assumed for .gz/.lz4/.zst/.bz2 files under --data-dir.
+COMPRESSED_RATIO = 4.0
+
+SMALL_TABLES = {"nation", "region"}
+
+# Colocated tables must have the same bucket count.
+COLOCATE_GROUPS = [("lineitem", "orders"), ("part", "partsupp")]
+
+PARTITION_COLUMNS = {"lineitem": "l_shipdate", "orders": "o_orderdate"}
+# o_orderdate spans 1992-01-01..1998-08-02 and l_shipdate ends 121 days later.
+PARTITION_RANGE = ("1992-01-01", "1999-01-01")
+PARTITIONS = {"none": 1, "year": 7, "month": 84}
+
+def estimated_bytes(sf: int) -> dict:
+    rc = row_counts(sf)
+    return {t: rc[t] * ROW_BYTES[t] for t in TABLES}
+
+# Text bytes per table from the generated files in data_dir; tables without
+# files there are left out.
+def measured_bytes(data_dir: Path) -> dict:
+    sizes = {}
+    for t in TABLES:
+        d = data_dir / t
+        if not d.is_dir():
+            continue
+        total = 0
+        for f in d.iterdir():
+            if f.is_file() and not f.name.startswith(("_", ".")):
+                n = f.stat().st_size
+                total += int(n * COMPRESSED_RATIO) if codec_for_path(f) else n
+        if total:
+            sizes[t] = total
+    return sizes
+
+# Buckets per partition: enough for tablet_bytes of text per tablet, rounded up
+# to a multiple of the BE disks (or at least of the BEs) so every disk gets the
+# same number of tablets once a table is large enough to need that many.
+def buckets(nbytes: int, partitions: int, backends: int, disks: int, tablet_bytes: int) -> int:
+    n = max(1, math.ceil(nbytes / partitions / tablet_bytes))
+    slots = backends * disks
+    if n >= slots:
+        return math.ceil(n / slots) * slots
+    if n >= backends:
+        return math.ceil(n / backends) * backends
+    return n
+
+def plan(table_bytes: dict, backends: int, disks: int, tablet_bytes: int, partition: str = "none") -> dict:
+    out = {}
+    for t in TABLES:
+        parts = PARTITIONS[partition] if t in PARTITION_COLUMNS else 1
+        n = 1 if t in SMALL_TABLES else buckets(table_bytes[t], parts, backends, disks, tablet_bytes)
+        out[t] = {"bytes": table_bytes[t], "partitions": parts, "buckets": n}
+    for group in COLOCATE_GROUPS:
+        n = max(out[t]["buckets"] for t in group)
+        for t in group:
+            out[t]["buckets"] = n
+    return out
+
+COLOCATE_WITH = {"lineitem": "tpch2", "orders": "tpch2", "part": "tpch2p", "partsupp": "tpch2p"}
+
+# Physical design variants for tpch_variants.py. Keys: colocate (default True),
+# bloom_filter {table: columns}, order_by {table: sort key columns} and mvs
+# [(name, distribution column, select)], created as manually refreshed async materialized views.
+BLOOM_FILTER = {
+    # Join keys that runtime filters probe with IN/equality predicates.
+    "lineitem": ["l_partkey", "l_suppkey"],
+    "orders": ["o_custkey"],
+    "partsupp": ["ps_suppkey"],
+    "customer": ["c_nationkey"],
+    "supplier": ["s_nationkey"],
 }
 
-def buckets(table: str, size: str) -> int:
-    base = BASE_BUCKETS[table]
-    factor = SCALE.get(size, 1)
-    if table in {"customer", "lineitem", "orders", "part", "partsupp", "supplier"}:
-        return max(1, base * factor)
-    return base
+ORDER_BY = {
+    # Date ranges (Q3-Q5, Q8, Q10), market segment (Q3) and brand/container (Q17, Q19).
+    "orders": ["o_orderdate", "o_orderkey"],
+    "customer": ["c_mktsegment", "c_custkey"],
+    "part": ["p_brand", "p_container", "p_partkey"],
+}
+
+MVS = [
+    # Q1 (and other lineitem-only aggregates over a shipdate range).
+    ("mv_lineitem_daily", "l_shipdate", "select l_shipdate, l_returnflag, l_linestatus, sum(l_quantity) as sum_qty, sum(l_extendedprice) as sum_base_price, "
+     "sum(l_extendedprice * (1 - l_discount)) as sum_disc_price, sum(l_extendedprice * (1 - l_discount) * (1 + l_tax)) as sum_charge, "
+     "sum(l_discount) as sum_disc, count(*) as count_order from lineitem group by l_shipdate, l_returnflag, l_linestatus"),
+    # Q18's per-order quantity subquery.
+    ("mv_lineitem_order_qty", "l_orderkey", "select l_orderkey, sum(l_quantity) as sum_qty from lineitem group by l_orderkey"),
+    # Q15's revenue per supplier and ship date.
+    ("mv_lineitem_supp_revenue", "l_suppkey", "select l_suppkey, l_shipdate, sum(l_extendedprice * (1 - l_discount)) as revenue from lineitem group by l_suppkey, l_shipdate"),
+]
+
+VARIANTS = {
+    "baseline": {},
+    "no_colocate": {"colocate": False},
+    "bloom": {"bloom_filter": BLOOM_FILTER},
+    "sort_key": {"order_by": ORDER_BY},
+    "mv": {"mvs": MVS},
+    "all": {"bloom_filter": BLOOM_FILTER, "order_by": ORDER_BY, "mvs": MVS},
+}
+
+def order_by(table: str, variant: dict) -> str:
+    cols = variant.get("order_by", {}).get(table)
+    if not cols:
+        return ""
+    return "ORDER BY(" + ", ".join(f"`{c}`" for c in cols) + ")\n"
+
+def properties(table: str, variant: dict) -> str:
+    props = [("replication_num", "3")]
+    if variant.get("colocate", True) and table in COLOCATE_WITH:
+        props.append(("colocate_with", COLOCATE_WITH[table]))
+    cols = variant.get("bloom_filter", {}).get(table)
+    if cols:
+        props.append(("bloom_filter_columns", ", ".join(cols)))
+    return "PROPERTIES (\n" + ",\n".join(f"    \"{k}\" = \"{v}\"" for k, v in props) + "\n)"
+
+# Drops the views of every variant, not only the selected one: switching from
+# "mv" to "baseline" must not leave the rewrite targets of the last run behind.
+def materialized_views(variant: dict) -> list:
+    names = dict.fromkeys(name for v in VARIANTS.values() for name, _, _ in v.get("mvs", []))
+    out = [f"drop materialized view if exists {name};" for name in names]
+    for name, key, select in variant.get("mvs", []):
+        out.append(f"CREATE MATERIALIZED VIEW {name}\nDISTRIBUTED BY HASH(`{key}`)\nREFRESH MANUAL\nAS {select};")
+    return out
+
+def partition_clause(table: str, partition: str) -> str:
+    if partition == "none" or table not in PARTITION_COLUMNS:
+        return ""
+    start, end = PARTITION_RANGE
+    return f"PARTITION BY RANGE(`{PARTITION_COLUMNS[table]}`) (\n    START (\"{start}\") END (\"{end}\") EVERY (INTERVAL 1 {partition.upper()})\n)\n"
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--config")
     p.add_argument("--db")
-    p.add_argument("--size", choices=list(SCALE.keys()))
+    p.add_argument("--size", choices=list(SIZE_TO_SF.keys()))
+    p.add_argument("--data-dir")
+    p.add_argument("--backends", type=int)
+    p.add_argument("--disks", type=int)
+    p.add_argument("--tablet-size-gb", type=float)
+    p.add_argument("--partition", choices=list(PARTITIONS.keys()))
+    p.add_argument("--variant", choices=list(VARIANTS.keys()))
     args = p.parse_args()
     cfg = {}
     if args.config:
@@ -45,25 +170,51 @@ def main():
     size = args.size or cfg.get("size") or cfg.get("schema_size") or "100GB"
     if not db:
         raise SystemExit("missing database name")
+    backends = int(args.backends or cfg.get("backends") or 3)
+    disks = int(args.disks or cfg.get("disks_per_backend") or 1)
+    tablet_bytes = int(float(args.tablet_size_gb or cfg.get("tablet_size_gb") or 4) * (1024 ** 3))
+    partition = args.partition or cfg.get("partition") or "none"
+    variant_name = args.variant or cfg.get("variant") or "baseline"
+    if variant_name not in VARIANTS:
+        raise SystemExit(f"unknown variant: {variant_name}")
+    v = VARIANTS[variant_name]
+    if partition not in PARTITIONS:
+        raise SystemExit(f"unsupported partition: {partition}")
+    table_bytes = estimated_bytes(SIZE_TO_SF.get(size, 100))
+    source = {t: f"SF {SIZE_TO_SF.get(size, 100)} estimate" for t in TABLES}
+    if args.data_dir:
+        measured = measured_bytes(Path(args.data_dir))
+        if not measured:
+            raise SystemExit(f"no generated table files under {args.data_dir}")
+        table_bytes.update(measured)
+        source.update({t: "measured" for t in measured})
+    layout = plan(table_bytes, backends, disks, tablet_bytes, partition)
+    b = {t: layout[t]["buckets"] for t in TABLES}
+    print(f"-- variant={variant_name} backends={backends} disks_per_backend={disks} tablet_size={tablet_bytes / (1024 ** 3):.3g}GB partition={partition}")
+    for t in TABLES:
+        x = layout[t]
+        per_tablet = x["bytes"] / x["partitions"] / x["buckets"] / (1024 ** 2)
+        print(f"-- {t}: {x['bytes'] / (1024 ** 3):.2f}GB ({source[t]}), {x['partitions']} partition(s) x {x['buckets']} buckets, ~{per_tablet:.0f}MB per tablet")
     print(f"CREATE DATABASE IF NOT EXISTS `{db}`;")
     print(f"USE `{db}`;")
     print("drop table if exists customer;")
-    print(f"CREATE TABLE customer (\n    c_custkey     int NOT NULL,\n    c_name        VARCHAR(25) NOT NULL,\n    c_address     VARCHAR(40) NOT NULL,\n    c_nationkey   int NOT NULL,\n    c_phone       VARCHAR(15) NOT NULL,\n    c_acctbal     decimal(15, 2)   NOT NULL,\n    c_mktsegment  VARCHAR(10) NOT NULL,\n    c_comment     VARCHAR(117) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`c_custkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`c_custkey`) BUCKETS {buckets('customer', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\"\n);")
+    print(f"CREATE TABLE customer (\n    c_custkey     int NOT NULL,\n    c_name        VARCHAR(25) NOT NULL,\n    c_address     VARCHAR(40) NOT NULL,\n    c_nationkey   int NOT NULL,\n    c_phone       VARCHAR(15) NOT NULL,\n    c_acctbal     decimal(15, 2)   NOT NULL,\n    c_mktsegment  VARCHAR(10) NOT NULL,\n    c_comment     VARCHAR(117) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`c_custkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`c_custkey`) BUCKETS {b['customer']}\n{order_by('customer', v)}{properties('customer', v)};")
     print("drop table if exists lineitem;")
-    print(f"CREATE TABLE lineitem (\n    l_shipdate    DATE NOT NULL,\n    l_orderkey    int NOT NULL,\n    l_linenumber  int not null,\n    l_partkey     int NOT NULL,\n    l_suppkey     int not null,\n    l_quantity    decimal(15, 2) NOT NULL,\n    l_extendedprice  decimal(15, 2) NOT NULL,\n    l_discount    decimal(15, 2) NOT NULL,\n    l_tax         decimal(15, 2) NOT NULL,\n    l_returnflag  VARCHAR(1) NOT NULL,\n    l_linestatus  VARCHAR(1) NOT NULL,\n    l_commitdate  DATE NOT NULL,\n    l_receiptdate DATE NOT NULL,\n    l_shipinstruct VARCHAR(25) NOT NULL,\n    l_shipmode     VARCHAR(10) NOT NULL,\n    l_comment      VARCHAR(44) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`l_shipdate`, `l_orderkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`l_orderkey`) BUCKETS {buckets('lineitem', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\",\n    \"colocate_with\" = \"tpch2\"\n);")
+    print(f"CREATE TABLE lineitem (\n    l_shipdate    DATE NOT NULL,\n    l_orderkey    int NOT NULL,\n    l_linenumber  int not null,\n    l_partkey     int NOT NULL,\n    l_suppkey     int not null,\n    l_quantity    decimal(15, 2) NOT NULL,\n    l_extendedprice  decimal(15, 2) NOT NULL,\n    l_discount    decimal(15, 2) NOT NULL,\n    l_tax         decimal(15, 2) NOT NULL,\n    l_returnflag  VARCHAR(1) NOT NULL,\n    l_linestatus  VARCHAR(1) NOT NULL,\n    l_commitdate  DATE NOT NULL,\n    l_receiptdate DATE NOT NULL,\n    l_shipinstruct VARCHAR(25) NOT NULL,\n    l_shipmode     VARCHAR(10) NOT NULL,\n    l_comment      VARCHAR(44) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`l_shipdate`, `l_orderkey`)\nCOMMENT \"OLAP\"\n{partition_clause('lineitem', partition)}DISTRIBUTED BY HASH(`l_orderkey`) BUCKETS {b['lineitem']}\n{order_by('lineitem', v)}{properties('lineitem', v)};")
     print("drop table if exists nation;")
-    print(f"CREATE TABLE nation (\n  n_nationkey int NOT NULL,\n  n_name      varchar(25) NOT NULL,\n  n_regionkey int NOT NULL,\n  n_comment   varchar(152) NULL\n) ENGINE=OLAP\nDUPLICATE KEY(`n_nationkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`n_nationkey`) BUCKETS {buckets('nation', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\"\n);")
+    print(f"CREATE TABLE nation (\n  n_nationkey int NOT NULL,\n  n_name      varchar(25) NOT NULL,\n  n_regionkey int NOT NULL,\n  n_comment   varchar(152) NULL\n) ENGINE=OLAP\nDUPLICATE KEY(`n_nationkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`n_nationkey`) BUCKETS {b['nation']}\n{order_by('nation', v)}{properties('nation', v)};")
     print("drop table if exists orders;")
-    print(f"CREATE TABLE orders  (\n    o_orderkey       int NOT NULL,\n    o_orderdate      DATE NOT NULL,\n    o_custkey        int NOT NULL,\n    o_orderstatus    VARCHAR(1) NOT NULL,\n    o_totalprice     decimal(15, 2) NOT NULL,\n    o_orderpriority  VARCHAR(15) NOT NULL,\n    o_clerk          VARCHAR(15) NOT NULL,\n    o_shippriority   int NOT NULL,\n    o_comment        VARCHAR(79) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`o_orderkey`, `o_orderdate`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`o_orderkey`) BUCKETS {buckets('orders', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\",\n    \"colocate_with\" = \"tpch2\"\n);")
+    print(f"CREATE TABLE orders  (\n    o_orderkey       int NOT NULL,\n    o_orderdate      DATE NOT NULL,\n    o_custkey        int NOT NULL,\n    o_orderstatus    VARCHAR(1) NOT NULL,\n    o_totalprice     decimal(15, 2) NOT NULL,\n    o_orderpriority  VARCHAR(15) NOT NULL,\n    o_clerk          VARCHAR(15) NOT NULL,\n    o_shippriority   int NOT NULL,\n    o_comment        VARCHAR(79) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`o_orderkey`, `o_orderdate`)\nCOMMENT \"OLAP\"\n{partition_clause('orders', partition)}DISTRIBUTED BY HASH(`o_orderkey`) BUCKETS {b['orders']}\n{order_by('orders', v)}{properties('orders', v)};")
     print("drop table if exists part;")
-    print(f"CREATE TABLE part (\n    p_partkey          int NOT NULL,\n    p_name        VARCHAR(55) NOT NULL,\n    p_mfgr        VARCHAR(25) NOT NULL,\n    p_brand       VARCHAR(10) NOT NULL,\n    p_type        VARCHAR(25) NOT NULL,\n    p_size        int NOT NULL,\n    p_container   VARCHAR(10) NOT NULL,\n    p_retailprice decimal(15, 2) NOT NULL,\n    p_comment     VARCHAR(23) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`p_partkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`p_partkey`) BUCKETS {buckets('part', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\",\n    \"colocate_with\" = \"tpch2p\"\n);")
+    print(f"CREATE TABLE part (\n    p_partkey          int NOT NULL,\n    p_name        VARCHAR(55) NOT NULL,\n    p_mfgr        VARCHAR(25) NOT NULL,\n    p_brand       VARCHAR(10) NOT NULL,\n    p_type        VARCHAR(25) NOT NULL,\n    p_size        int NOT NULL,\n    p_container   VARCHAR(10) NOT NULL,\n    p_retailprice decimal(15, 2) NOT NULL,\n    p_comment     VARCHAR(23) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`p_partkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`p_partkey`) BUCKETS {b['part']}\n{order_by('part', v)}{properties('part', v)};")
     print("drop table if exists partsupp;")
-    print(f"CREATE TABLE partsupp (\n    ps_partkey          int NOT NULL,\n    ps_suppkey     int NOT NULL,\n    ps_availqty    int NOT NULL,\n    ps_supplycost  decimal(15, 2)  NOT NULL,\n    ps_comment     VARCHAR(199) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`ps_partkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`ps_partkey`) BUCKETS {buckets('partsupp', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\",\n    \"colocate_with\" = \"tpch2p\"\n);")
+    print(f"CREATE TABLE partsupp (\n    ps_partkey          int NOT NULL,\n    ps_suppkey     int NOT NULL,\n    ps_availqty    int NOT NULL,\n    ps_supplycost  decimal(15, 2)  NOT NULL,\n    ps_comment     VARCHAR(199) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`ps_partkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`ps_partkey`) BUCKETS {b['partsupp']}\n{order_by('partsupp', v)}{properties('partsupp', v)};")
     print("drop table if exists region;")
-    print(f"CREATE TABLE region  (\n    r_regionkey      int NOT NULL,\n    r_name       VARCHAR(25) NOT NULL,\n    r_comment    VARCHAR(152)\n)ENGINE=OLAP\nDUPLICATE KEY(`r_regionkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`r_regionkey`) BUCKETS {buckets('region', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\"\n);")
+    print(f"CREATE TABLE region  (\n    r_regionkey      int NOT NULL,\n    r_name       VARCHAR(25) NOT NULL,\n    r_comment    VARCHAR(152)\n)ENGINE=OLAP\nDUPLICATE KEY(`r_regionkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`r_regionkey`) BUCKETS {b['region']}\n{order_by('region', v)}{properties('region', v)};")
     print("drop table if exists supplier;")
-    print(f"CREATE TABLE supplier (\n    s_suppkey       int NOT NULL,\n    s_name        VARCHAR(25) NOT NULL,\n    s_address     VARCHAR(40) NOT NULL,\n    s_nationkey   int NOT NULL,\n    s_phone       VARCHAR(15) NOT NULL,\n    s_acctbal     decimal(15, 2) NOT NULL,\n    s_comment     VARCHAR(101) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`s_suppkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`s_suppkey`) BUCKETS {buckets('supplier', size)}\nPROPERTIES (\n    \"replication_num\" = \"3\"\n);")
+    print(f"CREATE TABLE supplier (\n    s_suppkey       int NOT NULL,\n    s_name        VARCHAR(25) NOT NULL,\n    s_address     VARCHAR(40) NOT NULL,\n    s_nationkey   int NOT NULL,\n    s_phone       VARCHAR(15) NOT NULL,\n    s_acctbal     decimal(15, 2) NOT NULL,\n    s_comment     VARCHAR(101) NOT NULL\n)ENGINE=OLAP\nDUPLICATE KEY(`s_suppkey`)\nCOMMENT \"OLAP\"\nDISTRIBUTED BY HASH(`s_suppkey`) BUCKETS {b['supplier']}\n{order_by('supplier', v)}{properties('supplier', v)};")
+    for stmt in materialized_views(v):
+        print(stmt)
 
 if __name__ == "__main__":
     main()
-
@@ -1,13 +1,25 @@
 import argparse
+import hashlib
+import heapq
+import http.client
 import os
 import subprocess
+import sys
 import time
 import json
+import mmap
+import random
 import threading
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
 
+import starrocks_http
+from tpch_checksum import fast_checksum
+from tpch_compress import CODECS, codec_for_path, compress_blocks
+from tpch_sanitize import BLOCK_BYTES, sanitize_blocks
+
 TABLES = [
     "customer",
     "lineitem",
@@ -84,108 +96,817 @@ def parse_result(proc: subprocess.CompletedProcess):
         pass
     return ok, out, loaded, filtered, total
 
-def load_one(fe_host: str, fe_port: int, db: str, table: str, user: str, password: str, file_path: Path, timeout_s: int, sanitize: bool = True):
-    url = f"http://{fe_host}:{fe_port}/api/{db}/{table}/_stream_load"
-    base_cmd = [
-        "curl",
-        "--location-trusted",
-        "-u",
-        f"{user}:{password}",
-        "-H",
-        "Expect:100-continue",
-        "-H",
-        f"timeout:{timeout_s}",
-        "-H",
-        "max_filter_ratio:0.2",
-        "-H",
-        "column_separator:|",
-        "-H",
-        "strict_mode:false",
-        "-H",
-        "row_delimiter:\n",
-        "-XPUT",
-        url,
-    ]
+SERVER_TIMINGS = (
+    "LoadTimeMs",
+    "BeginTxnTimeMs",
+    "StreamLoadPlanTimeMs",
+    "StreamLoadPutTimeMs",
+    "ReadDataTimeMs",
+    "WriteDataTimeMs",
+    "CommitAndPublishTimeMs",
+)
+
+def parse_server_timings(out: str) -> dict:
+    timings = {}
+    for name in SERVER_TIMINGS + ("LoadBytes",):
+        m = re.search(name + r"\"?\s*:\s*(\d+)", out)
+        if m:
+            timings[name] = int(m.group(1))
+    return timings
+
+def stream_load_headers(table: str, user: str, password: str, timeout_s: int, compression: str = None, label: str = None) -> dict:
+    # row_delimiter is left at the server default ("\n"); a raw newline is not a
+    # valid header value.
+    headers = {
+        "Authorization": starrocks_http.basic_auth(user, password),
+        "timeout": str(timeout_s),
+        "max_filter_ratio": "0.2",
+        "column_separator": "|",
+        "strict_mode": "false",
+    }
     cols = COLUMNS.get(table)
     if cols:
-        base_cmd[12:12] = ["-H", f"columns:{cols}"]
-    if sanitize:
-        cmd = base_cmd + ["--data-binary", "@-"]
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE, text=True)
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                if line.endswith("|\n"):
-                    line = line[:-2] + "\n"
-                elif line.endswith("|"):
-                    line = line[:-1]
-                proc.stdin.write(line)
+        headers["columns"] = cols
+    if compression:
+        headers["compression"] = CODECS[compression][1]
+    if label:
+        headers["label"] = label
+    return headers
+
+def stream_load(fe_host: str, fe_port: int, db: str, table: str, user: str, password: str, body, length, timeout_s: int, compression: str = None, label: str = None):
+    url = f"http://{fe_host}:{fe_port}/api/{db}/{table}/_stream_load"
+    args = ["PUT", url]
+    try:
+        code, data = starrocks_http.put(url, stream_load_headers(table, user, password, timeout_s, compression, label), body, length, timeout_s + 60)
+    except (OSError, RuntimeError, http.client.HTTPException) as e:
+        return subprocess.CompletedProcess(args, 1, "", f"{url}: {e!r}")
+    out = data.decode("utf-8", "replace")
+    if code != 200:
+        return subprocess.CompletedProcess(args, 1, out, f"{url}: HTTP {code}")
+    return subprocess.CompletedProcess(args, 0, out, "")
+
+def load_stream(fe_host: str, fe_port: int, db: str, table: str, user: str, password: str, blocks, timeout_s: int, compress: str = None, label: str = None):
+    if compress:
+        blocks = compress_blocks(blocks, compress)
+    return stream_load(fe_host, fe_port, db, table, user, password, blocks, None, timeout_s, compress, label)
+
+class RangeReader:
+    # readinto() over [offset, offset + length) of an fd with pread, so several
+    # chunks of one file can be read concurrently without sharing a position.
+    def __init__(self, fd: int, offset: int, length: int):
+        self.fd = fd
+        self.pos = offset
+        self.end = offset + length
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self.end - self.pos)
+        if n <= 0:
+            return 0
+        got = os.preadv(self.fd, [memoryview(b)[:n]], self.pos)
+        self.pos += got
+        return got
+
+    def read(self, size: int) -> bytes:
+        data = os.pread(self.fd, min(size, self.end - self.pos), self.pos)
+        self.pos += len(data)
+        return data
+
+def read_blocks(fin, block_bytes: int = BLOCK_BYTES):
+    while True:
+        block = fin.read(block_bytes)
+        if not block:
+            return
+        yield block
+
+def plan_ranges(file_path: Path, chunk_bytes: int):
+    # Line-aligned (offset, length) ranges of about chunk_bytes each: every
+    # boundary is moved forward to just past the first newline at or after it.
+    # Compressed files cannot be cut and always load whole.
+    size = file_path.stat().st_size
+    if size == 0:
+        return []
+    if chunk_bytes <= 0 or size <= chunk_bytes or codec_for_path(file_path):
+        return [(0, size)]
+    ranges = []
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            if size - start <= chunk_bytes:
+                end = size
+            else:
+                nl = mm.find(b"\n", start + chunk_bytes - 1)
+                end = size if nl == -1 else nl + 1
+            ranges.append((start, end - start))
+            start = end
+    return ranges
+
+def load_one(fe_host: str, fe_port: int, db: str, table: str, user: str, password: str, file_path: Path, timeout_s: int, sanitize: bool = True, offset: int = 0, length: int = None, compress: str = None, label: str = None):
+    with open(file_path, "rb", buffering=0) as f:
+        if length is None:
+            length = os.fstat(f.fileno()).st_size - offset
+        codec = codec_for_path(file_path)
+        if codec:
+            # Already compressed by tpch_gen (and sanitized before compression).
+            f.seek(offset)
+            return stream_load(fe_host, fe_port, db, table, user, password, f, length, timeout_s, codec, label)
+        reader = RangeReader(f.fileno(), offset, length)
+        if sanitize:
+            return load_stream(fe_host, fe_port, db, table, user, password, sanitize_blocks(reader), timeout_s, compress, label)
+        if compress:
+            return load_stream(fe_host, fe_port, db, table, user, password, read_blocks(reader), timeout_s, compress, label)
+        f.seek(offset)
+        return stream_load(fe_host, fe_port, db, table, user, password, f, length, timeout_s, None, label)
+
+PERMANENT_ERRORS = (
+    "too many filtered rows",
+    "unknown database",
+    "unknown table",
+    "access denied",
+    "not authorized",
+    "http 401",
+    "http 403",
+    "http 404",
+)
+
+def classify_result(proc: subprocess.CompletedProcess) -> str:
+    # "success", "exists" (the label was already loaded: the earlier attempt's
+    # response was lost or this is a resumed run), "retry" or "fail".
+    ok, out, _, _, _ = parse_result(proc)
+    if ok:
+        return "success"
+    if re.search(r"Status\"?\s*:\s*\"Label Already Exists\"", out):
+        m = re.search(r"ExistingJobStatus\"?\s*:\s*\"(\w+)\"", out)
+        if m and m.group(1).upper() == "RUNNING":
+            return "retry"
+        return "exists"
+    low = out.lower()
+    if any(e in low for e in PERMANENT_ERRORS):
+        return "fail"
+    return "retry"
+
+OVERLOAD_ERRORS = (
+    "timeout",
+    "timed out",
+    "memory",
+    "mem_limit",
+    "too many",
+    "busy",
+    "publish",
+    "connection",
+    "http 5",
+)
+
+def log_line(msg: str):
+    # One write per line so messages from worker threads do not interleave
+    # with the progress output.
+    sys.stdout.write(msg + "\n")
+    sys.stdout.flush()
+
+def is_overload(proc: subprocess.CompletedProcess) -> bool:
+    out = ((proc.stdout or "") + (proc.stderr or "")).lower()
+    return any(e in out for e in OVERLOAD_ERRORS)
+
+class AdaptiveLimiter:
+    # AIMD gate on in-flight loads. Every completed attempt reports its bytes,
+    # latency and whether it failed with an overload symptom. An overload error
+    # halves the limit at once; otherwise, once a window of max(limit, 4)
+    # attempts has finished, the limit grows by one unless per-byte latency has
+    # inflated beyond latency_slack x the best window seen without the aggregate
+    # throughput improving, in which case it shrinks by one.
+    def __init__(self, initial: int, min_limit: int, max_limit: int, decrease: float = 0.5, latency_slack: float = 1.5, log=log_line):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.decrease = decrease
+        self.latency_slack = latency_slack
+        self.log = log
+        self.cond = threading.Condition()
+        self.inflight = 0
+        self.prev_tput = 0.0
+        self.best_lat = None
+        self.reset_window()
+
+    def reset_window(self):
+        self.window_start = time.perf_counter()
+        self.window_bytes = 0
+        self.window_secs = 0.0
+        self.window_n = 0
+
+    def acquire(self):
+        with self.cond:
+            while self.inflight >= self.limit:
+                self.cond.wait()
+            self.inflight += 1
+
+    def release(self, nbytes: int, seconds: float, overloaded: bool):
+        with self.cond:
+            self.inflight -= 1
+            self.window_bytes += nbytes
+            self.window_secs += seconds
+            self.window_n += 1
+            if overloaded:
+                self.set_limit(int(self.limit * self.decrease), "overload error")
+            elif self.window_n >= max(self.limit, 4):
+                self.adjust()
+            self.cond.notify_all()
+
+    def adjust(self):
+        elapsed = time.perf_counter() - self.window_start
+        tput = self.window_bytes / elapsed if elapsed > 0 else 0.0
+        lat = self.window_secs / self.window_bytes if self.window_bytes else 0.0
+        if self.best_lat is None or 0 < lat < self.best_lat:
+            self.best_lat = lat
+        if lat > self.best_lat * self.latency_slack and tput <= self.prev_tput * 1.05:
+            new, reason = self.limit - 1, "latency up, throughput flat"
+        else:
+            new, reason = self.limit + 1, "probe" if tput <= self.prev_tput * 1.05 else "throughput up"
+        self.prev_tput = tput
+        self.set_limit(new, f"{reason}: {tput / (1024 ** 2):.1f}MB/s {lat * (1024 ** 3):.1f}s/GB")
+
+    def set_limit(self, new: int, reason: str):
+        new = min(self.max_limit, max(self.min_limit, new))
+        if new != self.limit:
+            self.log(f"[adaptive] concurrency {self.limit} -> {new} ({reason})")
+        self.limit = new
+        self.reset_window()
+
+class Endpoints:
+    # Stream Load targets: FE HTTP ports, or BE HTTP ports when loading
+    # directly. Each attempt goes to the healthy endpoint with the fewest loads
+    # in flight (ties rotate). An attempt that gets no HTTP 200 back is an
+    # endpoint error; max_failures consecutive errors take the endpoint out for
+    # cooldown_s, doubled for every further error up to max_cooldown_s. When
+    # every endpoint is out the one due back first is used, so loads never
+    # wait on health alone.
+    def __init__(self, endpoints: list, max_failures: int = 3, cooldown_s: float = 30.0, max_cooldown_s: float = 600.0, log=log_line):
+        if not endpoints:
+            raise SystemExit("no Stream Load endpoints")
+        self.order = list(dict.fromkeys(endpoints))
+        self.max_failures = max(1, max_failures)
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.log = log
+        self.lock = threading.Lock()
+        self.next = 0
+        self.stats = {ep: {"inflight": 0, "jobs": 0, "bytes": 0, "seconds": 0.0, "errors": 0, "failures": 0, "down_until": 0.0} for ep in self.order}
+
+    def usable(self, now: float) -> list:
+        return [ep for ep in self.order if self.stats[ep]["down_until"] <= now]
+
+    def acquire(self, avoid=None):
+        with self.lock:
+            up = self.usable(time.time())
+            cands = [ep for ep in up if ep != avoid] or up or [min(self.order, key=lambda e: self.stats[e]["down_until"])]
+            n = len(self.order)
+            ep = min(cands, key=lambda e: (self.stats[e]["inflight"], (self.order.index(e) - self.next) % n))
+            self.next = (self.order.index(ep) + 1) % n
+            self.stats[ep]["inflight"] += 1
+            return ep
+
+    def release(self, ep, loaded_bytes: int, seconds: float, error: bool):
+        with self.lock:
+            st = self.stats[ep]
+            st["inflight"] -= 1
+            st["seconds"] += seconds
+            if not error:
+                st["jobs"] += 1
+                st["bytes"] += loaded_bytes
+                if st["failures"] >= self.max_failures:
+                    self.log(f"[endpoint] {ep[0]}:{ep[1]} back up")
+                st["failures"] = 0
+                return
+            st["errors"] += 1
+            st["failures"] += 1
+            if st["failures"] >= self.max_failures:
+                cooldown = min(self.max_cooldown_s, self.cooldown_s * 2 ** (st["failures"] - self.max_failures))
+                st["down_until"] = time.time() + cooldown
+                self.log(f"[endpoint] {ep[0]}:{ep[1]} out for {cooldown:.0f}s after {st['failures']} consecutive errors")
+
+    def has_other(self, ep) -> bool:
+        with self.lock:
+            return any(e != ep for e in self.usable(time.time()))
+
+    def summary(self) -> dict:
+        now = time.time()
+        with self.lock:
+            return {f"{h}:{p}": {
+                "jobs": st["jobs"],
+                "bytes": st["bytes"],
+                "seconds": round(st["seconds"], 3),
+                "errors": st["errors"],
+                "up": st["down_until"] <= now,
+            } for (h, p), st in self.stats.items()}
+
+class LoadMetrics:
+    # Per-job records go to a JSON-lines report as they finish; totals, a
+    # rolling throughput over the last window_s seconds and the ETA are
+    # printed and, if prom_path is set, written as a Prometheus textfile
+    # (node_exporter textfile collector format, replaced atomically).
+    def __init__(self, total_bytes: int, report_path: Path = None, prom_path: Path = None, window_s: float = 30.0, endpoints: Endpoints = None):
+        self.total_bytes = total_bytes
+        self.prom_path = prom_path
+        self.endpoints = endpoints
+        self.window_s = window_s
+        self.start = time.time()
+        self.done_bytes = 0
+        self.done_rows = 0
+        self.recent = []
+        self.tables = {}
+        self.report = None
+        if report_path is not None:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            self.report = open(report_path, "w", encoding="utf-8")
+        self.last_print = 0.0
+
+    def record(self, job: dict, state: str, attempts: int, seconds: float, loaded_rows: int, filtered_rows: int, out: str, endpoint: str = None):
+        now = time.time()
+        timings = parse_server_timings(out)
+        self.done_bytes += job["length"]
+        self.done_rows += loaded_rows
+        self.recent.append((now, job["length"], loaded_rows))
+        while self.recent and self.recent[0][0] < now - self.window_s:
+            self.recent.pop(0)
+        tm = self.tables.setdefault(job["table"], {"bytes": 0, "rows": 0, "seconds": 0.0, "jobs": {}, "server_ms": {}})
+        tm["bytes"] += job["length"]
+        tm["rows"] += loaded_rows
+        tm["seconds"] += seconds
+        tm["jobs"][state] = tm["jobs"].get(state, 0) + 1
+        for k, v in timings.items():
+            if k.endswith("TimeMs"):
+                tm["server_ms"][k] = tm["server_ms"].get(k, 0) + v
+        if self.report is not None:
+            self.report.write(json.dumps({
+                "ts": round(now, 3),
+                "table": job["table"],
+                "label": job["label"],
+                "file": job["rel"],
+                "offset": job["offset"],
+                "bytes": job["length"],
+                "seconds": round(seconds, 3),
+                "mb_s": round(job["length"] / (1024 ** 2) / seconds, 2) if seconds > 0 else 0.0,
+                "status": state,
+                "attempts": attempts,
+                "loaded_rows": loaded_rows,
+                "filtered_rows": filtered_rows,
+                "endpoint": endpoint,
+                "server": timings,
+            }) + "\n")
+            self.report.flush()
+
+    def rate(self):
+        now = time.time()
+        span = min(self.window_s, now - self.start)
+        nbytes = sum(b for _, b, _ in self.recent)
+        nrows = sum(r for _, _, r in self.recent)
+        if span <= 0:
+            return 0.0, 0.0
+        return nbytes / span, nrows / span
+
+    def eta(self) -> float:
+        bps, _ = self.rate()
+        left = self.total_bytes - self.done_bytes
+        return left / bps if bps > 0 else float("inf")
+
+    def line(self) -> str:
+        bps, rps = self.rate()
+        eta = self.eta()
+        eta_s = "--" if eta == float("inf") else f"{int(eta) // 3600}h{int(eta) % 3600 // 60:02d}m{int(eta) % 60:02d}s"
+        return f"[rate] {bps / (1024 ** 2):.1f}MB/s {rps:.0f}rows/s done={self.done_bytes / (1024 ** 3):.2f}/{self.total_bytes / (1024 ** 3):.2f}GB eta={eta_s}"
+
+    def tick(self, force: bool = False, interval_s: float = 5.0):
+        now = time.time()
+        if not force and now - self.last_print < interval_s:
+            return
+        self.last_print = now
+        log_line(self.line())
+        self.write_prom()
+
+    def write_prom(self):
+        if self.prom_path is None:
+            return
+        bps, rps = self.rate()
+        eta = self.eta()
+        lines = [
+            "# HELP tpch_load_bytes_total Bytes loaded by table.",
+            "# TYPE tpch_load_bytes_total counter",
+        ]
+        lines += [f'tpch_load_bytes_total{{table="{t}"}} {m["bytes"]}' for t, m in self.tables.items()]
+        lines += ["# HELP tpch_load_rows_total Rows loaded by table.", "# TYPE tpch_load_rows_total counter"]
+        lines += [f'tpch_load_rows_total{{table="{t}"}} {m["rows"]}' for t, m in self.tables.items()]
+        lines += ["# HELP tpch_load_jobs_total Finished load jobs by table and status.", "# TYPE tpch_load_jobs_total counter"]
+        lines += [f'tpch_load_jobs_total{{table="{t}",status="{st}"}} {n}' for t, m in self.tables.items() for st, n in m["jobs"].items()]
+        lines += ["# HELP tpch_load_client_seconds_total Client-side wall time spent in load jobs by table.", "# TYPE tpch_load_client_seconds_total counter"]
+        lines += [f'tpch_load_client_seconds_total{{table="{t}"}} {m["seconds"]:.3f}' for t, m in self.tables.items()]
+        lines += ["# HELP tpch_load_server_ms_total Server-side Stream Load timings by table and phase.", "# TYPE tpch_load_server_ms_total counter"]
+        lines += [f'tpch_load_server_ms_total{{table="{t}",phase="{ph}"}} {v}' for t, m in self.tables.items() for ph, v in m["server_ms"].items()]
+        lines += [
+            "# HELP tpch_load_throughput_bytes Rolling load throughput in bytes per second.",
+            "# TYPE tpch_load_throughput_bytes gauge",
+            f"tpch_load_throughput_bytes {bps:.1f}",
+            "# HELP tpch_load_throughput_rows Rolling load throughput in rows per second.",
+            "# TYPE tpch_load_throughput_rows gauge",
+            f"tpch_load_throughput_rows {rps:.1f}",
+            "# HELP tpch_load_remaining_bytes Bytes not loaded yet.",
+            "# TYPE tpch_load_remaining_bytes gauge",
+            f"tpch_load_remaining_bytes {self.total_bytes - self.done_bytes}",
+            "# HELP tpch_load_eta_seconds Estimated seconds to completion at the rolling rate.",
+            "# TYPE tpch_load_eta_seconds gauge",
+            f"tpch_load_eta_seconds {-1 if eta == float('inf') else round(eta, 1)}",
+        ]
+        if self.endpoints is not None:
+            eps = self.endpoints.summary()
+            lines += ["# HELP tpch_load_endpoint_bytes_total Bytes loaded through each Stream Load endpoint.", "# TYPE tpch_load_endpoint_bytes_total counter"]
+            lines += [f'tpch_load_endpoint_bytes_total{{endpoint="{ep}"}} {m["bytes"]}' for ep, m in eps.items()]
+            lines += ["# HELP tpch_load_endpoint_errors_total Attempts that got no HTTP 200 from the endpoint.", "# TYPE tpch_load_endpoint_errors_total counter"]
+            lines += [f'tpch_load_endpoint_errors_total{{endpoint="{ep}"}} {m["errors"]}' for ep, m in eps.items()]
+            lines += ["# HELP tpch_load_endpoint_up Whether the endpoint currently receives loads.", "# TYPE tpch_load_endpoint_up gauge"]
+            lines += [f'tpch_load_endpoint_up{{endpoint="{ep}"}} {int(m["up"])}' for ep, m in eps.items()]
+        tmp = Path(str(self.prom_path) + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.prom_path)
+
+    def close(self):
+        elapsed = time.time() - self.start
+        if self.report is not None:
+            self.report.write(json.dumps({
+                "summary": True,
+                "seconds": round(elapsed, 3),
+                "bytes": self.done_bytes,
+                "rows": self.done_rows,
+                "mb_s": round(self.done_bytes / (1024 ** 2) / elapsed, 2) if elapsed > 0 else 0.0,
+                "tables": self.tables,
+                "endpoints": self.endpoints.summary() if self.endpoints is not None else {},
+            }) + "\n")
+            self.report.close()
+        self.write_prom()
+
+def parse_lanes(spec) -> dict:
+    # "nation=1,region=1,supplier=2" or {"nation": 1, ...} -> {table: workers}
+    if not spec:
+        return {}
+    if isinstance(spec, dict):
+        items = spec.items()
+    else:
+        items = [kv.split("=", 1) for kv in spec.split(",") if kv.strip()]
+    lanes = {}
+    for t, n in items:
+        t = t.strip()
+        if t not in TABLES:
+            raise SystemExit(f"unknown table in lanes: {t}")
+        lanes[t] = max(1, int(n))
+    return lanes
+
+def lpt_makespan(durations, workers: int) -> float:
+    # Longest-processing-time-first list scheduling on identical workers.
+    finish = [0.0] * max(1, workers)
+    for d in sorted(durations, reverse=True):
+        t = heapq.heappop(finish)
+        heapq.heappush(finish, t + d)
+    return max(finish)
+
+# Retries go to another endpoint when one is usable, and fail over at once
+# (without backoff) when the endpoint itself did not answer. Returns the
+# endpoint of the last attempt as "host:port".
+def load_with_retry(endpoints: Endpoints, db: str, table: str, user: str, password: str, file_path: Path, timeout_s: int, sanitize: bool, offset: int, length: int, compress: str, label: str, retries: int, backoff_s: float, limiter: AdaptiveLimiter = None):
+    attempt = 0
+    started = time.perf_counter()
+    avoid = None
+    while True:
+        attempt += 1
+        if limiter is not None:
+            limiter.acquire()
+        ep = endpoints.acquire(avoid)
+        t0 = time.perf_counter()
         try:
-            proc.stdin.flush()
+            proc = load_one(ep[0], ep[1], db, table, user, password, file_path, timeout_s, sanitize, offset, length, compress, label)
         except Exception:
-            pass
-        proc.stdin.close()
-        out = proc.stdout.read() if proc.stdout else ""
-        err = proc.stderr.read() if proc.stderr else ""
-        ret = proc.wait()
-        return subprocess.CompletedProcess(cmd, ret, out, err)
-    else:
-        cmd = base_cmd + ["-T", str(file_path)]
-        return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            endpoints.release(ep, 0, time.perf_counter() - t0, True)
+            if limiter is not None:
+                limiter.release(0, 0.0, True)
+            raise
+        dt = time.perf_counter() - t0
+        state = classify_result(proc)
+        endpoints.release(ep, (length or 0) if state == "success" else 0, dt, proc.returncode != 0)
+        if limiter is not None:
+            limiter.release(length or 0, dt, state == "retry" and is_overload(proc))
+        if state != "retry" or attempt > retries:
+            return proc, state, attempt, time.perf_counter() - started, f"{ep[0]}:{ep[1]}"
+        avoid = ep
+        if proc.returncode != 0 and endpoints.has_other(ep):
+            continue
+        time.sleep(backoff_s * (2 ** (attempt - 1)) * random.uniform(1.0, 1.5))
+
+def job_label(prefix: str, run_id: str, table: str, rel: str, offset: int, length: int) -> str:
+    digest = hashlib.sha1(f"{rel}:{offset}:{length}".encode("utf-8")).hexdigest()[:16]
+    return f"{prefix}_{run_id}_{table}_{digest}"
+
+class LoadManifest:
+    # JSON-lines file: a header line with the run id and the plan it was made
+    # from (chunk_mb and {file: size}), then one record per finished job. The
+    # run id is part of every label, so a resumed run reuses the labels of the
+    # interrupted one and a fresh run never collides with them. An existing
+    # manifest is never overwritten: without resume the run is refused unless
+    # fresh, which moves the old file aside to <name>.<its run_id>.
+    def __init__(self, path: Path, resume: bool, plan: dict = None, fresh: bool = False):
+        self.path = path
+        self.records = {}
+        self.header = {}
+        self.run_id = None
+        if resume and path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "label" in rec:
+                        self.records[rec["label"]] = rec
+                    elif "run_id" in rec:
+                        self.header = rec
+                        self.run_id = rec["run_id"]
+        elif path.exists() and path.stat().st_size:
+            old = self.read_header(path)
+            if not fresh:
+                raise SystemExit(f"{path} holds run {old.get('run_id')}; pass --resume to continue it or --fresh to start a new run (the old manifest is kept)")
+            kept = path.with_name(f"{path.name}.{old.get('run_id') or time.strftime('%Y%m%d%H%M%S')}")
+            os.replace(path, kept)
+            print(f"manifest: previous run moved to {kept}")
+        if self.run_id is not None:
+            self.f = open(path, "a", encoding="utf-8")
+            if path.stat().st_size and not path.read_bytes().endswith(b"\n"):
+                self.f.write("\n")
+        else:
+            self.records = {}
+            self.run_id = time.strftime("%Y%m%d%H%M%S")
+            self.header = dict(plan or {}, run_id=self.run_id, started=time.strftime("%Y-%m-%d %H:%M:%S"))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.f = open(path, "w", encoding="utf-8")
+            self.write(self.header)
+
+    @staticmethod
+    def read_header(path: Path) -> dict:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if "run_id" in rec and "label" not in rec:
+                    return rec
+        return {}
+
+    # Differences between the plan of the resumed run and plan; labels hash
+    # file, offset and length, so a different plan would load the same rows
+    # again under new labels. Manifests that predate the plan header pass.
+    def plan_conflicts(self, plan: dict) -> list:
+        out = []
+        if "chunk_mb" in self.header and self.header["chunk_mb"] != plan["chunk_mb"]:
+            out.append(f"chunk_mb {self.header['chunk_mb']} -> {plan['chunk_mb']}")
+        old = self.header.get("files")
+        if old is not None:
+            for rel in sorted(set(old) | set(plan["files"])):
+                if old.get(rel) != plan["files"].get(rel):
+                    out.append(f"{rel}: size {old.get(rel)} -> {plan['files'].get(rel)}")
+        return out
+
+    # "loaded" if the label was loaded from a range whose file size and
+    # checksum still match, "conflict" if it was loaded from other bytes,
+    # None if it still has to be loaded.
+    def range_state(self, label: str, file_path: Path, offset: int, length: int):
+        rec = self.records.get(label)
+        if not rec or rec.get("status") not in ("success", "exists"):
+            return None
+        if rec.get("size") == file_path.stat().st_size and rec.get("checksum") == fast_checksum(file_path, offset, length):
+            return "loaded"
+        return "conflict"
+
+    def write(self, rec: dict):
+        self.f.write(json.dumps(rec) + "\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        if "label" in rec:
+            self.records[rec["label"]] = rec
+
+    def close(self):
+        self.f.close()
+
+def parse_endpoints(spec, default_port: int) -> list:
+    # "fe1:8030,fe2" or ["fe1:8030", "fe2"] -> [(host, port)]
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    endpoints = []
+    for item in spec or []:
+        item = str(item).strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        endpoints.append((host, int(port or default_port)))
+    return endpoints
+
+# BE HTTP endpoints of the alive, not decommissioned backends, from SHOW
+# BACKENDS on the first FE that answers.
+def discover_backends(fe_hosts: list, query_port: int, user: str, password: str) -> list:
+    import mysql_client
+    err = None
+    for host in fe_hosts:
+        try:
+            conn = mysql_client.Connection(host, query_port, user, password, timeout=30)
+        except (OSError, mysql_client.MySQLError) as e:
+            err = e
+            continue
+        try:
+            res = conn.query("show backends")
+        finally:
+            conn.close()
+        backends = []
+        for row in res["rows"]:
+            r = dict(zip(res["columns"], row))
+            if (r.get("Alive") or "").lower() != "true" or (r.get("SystemDecommissioned") or "").lower() == "true":
+                continue
+            backends.append((r.get("IP") or r.get("Host"), int(r["HttpPort"])))
+        return backends
+    raise SystemExit(f"SHOW BACKENDS failed on {','.join(fe_hosts)}: {err}")
+
+def read_config(path) -> dict:
+    cfg_path = Path(path)
+    if not cfg_path.exists():
+        raise SystemExit("config file not found")
+    with open(cfg_path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--config")
     p.add_argument("--fe-host")
     p.add_argument("--fe-port", type=int)
+    p.add_argument("--fe-hosts")
+    p.add_argument("--direct-be", action="store_true")
+    p.add_argument("--fe-query-port", type=int)
+    p.add_argument("--endpoint-failures", type=int)
+    p.add_argument("--endpoint-cooldown", type=float)
     p.add_argument("--db")
     p.add_argument("--user")
     p.add_argument("--password")
     p.add_argument("--data-dir")
     p.add_argument("--concurrency", type=int)
+    p.add_argument("--adaptive", action="store_true")
+    p.add_argument("--min-concurrency", type=int)
+    p.add_argument("--max-concurrency", type=int)
+    p.add_argument("--order", choices=["size", "name"])
+    p.add_argument("--lanes")
+    p.add_argument("--assume-mbps", type=float)
+    p.add_argument("--report")
+    p.add_argument("--prom-file")
     p.add_argument("--timeout", type=int)
     p.add_argument("--progress", action="store_true")
     p.add_argument("--sanitize", action="store_true")
+    p.add_argument("--chunk-mb", type=int)
+    p.add_argument("--compress", choices=list(CODECS.keys()))
+    p.add_argument("--manifest")
+    p.add_argument("--resume", action="store_true")
+    p.add_argument("--fresh", action="store_true")
+    p.add_argument("--label-prefix")
+    p.add_argument("--retries", type=int)
+    p.add_argument("--retry-backoff", type=float)
     args = p.parse_args()
     cfg = {}
     if args.config:
-        cfg_path = Path(args.config)
-        if not cfg_path.exists():
-            raise SystemExit("config file not found")
-        with open(cfg_path, "r", encoding="utf-8") as f:
-            cfg = json.load(f)
+        cfg = read_config(args.config)
     fe_host = args.fe_host or cfg.get("fe_host") or cfg.get("fe_host_name")
     fe_port = args.fe_port or cfg.get("fe_http_port") or cfg.get("fe_port")
+    fe_hosts = args.fe_hosts or cfg.get("fe_hosts")
+    direct_be = args.direct_be or bool(cfg.get("direct_be", False))
+    query_port = args.fe_query_port or cfg.get("fe_query_port") or 9030
+    endpoint_failures = args.endpoint_failures or int(cfg.get("endpoint_failures", 3))
+    endpoint_cooldown = args.endpoint_cooldown if args.endpoint_cooldown is not None else float(cfg.get("endpoint_cooldown", 30.0))
     db = args.db or cfg.get("db") or cfg.get("database")
     user = args.user or cfg.get("user") or cfg.get("username")
     password = args.password or cfg.get("password")
     data_dir = args.data_dir or cfg.get("data_dir")
     concurrency = args.concurrency or cfg.get("concurrency", 10)
+    adaptive = args.adaptive or bool(cfg.get("adaptive", False))
+    min_concurrency = args.min_concurrency or cfg.get("min_concurrency", 1)
+    max_concurrency = args.max_concurrency or cfg.get("max_concurrency", concurrency * 4)
     timeout = args.timeout or cfg.get("timeout", 3600)
     progress = args.progress or bool(cfg.get("progress", True))
     sanitize = args.sanitize or bool(cfg.get("sanitize", True))
-    if not all([fe_host, fe_port, db, user, password, data_dir]):
+    compress = args.compress or cfg.get("compress")
+    chunk_mb = args.chunk_mb if args.chunk_mb is not None else int(cfg.get("chunk_mb", 0))
+    retries = args.retries if args.retries is not None else int(cfg.get("retries", 3))
+    backoff = args.retry_backoff if args.retry_backoff is not None else float(cfg.get("retry_backoff", 5.0))
+    label_prefix = args.label_prefix or cfg.get("label_prefix") or "tpch"
+    order = args.order or cfg.get("order") or "size"
+    lanes = parse_lanes(args.lanes or cfg.get("lanes"))
+    assume_mbps = args.assume_mbps or cfg.get("assume_mbps")
+    if not all([fe_host or fe_hosts, fe_port, db, user, password, data_dir]):
         raise SystemExit("missing required settings: fe_host, fe_port, db, user, password, data_dir")
+    fe_list = parse_endpoints(fe_hosts or fe_host, int(fe_port))
+    if direct_be:
+        targets = discover_backends([h for h, _ in fe_list], int(query_port), user, password)
+        if not targets:
+            raise SystemExit("SHOW BACKENDS returned no alive backend")
+    else:
+        targets = fe_list
+    endpoints = Endpoints(targets, endpoint_failures, endpoint_cooldown)
+    print(f"endpoints: {'be' if direct_be else 'fe'} " + ",".join(f"{h}:{p}" for h, p in targets))
+    if args.resume and args.fresh:
+        raise SystemExit("--resume and --fresh are mutually exclusive")
     root = Path(data_dir).absolute()
+    table_files = {t: find_files(root / t) for t in TABLES}
+    plan = {"chunk_mb": chunk_mb, "files": {str(f.relative_to(root)): f.stat().st_size for fs in table_files.values() for f in fs}}
+    manifest = LoadManifest(Path(args.manifest or cfg.get("manifest") or root / "_load_manifest.jsonl"), args.resume, plan, args.fresh)
+    changed = manifest.plan_conflicts(plan) if args.resume else []
+    if changed:
+        manifest.close()
+        raise SystemExit(f"resume: run {manifest.run_id} was planned differently, refusing to load under new labels:\n  " + "\n  ".join(changed)
+                         + "\nrestore the original chunk_mb and files, or start over with --fresh")
     jobs = []
+    files = {}
+    skipped = 0
+    conflicts = []
     for t in TABLES:
-        tdir = root / t
-        for f in find_files(tdir):
-            jobs.append((t, f))
+        for f in table_files[t]:
+            files[t] = files.get(t, 0) + 1
+            rel = str(f.relative_to(root))
+            for offset, length in plan_ranges(f, chunk_mb * 1024 * 1024):
+                label = job_label(label_prefix, manifest.run_id, t, rel, offset, length)
+                state = manifest.range_state(label, f, offset, length)
+                if state == "loaded":
+                    skipped += 1
+                    continue
+                if state == "conflict":
+                    conflicts.append(f"{rel} [{offset}, {offset + length}) label={label}")
+                    continue
+                jobs.append({"table": t, "file": f, "rel": rel, "offset": offset, "length": length, "label": label})
+    if conflicts:
+        manifest.close()
+        raise SystemExit(f"resume: {len(conflicts)} ranges were loaded from bytes that no longer match (size or checksum changed), not loading them again:\n  "
+                         + "\n  ".join(conflicts) + "\nstart over with --fresh after truncating the tables")
+    if skipped:
+        print(f"resume: run_id={manifest.run_id} skipped={skipped} already loaded, remaining={len(jobs)}")
+    if order == "size":
+        # Largest first, so the run does not end on one huge lineitem file.
+        jobs.sort(key=lambda j: j["length"], reverse=True)
+    main_workers = max(1, concurrency - sum(lanes.values()))
+    pools = {"*": [j for j in jobs if j["table"] not in lanes]}
+    for t in lanes:
+        pools[t] = [j for j in jobs if j["table"] == t]
+    pool_workers = {name: lanes.get(name, main_workers) for name in pools}
+    if assume_mbps:
+        rate = assume_mbps * 1024 * 1024
+        predicted = max((lpt_makespan([j["length"] / rate for j in pj], pool_workers[name]) for name, pj in pools.items() if pj), default=0.0)
+        print(f"plan: jobs={len(jobs)} bytes={sum(j['length'] for j in jobs) / (1024 ** 3):.2f}GB predicted_makespan={predicted:.1f}s at {assume_mbps:.0f}MB/s per load")
     totals = {}
-    for t, _ in jobs:
-        totals[t] = totals.get(t, 0) + 1
-    status = {t: {"done": 0, "success": 0, "fail": 0, "total": totals.get(t, 0), "loaded_rows": 0, "filtered_rows": 0} for t in totals}
+    for job in jobs:
+        totals[job["table"]] = totals.get(job["table"], 0) + 1
+    status = {t: {"done": 0, "success": 0, "fail": 0, "total": totals.get(t, 0), "files": files.get(t, 0), "loaded_rows": 0, "filtered_rows": 0} for t in TABLES if t in totals}
     lock = threading.Lock()
     results = []
-    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+    report_path = args.report or cfg.get("report") or root / "_load_report.jsonl"
+    prom_path = args.prom_file or cfg.get("prom_file")
+    metrics = LoadMetrics(sum(j["length"] for j in jobs), Path(report_path), Path(prom_path) if prom_path else None, endpoints=endpoints)
+    # Reserved lanes run outside the adaptive limiter so they always make progress.
+    limiter = AdaptiveLimiter(main_workers, min_concurrency, max_concurrency) if adaptive else None
+    busy = {name: [] for name in pools}
+    t_start = time.perf_counter()
+    with ExitStack() as stack:
         futs = {}
-        for t, f in jobs:
-            fut = ex.submit(load_one, fe_host, int(fe_port), db, t, user, password, f, int(timeout), sanitize)
-            futs[ fut ] = (t, f)
+        for name, pool_jobs in pools.items():
+            if not pool_jobs:
+                continue
+            workers = limiter.max_limit if limiter and name == "*" else pool_workers[name]
+            ex = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+            for job in pool_jobs:
+                fut = ex.submit(load_with_retry, endpoints, db, job["table"], user, password, job["file"], int(timeout), sanitize, job["offset"], job["length"], compress, job["label"], retries, backoff, limiter if name == "*" else None)
+                futs[ fut ] = job
         for fu in as_completed(list(futs.keys())):
-            t, f = futs[fu]
-            proc = fu.result()
-            ok, out, loaded_rows, filtered_rows, total_rows = parse_result(proc)
+            job = futs[fu]
+            t = job["table"]
+            try:
+                proc, state, attempts, seconds, endpoint = fu.result()
+            except Exception as e:
+                # Record it like any failed job so the finished ones still
+                # reach the manifest and --resume retries only this range.
+                proc = subprocess.CompletedProcess(["PUT", job["rel"]], 1, "", f"{job['rel']}: {e!r}")
+                state, attempts, seconds, endpoint = "fail", 1, 0.0, None
+            busy[t if t in lanes else "*"].append((job["length"], seconds))
+            ok = state in ("success", "exists")
+            _, out, loaded_rows, filtered_rows, total_rows = parse_result(proc)
+            manifest.write({
+                "label": job["label"],
+                "table": t,
+                "file": job["rel"],
+                "offset": job["offset"],
+                "length": job["length"],
+                "size": job["file"].stat().st_size,
+                "checksum": fast_checksum(job["file"], job["offset"], job["length"]),
+                "status": state,
+                "attempts": attempts,
+                "loaded_rows": loaded_rows,
+                "filtered_rows": filtered_rows,
+                "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            metrics.record(job, state, attempts, seconds, loaded_rows, filtered_rows, out, endpoint)
             with lock:
                 st = status[t]
                 st["done"] += 1
@@ -202,8 +923,12 @@ def main():
                     bars = int((done / total) * 20) if total else 20
                     bar = "#" * bars + "." * (20 - bars)
                     print(f"{t}: [{bar}] {done}/{total} {pct}% success={st['success']} fail={st['fail']} loaded_rows={st['loaded_rows']} filtered_rows={st['filtered_rows']}")
-            results.append(proc)
-    failed = [r for r in results if r.returncode != 0]
+                    metrics.tick()
+            results.append((proc, ok))
+    manifest.close()
+    metrics.close()
+    actual = time.perf_counter() - t_start
+    failed = [r for r, ok in results if not ok]
     if failed:
         print("\n=== Failed Responses ===")
         for r in failed:
@@ -213,7 +938,29 @@ def main():
         print("\n=== Load Summary ===")
         for t in status:
             st = status[t]
-            print(f"{t}: files={st['total']} success={st['success']} fail={st['fail']} loaded_rows={st['loaded_rows']} filtered_rows={st['filtered_rows']}")
+            print(f"{t}: files={st['files']} jobs={st['total']} success={st['success']} fail={st['fail']} loaded_rows={st['loaded_rows']} filtered_rows={st['filtered_rows']}")
+        # Predicted makespan replays the LPT schedule with each job's duration
+        # estimated from the per-load rate observed in its pool.
+        predicted = 0.0
+        lower = 0.0
+        for name, samples in busy.items():
+            if not samples:
+                continue
+            nbytes = sum(b for b, _ in samples)
+            secs = sum(d for _, d in samples)
+            rate = nbytes / secs if secs > 0 else 0.0
+            durations = [b / rate if rate > 0 else d for b, d in samples]
+            workers = limiter.limit if limiter and name == "*" else pool_workers[name]
+            predicted = max(predicted, lpt_makespan(durations, workers))
+            lower = max(lower, sum(durations) / workers, max(durations))
+        print(f"makespan: actual={actual:.1f}s predicted_lpt={predicted:.1f}s lower_bound={lower:.1f}s")
+        elapsed = actual if actual > 0 else 1.0
+        print(f"throughput: {metrics.done_bytes / (1024 ** 2) / elapsed:.1f}MB/s {metrics.done_rows / elapsed:.0f}rows/s report={report_path}")
+        # Per endpoint: share of the wall-clock throughput, and the rate of a
+        # single load through it (bytes over the time its attempts took).
+        for ep, m in endpoints.summary().items():
+            per_load = m["bytes"] / (1024 ** 2) / m["seconds"] if m["seconds"] > 0 else 0.0
+            print(f"endpoint {ep}: jobs={m['jobs']} {m['bytes'] / (1024 ** 3):.2f}GB {m['bytes'] / (1024 ** 2) / elapsed:.1f}MB/s per_load={per_load:.1f}MB/s errors={m['errors']} {'up' if m['up'] else 'down'}")
     
     if failed:
         raise SystemExit(1)
@@ -0,0 +1,277 @@
+import io
+import json
+import socket
+import subprocess
+import threading
+import time
+
+import pytest
+
+import fake_starrocks
+import starrocks_http
+import starrocks_stream_load as loader
+from tpch_sanitize import sanitize_blocks
+
+ROWS = b"".join(b"%d|row %d|%s|\n" % (i, i, b"x" * (i % 37)) for i in range(2000))
+
+def proc(out: dict, returncode: int = 0):
+    return subprocess.CompletedProcess(["PUT"], returncode, json.dumps(out), "")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def fake():
+    fe, be, state = fake_starrocks.start()
+    yield fe[0].server_address[1], be[0].server_address[1], state
+    for srv in fe + be:
+        srv.shutdown()
+        srv.server_close()
+
+def write_rows(tmp_path, name: str = "lineitem.tbl.1"):
+    path = tmp_path / name
+    path.write_bytes(ROWS)
+    return path
+
+def test_plan_ranges_line_aligned(tmp_path):
+    path = write_rows(tmp_path)
+    ranges = loader.plan_ranges(path, 4096)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    for (off, n), (nxt, _) in zip(ranges, ranges[1:]):
+        assert off + n == nxt
+        assert n >= 4096
+    assert sum(n for _, n in ranges) == len(ROWS)
+    assert all(ROWS[off + n - 1:off + n] == b"\n" for off, n in ranges)
+
+def test_plan_ranges_whole_file(tmp_path):
+    path = write_rows(tmp_path)
+    assert loader.plan_ranges(path, 0) == [(0, len(ROWS))]
+    assert loader.plan_ranges(path, len(ROWS)) == [(0, len(ROWS))]
+    gz = tmp_path / "lineitem.tbl.2.gz"
+    gz.write_bytes(b"\n" * 100)
+    assert loader.plan_ranges(gz, 10) == [(0, 100)]
+    empty = tmp_path / "lineitem.tbl.3"
+    empty.write_bytes(b"")
+    assert loader.plan_ranges(empty, 10) == []
+
+def test_sanitize_blocks_carry_across_boundary():
+    data = b"1|a|\n2|b|\n3|c|\n4|d|"
+    expect = b"1|a\n2|b\n3|c\n4|d"
+    # every block size, so "|" ends a block right before its "\n" at least once
+    for n in range(1, len(data) + 1):
+        assert b"".join(sanitize_blocks(io.BytesIO(data), n)) == expect, n
+
+def test_sanitize_blocks_keeps_inner_pipes():
+    data = b"a||b|\n|\n"
+    assert b"".join(sanitize_blocks(io.BytesIO(data), 3)) == b"a||b\n\n"
+
+def test_classify_result():
+    assert loader.classify_result(proc({"Status": "Success", "NumberLoadedRows": 3})) == "success"
+    assert loader.classify_result(proc({"Status": "Label Already Exists", "ExistingJobStatus": "FINISHED"})) == "exists"
+    assert loader.classify_result(proc({"Status": "Label Already Exists", "ExistingJobStatus": "RUNNING"})) == "retry"
+    assert loader.classify_result(proc({"Status": "Fail", "Message": "too many filtered rows"})) == "fail"
+    assert loader.classify_result(proc({"Status": "Fail", "Message": "[E1008]Reached timeout=1000ms"})) == "retry"
+    assert loader.classify_result(subprocess.CompletedProcess(["PUT"], 1, "", "ConnectionRefusedError(111)")) == "retry"
+    assert loader.classify_result(subprocess.CompletedProcess(["PUT"], 1, "", "HTTP 404")) == "fail"
+
+def test_job_label_deterministic():
+    a = loader.job_label("tpch", "20240101000000", "lineitem", "lineitem/lineitem.tbl.1", 0, 100)
+    assert a == loader.job_label("tpch", "20240101000000", "lineitem", "lineitem/lineitem.tbl.1", 0, 100)
+    assert a.startswith("tpch_20240101000000_lineitem_")
+    assert a != loader.job_label("tpch", "20240101000000", "lineitem", "lineitem/lineitem.tbl.1", 100, 100)
+    assert a != loader.job_label("tpch", "20240101000001", "lineitem", "lineitem/lineitem.tbl.1", 0, 100)
+
+def test_manifest_resume(tmp_path):
+    path = write_rows(tmp_path)
+    plan = {"chunk_mb": 0, "files": {"lineitem/lineitem.tbl.1": len(ROWS)}}
+    mpath = tmp_path / "_load_manifest.jsonl"
+    m = loader.LoadManifest(mpath, False, plan)
+    label = loader.job_label("tpch", m.run_id, "lineitem", "lineitem/lineitem.tbl.1", 0, len(ROWS))
+    m.write({"label": label, "status": "success", "size": len(ROWS), "checksum": loader.fast_checksum(path, 0, len(ROWS))})
+    m.close()
+
+    r = loader.LoadManifest(mpath, True, plan)
+    assert r.run_id == m.run_id
+    assert r.plan_conflicts(plan) == []
+    assert r.range_state(label, path, 0, len(ROWS)) == "loaded"
+    assert r.range_state("tpch_other", path, 0, len(ROWS)) is None
+    assert r.plan_conflicts(dict(plan, chunk_mb=64)) == ["chunk_mb 0 -> 64"]
+    assert len(r.plan_conflicts({"chunk_mb": 0, "files": {"lineitem/lineitem.tbl.1": 1}})) == 1
+    r.close()
+
+    # same size, different bytes: reported, never skipped or reloaded
+    path.write_bytes(b"9" + ROWS[1:])
+    r = loader.LoadManifest(mpath, True, plan)
+    assert r.range_state(label, path, 0, len(ROWS)) == "conflict"
+    r.close()
+
+def test_manifest_refuses_overwrite(tmp_path):
+    mpath = tmp_path / "_load_manifest.jsonl"
+    m = loader.LoadManifest(mpath, False, {"chunk_mb": 0, "files": {}})
+    m.close()
+    with pytest.raises(SystemExit):
+        loader.LoadManifest(mpath, False, {"chunk_mb": 0, "files": {}})
+    time.sleep(1.1)
+    f = loader.LoadManifest(mpath, False, {"chunk_mb": 0, "files": {}}, fresh=True)
+    f.close()
+    assert f.run_id != m.run_id
+    assert (tmp_path / f"_load_manifest.jsonl.{m.run_id}").exists()
+
+def test_load_one_follows_redirect(fake, tmp_path):
+    fe_port, be_port, state = fake
+    path = write_rows(tmp_path)
+    before = state.port_bytes.get(be_port, 0)
+    res = loader.load_one("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", path, 60, False, 0, 4096)
+    ok, out, loaded, _, _ = loader.parse_result(res)
+    assert ok, out
+    assert state.port_bytes[be_port] - before == 4096
+    # sanitized and chunked: every row arrives without its trailing "|"
+    res = loader.load_one("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", path, 60, True)
+    ok, out, loaded, _, _ = loader.parse_result(res)
+    assert ok, out
+    assert loaded == 2000
+
+# A raw FE that answers the request headers with a 307 to the BE after
+# delay_s and records the headers and whatever else arrives on the connection.
+def raw_fe(be_port: int, delay_s: float = 0.0):
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    seen = {}
+
+    def serve():
+        conn, _ = srv.accept()
+        conn.settimeout(0.5)
+        head = b""
+        while b"\r\n\r\n" not in head:
+            head += conn.recv(4096)
+        head, rest = head.split(b"\r\n\r\n", 1)
+        seen["head"] = head.lower()
+        time.sleep(delay_s)
+        conn.sendall(f"HTTP/1.1 307 Temporary Redirect\r\nLocation: http://127.0.0.1:{be_port}/api/tpch/lineitem/_stream_load\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                rest += data
+        except socket.timeout:
+            pass
+        seen["body"] = rest
+        conn.close()
+        srv.close()
+
+    t = threading.Thread(target=serve)
+    t.start()
+    return srv.getsockname()[1], t, seen
+
+def test_expect_continue_body_not_sent_to_fe(fake):
+    _, be_port, state = fake
+    fe_port, t, seen = raw_fe(be_port)
+    res = loader.stream_load("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", ROWS, None, 60)
+    t.join()
+    assert loader.parse_result(res)[0], res
+    assert b"expect: 100-continue" in seen["head"]
+    assert seen["body"] == b""
+
+def test_late_redirect_resends_body(fake, tmp_path, monkeypatch):
+    # The FE stays silent past EXPECT_WAIT_S, so the body goes out before the
+    # 307 arrives: bytes are sent again and a file is rewound, like curl.
+    monkeypatch.setattr(starrocks_http, "EXPECT_WAIT_S", 0.1)
+    _, be_port, state = fake
+    fe_port, t, seen = raw_fe(be_port, 0.4)
+    before = state.port_bytes.get(be_port, 0)
+    res = loader.stream_load("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", ROWS, None, 60)
+    t.join()
+    assert loader.parse_result(res)[0], res
+    assert seen["body"] == ROWS
+    assert state.port_bytes[be_port] - before == len(ROWS)
+
+    path = write_rows(tmp_path)
+    fe_port, t, seen = raw_fe(be_port, 0.4)
+    before = state.port_bytes[be_port]
+    res = loader.load_one("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", path, 60, False, 100, 4096)
+    t.join()
+    ok, out, _, _, _ = loader.parse_result(res)
+    assert ok, out
+    assert seen["body"] == ROWS[100:4196]
+    assert state.port_bytes[be_port] - before == 4096
+
+def test_late_redirect_one_shot_body_is_retryable(fake, tmp_path, monkeypatch):
+    # A sanitized load streams a generator: it cannot be replayed, so the
+    # attempt fails as "retry" and the next attempt rebuilds it.
+    monkeypatch.setattr(starrocks_http, "EXPECT_WAIT_S", 0.1)
+    _, be_port, _ = fake
+    path = write_rows(tmp_path)
+    fe_port, t, seen = raw_fe(be_port, 0.4)
+    res = loader.load_one("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", path, 60, True)
+    t.join()
+    assert "BodyNotReplayable" in res.stderr
+    assert loader.classify_result(res) == "retry"
+    assert not loader.is_overload(res)
+
+def test_label_dedup(fake, tmp_path):
+    fe_port, _, state = fake
+    path = write_rows(tmp_path)
+    res = loader.load_one("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", path, 60, False, label="test_dedup_1")
+    assert loader.classify_result(res) == "success"
+    loaded = state.bytes
+    res = loader.load_one("127.0.0.1", fe_port, "tpch", "lineitem", "root", "", path, 60, False, label="test_dedup_1")
+    assert loader.classify_result(res) == "exists"
+    assert state.bytes == loaded
+
+def test_adaptive_limiter_aimd():
+    msgs = []
+    lim = loader.AdaptiveLimiter(8, 1, 16, log=msgs.append)
+    lim.acquire()
+    lim.release(1024, 0.1, True)
+    assert lim.limit == 4
+    for _ in range(3):
+        lim.acquire()
+        lim.release(1024, 0.1, True)
+    assert lim.limit == 1
+    # a full window without overload probes one step up
+    for _ in range(4):
+        lim.acquire()
+        lim.release(1024 * 1024, 0.01, False)
+    assert lim.limit == 2
+    assert any("overload" in m for m in msgs)
+
+def test_endpoints_failover_and_cooldown():
+    a, b = ("127.0.0.1", 1), ("127.0.0.1", 2)
+    msgs = []
+    eps = loader.Endpoints([a, b], max_failures=2, cooldown_s=0.2, log=msgs.append)
+    assert {eps.acquire(), eps.acquire()} == {a, b}
+    eps.release(a, 0, 0.0, True)
+    eps.release(b, 0, 0.0, False)
+    assert eps.acquire(avoid=a) == b
+    eps.release(b, 0, 0.0, False)
+    assert eps.acquire(avoid=b) == a
+    eps.release(a, 0, 0.0, True)
+    # second consecutive error: a is cooling down: every attempt goes to b, even when asked to avoid it
+    assert eps.summary()["127.0.0.1:1"]["up"] is False
+    assert eps.acquire() == b
+    assert eps.acquire(avoid=b) == b
+    eps.release(b, 0, 0.0, False)
+    eps.release(b, 0, 0.0, False)
+    time.sleep(0.25)
+    assert eps.acquire(avoid=b) == a
+    eps.release(a, 10, 0.0, False)
+    assert eps.summary()["127.0.0.1:1"] == {"jobs": 1, "bytes": 10, "seconds": 0.0, "errors": 2, "up": True}
+    assert any("out for" in m for m in msgs) and any("back up" in m for m in msgs)
+
+def test_load_with_retry_skips_dead_endpoint(fake, tmp_path):
+    fe_port, _, _ = fake
+    path = write_rows(tmp_path)
+    dead = ("127.0.0.1", free_port())
+    eps = loader.Endpoints([dead, ("127.0.0.1", fe_port)], max_failures=1, cooldown_s=60, log=lambda m: None)
+    for i in range(3):
+        res, state, attempts, _, ep = loader.load_with_retry(eps, "tpch", "lineitem", "root", "", path, 60, False, 0, len(ROWS), None, f"test_retry_{i}", 3, 0.01)
+        assert state == "success", res
+        assert ep == f"127.0.0.1:{fe_port}"
+    summary = eps.summary()
+    assert summary[f"127.0.0.1:{dead[1]}"]["up"] is False
+    assert summary[f"127.0.0.1:{fe_port}"]["jobs"] == 3
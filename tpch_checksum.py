@@ -0,0 +1,17 @@
+import os
+import zlib
+from pathlib import Path
+
+SAMPLE_BYTES = 1024 * 1024
+
+# crc32 over the first and last sample_bytes of [offset, offset + length):
+# cheap enough to run per load job or per generated file and still catches
+# truncated or regenerated files. Shared by the dataset manifest (tpch_gen.py)
+# and the load manifest (starrocks_stream_load.py).
+def fast_checksum(file_path: Path, offset: int, length: int, sample_bytes: int = SAMPLE_BYTES) -> str:
+    with open(file_path, "rb", buffering=0) as f:
+        crc = zlib.crc32(os.pread(f.fileno(), min(sample_bytes, length), offset))
+        if length > sample_bytes:
+            tail = min(sample_bytes, length - sample_bytes)
+            crc = zlib.crc32(os.pread(f.fileno(), tail, offset + length - tail), crc)
+    return f"{crc:08x}"
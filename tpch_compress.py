@@ -0,0 +1,183 @@
+import argparse
+import bz2
+import importlib
+import os
+import time
+import zlib
+from pathlib import Path
+
+from tpch_sanitize import sanitize_blocks
+
+# codec -> (file extension, Stream Load "compression" header value)
+CODECS = {
+    "gzip": (".gz", "gzip"),
+    "bzip2": (".bz2", "bzip2"),
+    "lz4": (".lz4", "lz4_frame"),
+    "zstd": (".zst", "zstd"),
+}
+
+DEFAULT_LEVEL = {
+    "gzip": 1,
+    "bzip2": 9,
+    "lz4": 0,
+    "zstd": 3,
+}
+
+def optional_module(name: str, package: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise RuntimeError(f"{name} not found. Please install it: pip install {package}")
+
+class Lz4Compressor:
+    def __init__(self, level: int):
+        lz4_frame = optional_module("lz4.frame", "lz4")
+        self.c = lz4_frame.LZ4FrameCompressor(compression_level=level)
+        self.started = False
+
+    def compress(self, data) -> bytes:
+        if not self.started:
+            self.started = True
+            return self.c.begin() + self.c.compress(data)
+        return self.c.compress(data)
+
+    def flush(self) -> bytes:
+        if not self.started:
+            self.started = True
+            return self.c.begin() + self.c.flush()
+        return self.c.flush()
+
+def compressor(codec: str, level: int = None):
+    if codec not in CODECS:
+        raise ValueError(f"unsupported codec {codec}")
+    if level is None:
+        level = DEFAULT_LEVEL[codec]
+    if codec == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if codec == "bzip2":
+        return bz2.BZ2Compressor(level)
+    if codec == "lz4":
+        return Lz4Compressor(level)
+    zstd = optional_module("zstandard", "zstandard")
+    return zstd.ZstdCompressor(level=level).compressobj()
+
+def codec_for_path(path: Path):
+    for codec, (ext, _) in CODECS.items():
+        if str(path).endswith(ext):
+            return codec
+    return None
+
+def compress_blocks(blocks, codec: str, level: int = None):
+    c = compressor(codec, level)
+    for block in blocks:
+        out = c.compress(block)
+        if out:
+            yield out
+    out = c.flush()
+    if out:
+        yield out
+
+class CompressedWriter:
+    def __init__(self, path: Path, codec: str, level: int = None):
+        self.f = open(path, "wb")
+        self.c = compressor(codec, level)
+
+    def write(self, data):
+        out = self.c.compress(data)
+        if out:
+            self.f.write(out)
+
+    def close(self):
+        self.f.write(self.c.flush())
+        self.f.close()
+
+def open_writer(path: Path, codec: str = None, level: int = None):
+    if not codec:
+        return open(path, "wb")
+    return CompressedWriter(path, codec, level)
+
+def read_sample(path: Path, sample_bytes: int) -> list:
+    blocks = []
+    size = 0
+    with open(path, "rb", buffering=0) as f:
+        for block in sanitize_blocks(f):
+            blocks.append(block)
+            size += len(block)
+            if size >= sample_bytes:
+                break
+    return blocks
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sample", required=True)
+    p.add_argument("--sample-mb", type=int, default=256)
+    p.add_argument("--codecs", default="gzip,lz4,zstd,bzip2")
+    p.add_argument("--level", type=int)
+    p.add_argument("--config", default="")
+    p.add_argument("--table", default="")
+    args = p.parse_args()
+    sample = Path(args.sample)
+    blocks = read_sample(sample, args.sample_mb * 1024 * 1024)
+    raw = sum(len(b) for b in blocks)
+    target = None
+    conn = None
+    scratch = None
+    try:
+        if args.config:
+            import mysql_client
+            import starrocks_stream_load as loader
+            cfg = loader.read_config(args.config)
+            fe_host = cfg.get("fe_host") or cfg.get("fe_host_name")
+            db = cfg.get("db") or cfg.get("database")
+            user = cfg.get("user") or cfg.get("username")
+            password = cfg.get("password") or ""
+            # load into a scratch copy so the benchmark table is never touched
+            table = args.table or sample.parent.name
+            conn = mysql_client.Connection(fe_host, int(cfg.get("fe_query_port") or 9030), user, password, db)
+            scratch = f"{table}_codec_{os.getpid()}"
+            conn.query(f"create table `{scratch}` like `{table}`")
+            if table in loader.COLUMNS:
+                loader.COLUMNS[scratch] = loader.COLUMNS[table]
+            target = (fe_host, int(cfg.get("fe_http_port") or cfg.get("fe_port") or 8030), db, scratch, user, password)
+            print(f"scratch table {db}.{scratch}")
+        compare(blocks, sample, raw, args, target)
+    finally:
+        if conn is not None:
+            try:
+                if not conn.broken:
+                    conn.query(f"drop table if exists `{scratch}` force")
+            finally:
+                conn.close()
+
+def compare(blocks, sample, raw, args, target):
+    import starrocks_stream_load as loader
+    raw_mb = raw / (1024 ** 2)
+    print(f"sample={sample} raw={raw_mb:.1f}MB")
+    print("codec,ratio,compress_mb_s,cpu_s_per_gb,load_mb_s,load_status")
+    for codec in ["none"] + [c.strip() for c in args.codecs.split(",") if c.strip()]:
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            body = blocks if codec == "none" else list(compress_blocks(blocks, codec, args.level))
+        except RuntimeError as e:
+            print(f"{codec},,,,,{e}")
+            continue
+        cpu = time.process_time() - c0
+        dt = time.perf_counter() - t0
+        size = sum(len(b) for b in body)
+        load_mb_s = ""
+        load_status = ""
+        if target:
+            fe_host, fe_port, db, table, user, password = target
+            data = b"".join(body)
+            t0 = time.perf_counter()
+            res = loader.stream_load(fe_host, fe_port, db, table, user, password, data, None, 3600, None if codec == "none" else codec, f"{table}_{codec}")
+            ok = loader.parse_result(res)[0]
+            load_mb_s = f"{raw_mb / (time.perf_counter() - t0):.1f}"
+            load_status = "success" if ok else "fail"
+        mb_s = raw_mb / dt if codec != "none" and dt > 0 else 0.0
+        cpu_gb = cpu / (raw / (1024 ** 3)) if codec != "none" else 0.0
+        print(f"{codec},{raw / size if size else 0:.2f},{mb_s:.1f},{cpu_gb:.1f},{load_mb_s},{load_status}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,627 @@
+import argparse
+import datetime
+import os
+import random
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from tpch_compress import optional_module
+from tpch_params import COLORS, CONTAINER_S1, CONTAINER_S2, NATIONS, REGIONS, SEGMENTS, SHIPMODES, TYPE_S1, TYPE_S2, TYPE_S3
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Built-in TPC-H data generator (specification 4.2.3) as an alternative to
+# dbgen. Columns are generated for a batch of rows at a time with NumPy and
+# the rows are assembled with one gather per column into "|"-delimited lines
+# without the trailing "|", i.e. already sanitized. Each batch has its own
+# random stream seeded by (table group, SF, batch number), so the output is
+# the same for any number of chunks: chunk files are runs of whole batches.
+# Value domains follow the specification; text comes from a grammar-built pool
+# like dbgen's, but the word weights and pool differ, so the bytes are not
+# identical to dbgen's output.
+
+BATCH_ROWS = 10000
+# Bump whenever the generated bytes change; part of tpch_gen's dataset cache key.
+VERSION = 1
+
+# Tables generated together share one random stream: partsupp rows are
+# derived from their part and lineitem rows from their order.
+GROUPS = {
+    "part": ["part", "partsupp"],
+    "supplier": ["supplier"],
+    "customer": ["customer"],
+    "orders": ["orders", "lineitem"],
+    "nation": ["nation"],
+    "region": ["region"],
+}
+GROUP_ID = {g: i + 1 for i, g in enumerate(GROUPS)}
+GROUP_OF = {t: g for g, tables in GROUPS.items() for t in tables}
+BASE_ROWS = {"part": 200000, "supplier": 10000, "customer": 150000, "orders": 1500000}
+
+# dbgen -T codes that generate the same tables, for the benchmark.
+DBGEN_GROUP_CODE = {"part": "p", "supplier": "s", "customer": "c", "orders": "o", "nation": "n", "region": "r"}
+
+PRIORITIES = ["1-URGENT", "2-HIGH", "3-MEDIUM", "4-NOT SPECIFIED", "5-LOW"]
+INSTRUCTIONS = ["DELIVER IN PERSON", "COLLECT COD", "NONE", "TAKE BACK RETURN"]
+TYPES = [f"{a} {b} {c}" for a in TYPE_S1 for b in TYPE_S2 for c in TYPE_S3]
+CONTAINERS = [f"{a} {b}" for a in CONTAINER_S1 for b in CONTAINER_S2]
+ALNUM = b"0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ, "
+
+STARTDATE = datetime.date(1992, 1, 1)
+CURRENTDATE = datetime.date(1995, 6, 17)
+ENDDATE = datetime.date(1998, 12, 31)
+
+# Comment lengths [min, max] per table (specification 4.2.3).
+COMMENT_LEN = {
+    "part": (5, 22),
+    "supplier": (25, 100),
+    "partsupp": (49, 198),
+    "customer": (29, 116),
+    "orders": (19, 78),
+    "lineitem": (10, 43),
+    "nation": (31, 114),
+    "region": (31, 115),
+}
+
+NOUNS = [
+    "packages", "requests", "accounts", "deposits", "foxes", "ideas", "theodolites", "pinto beans", "instructions",
+    "dependencies", "excuses", "platelets", "asymptotes", "courts", "dolphins", "multipliers", "sauternes", "warthogs",
+    "frets", "dinos", "attainments", "somas", "Tiresias", "patterns", "forges", "braids", "hockey players", "frays",
+    "warhorses", "dugouts", "notornis", "epitaphs", "pearls", "tithes", "waters", "orbits", "gifts", "sheaves",
+    "depths", "sentiments", "decoys", "realms", "pains", "grouches", "escapades",
+]
+VERBS = [
+    "sleep", "wake", "are", "cajole", "haggle", "nag", "use", "boost", "affix", "detect", "integrate", "maintain",
+    "nod", "was", "lose", "sublate", "solve", "thrash", "promise", "engage", "hinder", "print", "x-ray", "breach",
+    "eat", "grow", "impress", "mold", "poach", "serve", "run", "dazzle", "snooze", "doze", "unwind", "kindle",
+    "play", "hang", "believe", "doubt",
+]
+ADJECTIVES = [
+    "special", "pending", "unusual", "express", "furious", "sly", "careful", "blithe", "quick", "fluffy", "slow",
+    "quiet", "ruthless", "thin", "close", "dogged", "daring", "brave", "stealthy", "permanent", "enticing", "idle",
+    "busy", "regular", "final", "ironic", "even", "bold", "silent",
+]
+ADVERBS = [
+    "sometimes", "always", "never", "furiously", "slyly", "carefully", "blithely", "quickly", "fluffily", "slowly",
+    "quietly", "ruthlessly", "thinly", "closely", "doggedly", "daringly", "bravely", "stealthily", "permanently",
+    "enticingly", "idly", "busily", "regularly", "finally", "ironically", "evenly", "boldly", "silently",
+]
+PREPOSITIONS = [
+    "about", "above", "according to", "across", "after", "against", "along", "alongside of", "among", "around",
+    "at", "atop", "before", "behind", "beneath", "beside", "besides", "between", "beyond", "by", "despite",
+    "during", "except", "for", "from", "in place of", "inside", "instead of", "into", "near", "of", "on",
+    "outside", "over", "past", "since", "through", "throughout", "to", "toward", "under", "until", "up", "upon",
+    "without", "with", "within",
+]
+AUXILIARIES = [
+    "do", "may", "might", "shall", "will", "would", "can", "could", "should", "ought to", "must", "will have to",
+    "shall have to", "could have to", "should have to", "must have to", "need to", "try to",
+]
+TERMINATORS = [".", ";", ":", "?", "!", "--"]
+# Sentence forms of the dbgen grammar: N noun phrase, V verb phrase, P prepositional phrase.
+SENTENCES = ["N V", "N V P", "N V N", "N P V N", "N P V P"]
+
+POOL_BYTES = 8 * 1024 * 1024
+POOL_SEED = 19920101
+
+def require_numpy():
+    global np
+    if np is None:
+        np = optional_module("numpy", "numpy")
+
+def noun_phrase(rng: random.Random) -> str:
+    form = rng.randrange(4)
+    if form == 0:
+        return rng.choice(NOUNS)
+    if form == 1:
+        return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+    if form == 2:
+        return f"{rng.choice(ADJECTIVES)}, {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+    return f"{rng.choice(ADVERBS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+
+def verb_phrase(rng: random.Random) -> str:
+    form = rng.randrange(4)
+    if form == 0:
+        return rng.choice(VERBS)
+    if form == 1:
+        return f"{rng.choice(AUXILIARIES)} {rng.choice(VERBS)}"
+    if form == 2:
+        return f"{rng.choice(VERBS)} {rng.choice(ADVERBS)}"
+    return f"{rng.choice(AUXILIARIES)} {rng.choice(VERBS)} {rng.choice(ADVERBS)}"
+
+def sentence(rng: random.Random) -> str:
+    parts = []
+    for sym in rng.choice(SENTENCES).split():
+        if sym == "N":
+            parts.append(noun_phrase(rng))
+        elif sym == "V":
+            parts.append(verb_phrase(rng))
+        else:
+            parts.append(f"{rng.choice(PREPOSITIONS)} the {noun_phrase(rng)}")
+    return " ".join(parts) + rng.choice(TERMINATORS)
+
+_POOL = None
+
+# Text pool that comments are cut from (at a random offset, with a random
+# length); built once per process from a fixed seed.
+def text_pool():
+    global _POOL
+    if _POOL is None:
+        rng = random.Random(POOL_SEED)
+        out = []
+        n = 0
+        while n < POOL_BYTES:
+            s = sentence(rng)
+            out.append(s)
+            n += len(s) + 1
+        _POOL = np.frombuffer(" ".join(out).encode("ascii")[:POOL_BYTES], dtype=np.uint8)
+    return _POOL
+
+_DATES = None
+
+def date_table():
+    global _DATES
+    if _DATES is None:
+        days = (datetime.date(2000, 1, 1) - STARTDATE).days
+        text = "".join((STARTDATE + datetime.timedelta(days=d)).isoformat() for d in range(days))
+        _DATES = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    return _DATES
+
+def days(d: datetime.date) -> int:
+    return (d - STARTDATE).days
+
+# A piece is (source bytes, start offset per row, length per row); a row is a
+# list of pieces concatenated. assemble() writes every piece of every row with
+# one vectorized gather per piece.
+def assemble(pieces: list, n: int) -> bytes:
+    if n == 0:
+        return b""
+    row_len = np.zeros(n, dtype=np.int64)
+    for _, _, lens in pieces:
+        row_len += lens
+    ends = np.cumsum(row_len)
+    out = np.empty(int(ends[-1]), dtype=np.uint8)
+    offset = ends - row_len
+    for src, starts, lens in pieces:
+        total = int(lens.sum())
+        if total:
+            within = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(lens) - lens, lens)
+            out[np.repeat(offset, lens) + within] = src[np.repeat(starts, lens) + within]
+        offset = offset + lens
+    return out.tobytes()
+
+def const(text: str, n: int):
+    b = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    return b, np.zeros(n, dtype=np.int64), np.full(n, len(b), dtype=np.int64)
+
+def word_table(words: list):
+    width = max(len(w) for w in words)
+    src = np.frombuffer(b"".join(w.encode("ascii").ljust(width) for w in words), dtype=np.uint8)
+    return src, width, np.array([len(w) for w in words], dtype=np.int64)
+
+_WORD_TABLES = {}
+
+def choice(words: list, idx):
+    key = tuple(words)
+    if key not in _WORD_TABLES:
+        _WORD_TABLES[key] = word_table(words)
+    src, width, lens = _WORD_TABLES[key]
+    return src, idx.astype(np.int64) * width, lens[idx]
+
+POW10 = None
+
+def digits(v, width: int):
+    global POW10
+    if POW10 is None:
+        POW10 = 10 ** np.arange(19, dtype=np.int64)
+    v = v.astype(np.int64)
+    mat = ((v[:, None] // POW10[width - 1::-1][None, :]) % 10 + 48).astype(np.uint8)
+    return mat.ravel(), width
+
+# Non-negative integers, no padding.
+def integer(v):
+    v = np.asarray(v, dtype=np.int64)
+    width = max(1, len(str(int(v.max())))) if len(v) else 1
+    src, _ = digits(v, width)
+    nd = np.maximum(np.searchsorted(POW10[:width], v, side="right"), 1)
+    return src, np.arange(len(v), dtype=np.int64) * width + width - nd, nd
+
+def zero_padded(v, width: int):
+    src, _ = digits(v, width)
+    n = len(v)
+    return src, np.arange(n, dtype=np.int64) * width, np.full(n, width, dtype=np.int64)
+
+# Decimal(15, 2) from an integer number of cents: [-]units.cc
+def money(cents) -> list:
+    cents = np.asarray(cents, dtype=np.int64)
+    n = len(cents)
+    a = np.abs(cents)
+    minus = np.frombuffer(b"-", dtype=np.uint8)
+    return [
+        (minus, np.zeros(n, dtype=np.int64), (cents < 0).astype(np.int64)),
+        integer(a // 100),
+        const(".", n),
+        zero_padded(a % 100, 2),
+    ]
+
+def date(day):
+    day = np.asarray(day, dtype=np.int64)
+    return date_table(), day * 10, np.full(len(day), 10, dtype=np.int64)
+
+def text(rng, n: int, table: str):
+    lo, hi = COMMENT_LEN[table]
+    pool = text_pool()
+    lens = rng.integers(lo, hi + 1, n).astype(np.int64)
+    return pool, rng.integers(0, len(pool) - hi, n).astype(np.int64), lens
+
+# Random alphanumeric string with a length in [lo, hi] (addresses).
+def vstring(rng, n: int, lo: int, hi: int):
+    lens = rng.integers(lo, hi + 1, n).astype(np.int64)
+    alphabet = np.frombuffer(ALNUM[:64], dtype=np.uint8)
+    src = alphabet[rng.integers(0, 64, int(lens.sum()))]
+    return src, np.cumsum(lens) - lens, lens
+
+def phone(rng, nationkey) -> list:
+    n = len(nationkey)
+    return [
+        zero_padded(nationkey + 10, 2), const("-", n),
+        zero_padded(rng.integers(100, 1000, n), 3), const("-", n),
+        zero_padded(rng.integers(100, 1000, n), 3), const("-", n),
+        zero_padded(rng.integers(1000, 10000, n), 4),
+    ]
+
+def rows(fields: list, n: int) -> bytes:
+    pieces = []
+    for i, f in enumerate(fields):
+        pieces += f if isinstance(f, list) else [f]
+        pieces.append(const("|" if i < len(fields) - 1 else "\n", n))
+    return assemble(pieces, n)
+
+def retail_cents(partkey):
+    return 90000 + (partkey // 10) % 20001 + 100 * (partkey % 1000)
+
+def supplier_of(partkey, i, suppliers: int):
+    return (partkey + i * (suppliers // 4 + (partkey - 1) // suppliers)) % suppliers + 1
+
+def distinct_colors(rng, n: int):
+    idx = rng.integers(0, len(COLORS), (n, 5))
+    while True:
+        s = np.sort(idx, axis=1)
+        dup = (s[:, 1:] == s[:, :-1]).any(axis=1)
+        if not dup.any():
+            return idx
+        idx[dup] = rng.integers(0, len(COLORS), (int(dup.sum()), 5))
+
+def gen_part(rng, first: int, n: int, sf: float) -> dict:
+    pk = np.arange(first + 1, first + n + 1, dtype=np.int64)
+    colors = distinct_colors(rng, n)
+    name = []
+    for j in range(5):
+        name.append(choice(COLORS, colors[:, j]))
+        if j < 4:
+            name.append(const(" ", n))
+    m = rng.integers(1, 6, n)
+    brand = m * 10 + rng.integers(1, 6, n)
+    part = rows([
+        integer(pk),
+        name,
+        [const("Manufacturer#", n), integer(m)],
+        [const("Brand#", n), integer(brand)],
+        choice(TYPES, rng.integers(0, len(TYPES), n)),
+        integer(rng.integers(1, 51, n)),
+        choice(CONTAINERS, rng.integers(0, len(CONTAINERS), n)),
+        money(retail_cents(pk)),
+        text(rng, n, "part"),
+    ], n)
+    suppliers = max(1, int(BASE_ROWS["supplier"] * sf))
+    ps_pk = np.repeat(pk, 4)
+    k = len(ps_pk)
+    partsupp = rows([
+        integer(ps_pk),
+        integer(supplier_of(ps_pk, np.tile(np.arange(4), n), suppliers)),
+        integer(rng.integers(1, 10000, k)),
+        money(rng.integers(100, 100001, k)),
+        text(rng, k, "partsupp"),
+    ], k)
+    return {"part": (part, n), "partsupp": (partsupp, k)}
+
+# SF*5 suppliers each get "Customer ... Complaints" and "Customer ...
+# Recommends" written over their comment (Q16 excludes the former); the rows
+# are picked by a scrambled key so the count is exact at every SF.
+def supplier_comments(rng, suppkey):
+    n = len(suppkey)
+    src, starts, lens = text(rng, n, "supplier")
+    pick = suppkey * 7919 % 2000
+    special = np.nonzero((pick == 17) | (pick == 1017))[0]
+    if not len(special):
+        return src, starts, lens
+    extra = bytearray()
+    starts = starts.copy()
+    for i in special:
+        c = bytearray(src[starts[i]:starts[i] + lens[i]].tobytes())
+        word = b"Complaints" if pick[i] == 17 else b"Recommends"
+        p1 = int(rng.integers(0, len(c) - 19 + 1))
+        p2 = int(rng.integers(p1 + 9, len(c) - 10 + 1))
+        c[p1:p1 + 9] = b"Customer "
+        c[p2:p2 + 10] = word
+        starts[i] = len(src) + len(extra)
+        extra += c
+    return np.concatenate([src, np.frombuffer(bytes(extra), dtype=np.uint8)]), starts, lens
+
+def gen_supplier(rng, first: int, n: int, sf: float) -> dict:
+    sk = np.arange(first + 1, first + n + 1, dtype=np.int64)
+    nation = rng.integers(0, 25, n)
+    out = rows([
+        integer(sk),
+        [const("Supplier#", n), zero_padded(sk, 9)],
+        vstring(rng, n, 10, 40),
+        integer(nation),
+        phone(rng, nation),
+        money(rng.integers(-99999, 1000000, n)),
+        supplier_comments(rng, sk),
+    ], n)
+    return {"supplier": (out, n)}
+
+def gen_customer(rng, first: int, n: int, sf: float) -> dict:
+    ck = np.arange(first + 1, first + n + 1, dtype=np.int64)
+    nation = rng.integers(0, 25, n)
+    out = rows([
+        integer(ck),
+        [const("Customer#", n), zero_padded(ck, 9)],
+        vstring(rng, n, 10, 40),
+        integer(nation),
+        phone(rng, nation),
+        money(rng.integers(-99999, 1000000, n)),
+        choice(SEGMENTS, rng.integers(0, len(SEGMENTS), n)),
+        text(rng, n, "customer"),
+    ], n)
+    return {"customer": (out, n)}
+
+def gen_orders(rng, first: int, n: int, sf: float) -> dict:
+    idx = np.arange(first, first + n, dtype=np.int64)
+    # Only the first 8 of every 32 order keys are used.
+    ok = idx // 8 * 32 + idx % 8 + 1
+    customers = max(3, int(BASE_ROWS["customer"] * sf))
+    # Customers whose key is a multiple of 3 place no orders.
+    j = rng.integers(0, customers - customers // 3, n)
+    custkey = j + j // 2 + 1
+    orderdate = rng.integers(0, days(ENDDATE) - 151 + 1, n)
+    nlines = rng.integers(1, 8, n)
+    k = int(nlines.sum())
+    line_start = np.cumsum(nlines) - nlines
+    l_ok = np.repeat(ok, nlines)
+    l_date = np.repeat(orderdate, nlines)
+    parts = max(1, int(BASE_ROWS["part"] * sf))
+    suppliers = max(1, int(BASE_ROWS["supplier"] * sf))
+    partkey = rng.integers(1, parts + 1, k)
+    suppkey = supplier_of(partkey, rng.integers(0, 4, k), suppliers)
+    quantity = rng.integers(1, 51, k)
+    price = quantity * retail_cents(partkey)
+    discount = rng.integers(0, 11, k)
+    tax = rng.integers(0, 9, k)
+    shipdate = l_date + rng.integers(1, 122, k)
+    commitdate = l_date + rng.integers(30, 91, k)
+    receiptdate = shipdate + rng.integers(1, 31, k)
+    current = days(CURRENTDATE)
+    returnflag = np.where(receiptdate <= current, np.where(rng.random(k) < 0.5, 0, 1), 2)
+    open_line = shipdate > current
+    linestatus = open_line.astype(np.int64)
+    open_count = np.add.reduceat(linestatus, line_start)
+    status = np.where(open_count == 0, 0, np.where(open_count == nlines, 1, 2))
+    total = np.add.reduceat(price * (100 - discount) * (100 + tax) // 10000, line_start)
+    clerks = max(1, int(1000 * sf))
+    orders = rows([
+        integer(ok),
+        integer(custkey),
+        choice(["F", "O", "P"], status),
+        money(total),
+        date(orderdate),
+        choice(PRIORITIES, rng.integers(0, len(PRIORITIES), n)),
+        [const("Clerk#", n), zero_padded(rng.integers(1, clerks + 1, n), 9)],
+        const("0", n),
+        text(rng, n, "orders"),
+    ], n)
+    lineitem = rows([
+        integer(l_ok),
+        integer(partkey),
+        integer(suppkey),
+        integer(np.arange(k, dtype=np.int64) - np.repeat(line_start, nlines) + 1),
+        integer(quantity),
+        money(price),
+        money(discount),
+        money(tax),
+        choice(["R", "A", "N"], returnflag),
+        choice(["F", "O"], linestatus),
+        date(shipdate),
+        date(commitdate),
+        date(receiptdate),
+        choice(INSTRUCTIONS, rng.integers(0, len(INSTRUCTIONS), k)),
+        choice(SHIPMODES, rng.integers(0, len(SHIPMODES), k)),
+        text(rng, k, "lineitem"),
+    ], k)
+    return {"orders": (orders, n), "lineitem": (lineitem, k)}
+
+def gen_nation(rng, first: int, n: int, sf: float) -> dict:
+    out = rows([
+        integer(np.arange(25)),
+        choice([name for name, _ in NATIONS], np.arange(25)),
+        integer(np.array([r for _, r in NATIONS])),
+        text(rng, 25, "nation"),
+    ], 25)
+    return {"nation": (out, 25)}
+
+def gen_region(rng, first: int, n: int, sf: float) -> dict:
+    out = rows([integer(np.arange(5)), choice(REGIONS, np.arange(5)), text(rng, 5, "region")], 5)
+    return {"region": (out, 5)}
+
+GENERATORS = {
+    "part": gen_part,
+    "supplier": gen_supplier,
+    "customer": gen_customer,
+    "orders": gen_orders,
+    "nation": gen_nation,
+    "region": gen_region,
+}
+
+def group_rows(group: str, sf: float) -> int:
+    if group == "nation":
+        return 25
+    if group == "region":
+        return 5
+    return max(1, int(BASE_ROWS[group] * sf))
+
+def batch_count(group: str, sf: float) -> int:
+    return -(-group_rows(group, sf) // BATCH_ROWS)
+
+# Batches [lo, hi) of chunk (1-based) out of chunks, like dbgen -C/-S.
+def chunk_batches(group: str, sf: float, chunk: int, chunks: int):
+    nb = batch_count(group, sf)
+    return (chunk - 1) * nb // chunks, chunk * nb // chunks
+
+def batch_rng(group: str, sf: float, batch: int):
+    return np.random.default_rng([GROUP_ID[group], int(round(sf * 1000000)), batch])
+
+def generate_batches(group: str, sf: float, lo: int, hi: int):
+    total = group_rows(group, sf)
+    for b in range(lo, hi):
+        first = b * BATCH_ROWS
+        yield GENERATORS[group](batch_rng(group, sf, b), first, min(BATCH_ROWS, total - first), sf)
+
+# One chunk of one table group, written to <out_dir>/<table>/<table>.tbl.<chunk>.
+def generate_chunk(group: str, sf: float, chunk: int, chunks: int, out_dir: str):
+    require_numpy()
+    t0 = time.perf_counter()
+    lo, hi = chunk_batches(group, sf, chunk, chunks)
+    stats = {}
+    if hi <= lo:
+        return group, chunk, stats, time.perf_counter() - t0
+    files = {}
+    try:
+        for t in GROUPS[group]:
+            d = Path(out_dir) / t
+            d.mkdir(parents=True, exist_ok=True)
+            files[t] = open(d / f"{t}.tbl.{chunk}", "wb")
+            stats[t] = [0, 0]
+        for batch in generate_batches(group, sf, lo, hi):
+            for t, (data, n) in batch.items():
+                files[t].write(data)
+                stats[t][0] += n
+                stats[t][1] += len(data)
+    finally:
+        for f in files.values():
+            f.close()
+    return group, chunk, stats, time.perf_counter() - t0
+
+# Chunks per table actually used: chunks is one count for every large table
+# or a per-table plan (tpch_gen.plan_chunks); tables generated together use
+# the larger count, and no table gets more chunks than it has batches.
+def effective_plan(sf: float, chunks) -> dict:
+    plan = {}
+    for g, tables in GROUPS.items():
+        want = chunks if isinstance(chunks, int) else max(chunks.get(t, 1) for t in tables)
+        n = 1 if g in ("nation", "region") else max(1, min(want, batch_count(g, sf)))
+        for t in tables:
+            plan[t] = n
+    return plan
+
+# Returns {(table, chunk): (rows, bytes)}. only, a set of (table, chunk),
+# limits generation to the chunks containing those files.
+def generate(sf: float, chunks, workers: int, out_dir: Path, tables=None, only=None) -> dict:
+    require_numpy()
+    wanted = set(tables or GROUP_OF)
+    plan = effective_plan(sf, chunks)
+    jobs = []
+    for g, ts in GROUPS.items():
+        if not wanted & set(ts):
+            continue
+        n = plan[ts[0]]
+        jobs += [(g, c, n) for c in range(1, n + 1) if only is None or any((t, c) in only for t in ts)]
+    # Largest groups first so the pool does not end on one orders chunk.
+    jobs.sort(key=lambda j: group_rows(j[0], sf) / j[2], reverse=True)
+    out = {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ex:
+        futs = [ex.submit(generate_chunk, g, sf, c, n, str(out_dir)) for g, c, n in jobs]
+        for fu in as_completed(futs):
+            g, c, stats, dt = fu.result()
+            for t, (n_rows, n_bytes) in stats.items():
+                out[(t, c)] = (n_rows, n_bytes)
+                print(f"{t}.tbl.{c}: rows={n_rows} {n_bytes / (1024 ** 2):.1f}MB {dt:.1f}s")
+    dt = time.perf_counter() - t0
+    rows_total = sum(r for r, _ in out.values())
+    mb = sum(b for _, b in out.values()) / (1024 ** 2)
+    print(f"generate: sf={sf:g} jobs={len(jobs)} rows={rows_total} {mb:.1f}MB {dt:.1f}s {rows_total / dt if dt > 0 else 0:.0f}rows/s")
+    return out
+
+def cpu_children() -> float:
+    r = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return r.ru_utime + r.ru_stime
+
+# Single-process rows per CPU second of this generator and, if a dbgen binary
+# is given, of "dbgen -s sf -T <code>" for the same table group.
+def benchmark(sf: float, dbgen: str = None, groups=None):
+    require_numpy()
+    text_pool()
+    date_table()
+    work = Path(tempfile.mkdtemp(prefix="tpch_datagen_"))
+    print("group,engine,rows,sec,cpu_sec,rows_per_cpu_sec,mb_per_cpu_sec")
+    try:
+        for g in groups or GROUPS:
+            t0, c0 = time.perf_counter(), time.process_time()
+            _, _, stats, _ = generate_chunk(g, sf, 1, 1, str(work / "numpy"))
+            dt, cpu = time.perf_counter() - t0, time.process_time() - c0
+            n_rows = sum(r for r, _ in stats.values())
+            mb = sum(b for _, b in stats.values()) / (1024 ** 2)
+            print(f"{g},numpy,{n_rows},{dt:.3f},{cpu:.3f},{n_rows / cpu if cpu > 0 else 0:.0f},{mb / cpu if cpu > 0 else 0:.1f}")
+            if not dbgen:
+                continue
+            d = work / "dbgen" / g
+            d.mkdir(parents=True, exist_ok=True)
+            cmd = [dbgen, "-s", f"{sf:g}", "-T", DBGEN_GROUP_CODE[g], "-f"]
+            dists = Path(dbgen).parent / "dists.dss"
+            if dists.exists():
+                cmd[1:1] = ["-b", str(dists)]
+            t0, c0 = time.perf_counter(), cpu_children()
+            subprocess.run(cmd, cwd=d, check=True, stdout=subprocess.DEVNULL)
+            dt, cpu = time.perf_counter() - t0, cpu_children() - c0
+            n_rows = 0
+            n_bytes = 0
+            for f in d.glob("*.tbl*"):
+                n_bytes += f.stat().st_size
+                with open(f, "rb") as fin:
+                    n_rows += sum(block.count(b"\n") for block in iter(lambda: fin.read(1 << 20), b""))
+            mb = n_bytes / (1024 ** 2)
+            print(f"{g},dbgen,{n_rows},{dt:.3f},{cpu:.3f},{n_rows / cpu if cpu > 0 else 0:.0f},{mb / cpu if cpu > 0 else 0:.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--sf", type=float, default=1.0)
+    p.add_argument("--outdir", default="./out")
+    p.add_argument("--chunks", type=int, default=1)
+    p.add_argument("--threads", type=int, default=max(1, os.cpu_count() or 1))
+    p.add_argument("--tables", default="")
+    p.add_argument("--benchmark", action="store_true")
+    p.add_argument("--dbgen", default="")
+    args = p.parse_args()
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in GROUP_OF]
+    if unknown:
+        raise SystemExit(f"unknown tables: {','.join(unknown)}")
+    if args.benchmark:
+        groups = [g for g, ts in GROUPS.items() if not tables or set(tables) & set(ts)]
+        benchmark(args.sf, args.dbgen or shutil.which("dbgen"), groups)
+        return
+    generate(args.sf, args.chunks, args.threads, Path(args.outdir).absolute(), tables)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 import argparse
+import hashlib
+import json
 import math
 import os
+import re
 import shutil
 import subprocess
 import sys
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 import urllib.request
 import zipfile
 
+from tpch_checksum import fast_checksum
+from tpch_compress import CODECS, codec_for_path, open_writer
+from tpch_sanitize import sanitize_blocks, sanitize_stream
+
 TABLES = [
     "customer",
     "lineitem",
@@ -40,6 +48,19 @@ EST_ROW_BYTES_MAX = {
     "supplier": 200,
 }
 
+DBGEN_TABLE_CODE = {
+    "customer": "c",
+    "lineitem": "L",
+    "nation": "n",
+    "orders": "O",
+    "part": "P",
+    "partsupp": "S",
+    "region": "r",
+    "supplier": "s",
+}
+
+SMALL_TABLES = {"nation", "region"}
+
 def ensure_dbgen(dbgen_path: Path, work_dir: Path) -> Path:
     if dbgen_path:
         p = Path(dbgen_path)
@@ -106,92 +127,390 @@ def row_counts(sf: int) -> dict:
         "region": 5,
     }
 
-def compute_chunks(sf: int, max_file_size_gb: int) -> int:
+# Chunks per table so that each file stays under max_file_size_gb at the
+# worst-case row width; forced > 0 (--chunks) uses one count for every large
+# table instead.
+def plan_chunks(sf: int, max_file_size_gb: int, forced: int = 0) -> dict:
     rc = row_counts(sf)
-    bytes_per_row = EST_ROW_BYTES_MAX["lineitem"]
-    total_bytes = rc["lineitem"] * bytes_per_row
     max_bytes = max_file_size_gb * (1024 ** 3)
-    n = math.ceil(total_bytes / max_bytes)
-    return max(1, n)
-
-def run_dbgen_stream(dbgen_bin: Path, dists_path: Path, sf: int, total_streams: int, stream_id: int, out_tmp_dir: Path):
-    cmd = [
-        str(dbgen_bin),
-        "-s",
-        str(sf),
-        "-C",
-        str(total_streams),
-        "-S",
-        str(stream_id),
-    ]
+    plan = {}
+    for t in TABLES:
+        if t in SMALL_TABLES:
+            plan[t] = 1
+        elif forced > 0:
+            plan[t] = forced
+        else:
+            plan[t] = max(1, math.ceil(rc[t] * EST_ROW_BYTES_MAX[t] / max_bytes))
+    return plan
+
+# (table, chunk, chunks) for every file of the plan, largest expected file
+# first so the thread pool does not finish on one big lineitem chunk.
+def plan_jobs(sf: int, plan: dict) -> list:
+    rc = row_counts(sf)
+    jobs = [(t, c, plan[t]) for t in TABLES for c in range(1, plan[t] + 1)]
+    jobs.sort(key=lambda j: rc[j[0]] * EST_ROW_BYTES_MAX[j[0]] / j[2], reverse=True)
+    return jobs
+
+def format_plan(sf: int, plan: dict, max_file_size_gb: int) -> str:
+    rc = row_counts(sf)
+    cells = [f"{t}={plan[t]}x{rc[t] * EST_ROW_BYTES_MAX[t] / plan[t] / (1024 ** 3):.2f}GB" for t in TABLES]
+    return f"plan: files={sum(plan.values())} (max {max_file_size_gb}GB each, estimated) " + " ".join(cells)
+
+def run_dbgen_table(dbgen_bin: Path, dists_path: Path, sf: int, table: str, chunk: int, chunks: int, out_tmp_dir: Path, final_out_dir: Path):
+    cmd = [str(dbgen_bin), "-s", str(sf), "-T", DBGEN_TABLE_CODE[table]]
+    if chunks > 1:
+        cmd += ["-C", str(chunks), "-S", str(chunk)]
     if dists_path and Path(dists_path).exists():
         cmd += ["-b", str(dists_path)]
     cmd += ["-f"]
     subprocess.run(cmd, cwd=out_tmp_dir, check=True)
+    # dbgen names the only chunk <table>.tbl; keep the .<chunk> suffix throughout.
+    src = out_tmp_dir / (f"{table}.tbl.{chunk}" if chunks > 1 else f"{table}.tbl")
+    if not src.exists():
+        raise RuntimeError(f"dbgen did not produce {src.name}")
+    dest_dir = final_out_dir / table
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(src), str(dest_dir / f"{table}.tbl.{chunk}"))
 
-def move_stream_files(out_tmp_dir: Path, final_out_dir: Path, stream_id: int):
-    for table in TABLES:
-        src = out_tmp_dir / f"{table}.tbl.{stream_id}"
-        if src.exists():
-            dest_dir = final_out_dir / table
-            dest_dir.mkdir(parents=True, exist_ok=True)
-            dest = dest_dir / f"{table}.tbl.{stream_id}"
-            shutil.move(str(src), str(dest))
-        else:
-            if stream_id == 1:
-                plain = out_tmp_dir / f"{table}.tbl"
-                if plain.exists():
-                    dest_dir = final_out_dir / table
-                    dest_dir.mkdir(parents=True, exist_ok=True)
-                    dest = dest_dir / f"{table}.tbl.1"
-                    shutil.move(str(plain), str(dest))
-
-def split_if_needed(file_path: Path, max_bytes: int):
-    sz = file_path.stat().st_size
-    if sz <= max_bytes:
-        return
-    base = file_path.stem
-    suffix = file_path.suffix
-    parent = file_path.parent
+# dbgen -U writes the refresh data for each set n: orders.tbl.u<n> and
+# lineitem.tbl.u<n> (RF1 inserts) and delete.<n> (RF2 order keys). They are
+# sanitized like the base tables and collected under <final>/updates.
+def update_names(sets: int) -> list:
+    return [name for n in range(1, sets + 1) for name in (f"orders.tbl.u{n}", f"lineitem.tbl.u{n}", f"delete.{n}")]
+
+def generate_updates(dbgen_bin: Path, dists_path: Path, sf: int, sets: int, work_dir: Path, final_out_dir: Path):
+    work_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [str(dbgen_bin), "-s", str(sf), "-U", str(sets)]
+    if dists_path and Path(dists_path).exists():
+        cmd += ["-b", str(dists_path)]
+    cmd += ["-f"]
+    subprocess.run(cmd, cwd=work_dir, check=True)
+    dest_dir = final_out_dir / "updates"
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    for name in update_names(sets):
+        src = work_dir / name
+        if not src.exists():
+            raise RuntimeError(f"dbgen did not produce {name}")
+        with open(src, "rb", buffering=0) as fin, open(dest_dir / name, "wb") as fout:
+            sanitize_stream(fin, fout)
+        src.unlink()
+    return dest_dir
+
+def part_path(file_path: Path, idx: int) -> Path:
+    return file_path.parent / f"{file_path.stem}.part-{idx:05d}{file_path.suffix}"
+
+def process_file(path: str, max_bytes: int, codec: str = None, level: int = None):
+    # Sanitize, split and optionally compress in a single read pass. A part is
+    # closed at the end of the first line reaching max_bytes (uncompressed); a
+    # file that fits in one part keeps its original name plus the codec
+    # extension. max_bytes <= 0 disables splitting. Also returns the output
+    # files with their row counts.
+    file_path = Path(path)
+    ext = CODECS[codec][0] if codec else ""
+    t0 = time.perf_counter()
+    in_bytes = file_path.stat().st_size
+    out_bytes = 0
     idx = 0
     written = 0
     out = None
-    with open(file_path, "rb") as f:
-        for line in f:
-            if out is None or written >= max_bytes:
-                if out is not None:
-                    out.close()
-                part_name = parent / f"{base}.part-{idx:05d}{suffix}"
-                out = open(part_name, "wb")
-                written = 0
-                idx += 1
-            out.write(line)
-            written += len(line)
+    outputs = []
+    with open(file_path, "rb", buffering=0) as fin:
+        for block in sanitize_blocks(fin):
+            out_bytes += len(block)
+            while block:
+                if out is None:
+                    out = open_writer(Path(str(part_path(file_path, idx)) + ext), codec, level)
+                    outputs.append([str(part_path(file_path, idx)) + ext, 0])
+                    idx += 1
+                    written = 0
+                nl = block.find(b"\n", max(max_bytes - written - 1, 0)) if max_bytes > 0 else -1
+                if nl == -1:
+                    out.write(block)
+                    outputs[-1][1] += block.count(b"\n")
+                    written += len(block)
+                    break
+                out.write(block[:nl + 1])
+                outputs[-1][1] += block.count(b"\n", 0, nl + 1)
+                out.close()
+                out = None
+                block = block[nl + 1:]
     if out is not None:
         out.close()
-    file_path.unlink()
-
-def sanitize_file(path: Path):
-    tmp = Path(str(path) + ".san")
-    with open(path, "rb") as fin, open(tmp, "wb") as fout:
-        for line in fin:
-            if line.endswith(b"|\n"):
-                fout.write(line[:-2] + b"\n")
-            elif line.endswith(b"|"):
-                fout.write(line[:-1])
-            else:
-                fout.write(line)
-    os.replace(tmp, path)
+    if idx == 0:
+        open_writer(Path(str(file_path) + ext), codec, level).close()
+        outputs.append([str(file_path) + ext, 0])
+    elif idx == 1:
+        os.replace(str(part_path(file_path, 0)) + ext, str(file_path) + ext)
+        outputs[0][0] = str(file_path) + ext
+    if idx > 1 or ext:
+        file_path.unlink()
+    return path, in_bytes, out_bytes, idx, time.perf_counter() - t0, outputs
 
-def verify_and_split(final_out_dir: Path, max_file_size_gb: int):
-    max_bytes = max_file_size_gb * (1024 ** 3)
-    for table in TABLES:
-        tdir = final_out_dir / table
-        if not tdir.exists():
-            continue
-        for p in tdir.glob("*.tbl.*"):
-            sanitize_file(p)
-            split_if_needed(p, max_bytes)
+# files defaults to every unprocessed *.tbl.* under final_out_dir. Returns
+# {input path: [(output path, rows), ...]}.
+def verify_and_split(final_out_dir: Path, max_file_size_gb: int, workers: int = 1, split: bool = True, codec: str = None, level: int = None, files=None) -> dict:
+    max_bytes = max_file_size_gb * (1024 ** 3) if split else 0
+    if files is None:
+        files = []
+        for table in TABLES:
+            tdir = final_out_dir / table
+            if not tdir.exists():
+                continue
+            files += [str(p) for p in tdir.glob("*.tbl.*") if ".part-" not in p.name and not codec_for_path(p)]
+    t0 = time.perf_counter()
+    total_in = 0
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ex:
+        futs = [ex.submit(process_file, f, max_bytes, codec, level) for f in files]
+        for fu in as_completed(futs):
+            path, in_bytes, out_bytes, parts, dt, outputs = fu.result()
+            results[path] = outputs
+            total_in += in_bytes
+            mb = in_bytes / (1024 ** 2)
+            print(f"{Path(path).name}: {mb:.1f}MB parts={parts} {mb / dt if dt > 0 else 0:.1f}MB/s")
+    dt = time.perf_counter() - t0
+    mb = total_in / (1024 ** 2)
+    print(f"post-process: files={len(files)} {mb:.1f}MB {dt:.1f}s {mb / dt if dt > 0 else 0:.1f}MB/s")
+    return results
+
+# Dataset manifest, <final>/_manifest.json: the settings that determine the
+# bytes (size, chunk plan, generator version, split and codec), their hash as
+# dataset_id, and per chunk "<table>.<chunk>" the files it ended up as with
+# size, rows and fast checksum. A rerun with the same dataset_id verifies the
+# files and regenerates only the chunks that are missing or do not match.
+MANIFEST_NAME = "_manifest.json"
+
+def generator_version(engine: str, dbgen_bin: Path = None, dists_path: Path = None) -> str:
+    if engine == "numpy":
+        import tpch_datagen
+        return f"numpy/{tpch_datagen.VERSION}"
+    h = hashlib.sha1()
+    for p in (dbgen_bin, dists_path):
+        if p and Path(p).exists():
+            h.update(Path(p).read_bytes())
+    return f"dbgen/{h.hexdigest()[:16]}"
+
+def dataset_settings(size: str, sf: int, generator: str, plan: dict, max_file_size_gb: int, split: bool, codec: str, level: int) -> dict:
+    return {
+        "size": size,
+        "sf": sf,
+        "generator": generator,
+        "plan": plan,
+        "max_file_size_gb": max_file_size_gb if split else 0,
+        "codec": codec or "",
+        "level": level if codec else None,
+    }
+
+def dataset_id(settings: dict) -> str:
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def load_manifest(final_dir: Path):
+    try:
+        return json.loads((final_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(final_dir: Path, manifest: dict):
+    tmp = final_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, final_dir / MANIFEST_NAME)
+
+def file_entry(final_dir: Path, path, rows: int) -> dict:
+    p = Path(path)
+    size = p.stat().st_size
+    return {"path": p.relative_to(final_dir).as_posix(), "size": size, "rows": rows, "checksum": fast_checksum(p, 0, size)}
+
+def verify_files(final_dir: Path, entries: list) -> bool:
+    for e in entries:
+        p = final_dir / e["path"]
+        try:
+            if p.stat().st_size != e["size"] or fast_checksum(p, 0, e["size"]) != e["checksum"]:
+                return False
+        except OSError:
+            return False
+    return True
+
+def count_rows(path: Path) -> int:
+    n = 0
+    with open(path, "rb", buffering=0) as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            n += block.count(b"\n")
+    return n
+
+# Everything one chunk may have become: the raw file, its parts and their
+# compressed forms (part_path puts the part number before the chunk suffix).
+def chunk_files(final_dir: Path, table: str, chunk: int) -> list:
+    tdir = final_dir / table
+    if not tdir.exists():
+        return []
+    pat = re.compile(rf"{table}\.tbl\.(part-\d+\.)?{chunk}(\.[a-z0-9]+)?")
+    return [p for p in tdir.iterdir() if pat.fullmatch(p.name)]
+
+def clear_dataset(final_dir: Path):
+    for t in TABLES:
+        tdir = final_dir / t
+        if tdir.exists():
+            for p in tdir.glob(f"{t}.tbl*"):
+                p.unlink()
+    shutil.rmtree(final_dir / "updates", ignore_errors=True)
+
+# keys: every (table, chunk) of the plan. linked maps a table to the tables
+# generated in the same run, which are regenerated together. Returns the new
+# manifest holding the chunks that verified and the set of keys to generate.
+def reuse_chunks(final_dir: Path, settings: dict, keys: list, workers: int, use_cache: bool = True, linked: dict = None):
+    did = dataset_id(settings)
+    old = load_manifest(final_dir) if use_cache else None
+    manifest = {"dataset_id": did, "settings": settings, "chunks": {}, "updates": None}
+    if old is None or old.get("dataset_id") != did:
+        if old is not None:
+            print(f"cache: dataset {old.get('dataset_id')} does not match {did}, regenerating")
+        clear_dataset(final_dir)
+        write_manifest(final_dir, manifest)
+        return manifest, set(keys)
+    manifest["updates"] = old.get("updates")
+    cached = old.get("chunks", {})
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futs = {k: ex.submit(verify_files, final_dir, cached[f"{k[0]}.{k[1]}"]) for k in keys if f"{k[0]}.{k[1]}" in cached}
+        valid = {k for k, fu in futs.items() if fu.result()}
+    todo = set()
+    for t, c in keys:
+        if (t, c) not in valid:
+            todo.update((lt, c) for lt in (linked or {}).get(t, [t]))
+    for t, c in keys:
+        if (t, c) in todo:
+            for p in chunk_files(final_dir, t, c):
+                p.unlink()
+        else:
+            manifest["chunks"][f"{t}.{c}"] = cached[f"{t}.{c}"]
+    print(f"cache: dataset {did} reused {len(keys) - len(todo)}/{len(keys)} chunks, regenerating {len(todo)} ({time.perf_counter() - t0:.1f}s verify)")
+    write_manifest(final_dir, manifest)
+    return manifest, todo
+
+# outputs: {raw chunk path: [(output path, rows), ...]}.
+def record_chunks(final_dir: Path, manifest: dict, keys, outputs: dict):
+    for t, c in sorted(keys):
+        files = outputs.get(str(final_dir / t / f"{t}.tbl.{c}"), [])
+        manifest["chunks"][f"{t}.{c}"] = [file_entry(final_dir, p, rows) for p, rows in files]
+    write_manifest(final_dir, manifest)
+
+def open_fifo(path: Path):
+    # Hold a write end ourselves until dbgen exits: the reader then never sees
+    # EOF before dbgen opens the pipe, and never blocks if dbgen dies first.
+    rfd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    wfd = os.open(path, os.O_WRONLY)
+    os.set_blocking(rfd, True)
+    return os.fdopen(rfd, "rb"), wfd
+
+def tee_blocks(blocks, out):
+    for block in blocks:
+        out.write(block)
+        yield block
+
+def pipeline_stream(dbgen_bin: Path, dists_path: Path, sf: int, total_streams: int, stream_id: int, table: str, pipe_dir: Path, target: dict, label: str, keep_dir: Path = None):
+    import starrocks_stream_load as loader
+    chunked = total_streams > 1 and table not in SMALL_TABLES
+    name = f"{table}.tbl.{stream_id}" if chunked else f"{table}.tbl"
+    work = pipe_dir / f"{table}.{stream_id}"
+    work.mkdir(parents=True, exist_ok=True)
+    fifo = work / name
+    if fifo.exists():
+        fifo.unlink()
+    os.mkfifo(fifo)
+    fin, hold_fd = open_fifo(fifo)
+    cmd = [str(dbgen_bin), "-s", str(sf), "-T", DBGEN_TABLE_CODE[table]]
+    if chunked:
+        cmd += ["-C", str(total_streams), "-S", str(stream_id)]
+    if dists_path and Path(dists_path).exists():
+        cmd += ["-b", str(dists_path)]
+    cmd += ["-f"]
+    try:
+        proc = subprocess.Popen(cmd, cwd=work)
+    except OSError:
+        fin.close()
+        os.close(hold_fd)
+        raise
+    watcher = threading.Thread(target=lambda: (proc.wait(), os.close(hold_fd)), daemon=True)
+    watcher.start()
+    keep = None
+    try:
+        if keep_dir is not None:
+            (keep_dir / table).mkdir(parents=True, exist_ok=True)
+            keep = open(keep_dir / table / f"{table}.tbl.{stream_id}", "wb")
+        with fin:
+            blocks = sanitize_blocks(fin)
+            if keep is not None:
+                blocks = tee_blocks(blocks, keep)
+            res = loader.load_stream(target["fe_host"], target["fe_port"], target["db"], table, target["user"], target["password"], blocks, target["timeout"], label=label)
+    finally:
+        if keep is not None:
+            keep.close()
+        # the load stopped reading early: with no reader left dbgen would block
+        # opening or writing the pipe, so stop it
+        fin.close()
+        if proc.poll() is None:
+            proc.kill()
+        ret = proc.wait()
+        watcher.join()
+        shutil.rmtree(work, ignore_errors=True)
+    # a failed load closes the pipe and dbgen dies of SIGPIPE; only blame
+    # dbgen when the load itself went through
+    if ret != 0 and loader.classify_result(res) == "success":
+        raise subprocess.CalledProcessError(ret, cmd)
+    return res
+
+# Each (table, stream) loads under <prefix>_<run_id>_pipe_<table>_<stream>_of_<n>,
+# with the run id and every finished stream kept in a load manifest (the one
+# starrocks_stream_load.py uses) at <outdir>/_pipeline_<SIZE>.jsonl. A new run
+# never reuses old labels; --resume keeps the run id, skips the streams
+# recorded as loaded and counts "Label Already Exists" as loaded (the
+# interrupted run got that far without recording it). Outside a resume an
+# existing label means something else loaded it, which is a failure.
+def run_pipeline(dbgen_bin: Path, dists_path: Path, sf: int, plan: dict, threads: int, pipe_dir: Path, target: dict, manifest, resume: bool, keep_dir: Path = None) -> bool:
+    import starrocks_stream_load as loader
+    all_ok = True
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        futs = {}
+        for table, s, n in plan_jobs(sf, plan):
+            label = f"{target['label_prefix']}_{manifest.run_id}_pipe_{table}_{s}_of_{n}"
+            if manifest.records.get(label, {}).get("status") in ("success", "exists"):
+                skipped += 1
+                continue
+            futs[ex.submit(pipeline_stream, dbgen_bin, dists_path, sf, n, s, table, pipe_dir, target, label, keep_dir)] = (table, s, label)
+        if resume:
+            print(f"resume: run_id={manifest.run_id} skipped={skipped} already loaded, remaining={len(futs)}")
+        for fu in as_completed(list(futs.keys())):
+            table, s, label = futs[fu]
+            rec = {"label": label, "table": table, "stream": s, "status": "fail", "loaded_rows": 0, "filtered_rows": 0}
+            try:
+                res = fu.result()
+            except subprocess.CalledProcessError as e:
+                all_ok = False
+                print(f"{table}.tbl.{s}: dbgen failed ret={e.returncode}")
+                manifest.write(rec)
+                continue
+            except Exception as e:
+                all_ok = False
+                print(f"{table}.tbl.{s}: load failed: {e!r}")
+                manifest.write(rec)
+                continue
+            state = loader.classify_result(res)
+            ok, out, loaded_rows, filtered_rows, _ = loader.parse_result(res)
+            if state == "exists" and resume:
+                rec["status"] = "exists"
+                print(f"{table}.tbl.{s}: already loaded by the interrupted run (label {label} exists)")
+            elif state == "exists":
+                all_ok = False
+                print(f"{table}.tbl.{s}: label {label} already exists, nothing loaded")
+            elif not ok:
+                all_ok = False
+                print(f"{table}.tbl.{s}: load failed\n{out}")
+            else:
+                rec.update(status="success", loaded_rows=loaded_rows, filtered_rows=filtered_rows)
+                print(f"{table}.tbl.{s}: loaded_rows={loaded_rows} filtered_rows={filtered_rows}")
+            manifest.write(rec)
+    return all_ok
 
 def main():
     parser = argparse.ArgumentParser()
@@ -201,9 +520,48 @@ def main():
     parser.add_argument("--max-file-size-gb", type=int, default=5)
     parser.add_argument("--dbgen", default="")
     parser.add_argument("--chunks", type=int, default=0)
+    parser.add_argument("--pipeline", action="store_true")
+    parser.add_argument("--load-config", default="")
+    parser.add_argument("--keep-files", action="store_true")
+    run_mode = parser.add_mutually_exclusive_group()
+    run_mode.add_argument("--resume", action="store_true")
+    run_mode.add_argument("--fresh", action="store_true")
+    parser.add_argument("--no-split", action="store_true")
+    parser.add_argument("--compress", choices=list(CODECS.keys()))
+    parser.add_argument("--compress-level", type=int)
+    parser.add_argument("--updates", type=int, default=0)
+    parser.add_argument("--engine", choices=["dbgen", "numpy"], default="dbgen")
+    parser.add_argument("--no-cache", action="store_true")
     args = parser.parse_args()
+    if args.pipeline and not args.load_config:
+        raise SystemExit("--pipeline requires --load-config")
     out_root = Path(args.outdir).absolute()
     out_root.mkdir(parents=True, exist_ok=True)
+    if args.engine == "numpy":
+        # The built-in generator writes sanitized chunk files directly; they
+        # only need another pass for compression.
+        import tpch_datagen
+        if args.pipeline or args.updates:
+            raise SystemExit("--pipeline and --updates need --engine dbgen")
+        sf = sf_from_size(args.size)
+        plan = plan_chunks(sf, args.max_file_size_gb, args.chunks)
+        print(format_plan(sf, plan, args.max_file_size_gb))
+        final_dir = out_root / args.size
+        final_dir.mkdir(parents=True, exist_ok=True)
+        plan = tpch_datagen.effective_plan(sf, plan)
+        settings = dataset_settings(args.size, sf, generator_version("numpy"), plan, args.max_file_size_gb, not args.no_split, args.compress, args.compress_level)
+        keys = [(t, c) for t in TABLES for c in range(1, plan[t] + 1)]
+        linked = {t: tpch_datagen.GROUPS[tpch_datagen.GROUP_OF[t]] for t in TABLES}
+        manifest, todo = reuse_chunks(final_dir, settings, keys, args.threads, not args.no_cache, linked)
+        stats = tpch_datagen.generate(sf, plan, args.threads, final_dir, only=todo)
+        raw = {(t, c): str(final_dir / t / f"{t}.tbl.{c}") for t, c in todo}
+        if args.compress:
+            outputs = verify_and_split(final_dir, args.max_file_size_gb, args.threads, not args.no_split, args.compress, args.compress_level, list(raw.values()))
+        else:
+            outputs = {raw[k]: [(raw[k], stats[k][0])] for k in todo if k in stats}
+        record_chunks(final_dir, manifest, todo, outputs)
+        print(str(final_dir))
+        return
     work_dir = Path.cwd()
     dbgen_bin = ensure_dbgen(Path(args.dbgen) if args.dbgen else None, work_dir)
     dists_path = None
@@ -218,25 +576,61 @@ def main():
             dists_path = p
             break
     sf = sf_from_size(args.size)
-    streams = args.chunks if args.chunks and args.chunks > 0 else compute_chunks(sf, args.max_file_size_gb)
+    plan = plan_chunks(sf, args.max_file_size_gb, args.chunks)
+    print(format_plan(sf, plan, args.max_file_size_gb))
+    if args.pipeline:
+        import starrocks_stream_load as loader
+        cfg = loader.read_config(args.load_config)
+        target = {
+            "fe_host": cfg.get("fe_host") or cfg.get("fe_host_name"),
+            "fe_port": int(cfg.get("fe_http_port") or cfg.get("fe_port") or 8030),
+            "db": cfg.get("db") or cfg.get("database"),
+            "user": cfg.get("user") or cfg.get("username"),
+            "password": cfg.get("password") or "",
+            "timeout": int(cfg.get("timeout", 3600)),
+            "label_prefix": cfg.get("label_prefix") or "tpch",
+        }
+        pipe_dir = out_root / f"pipe_{args.size}"
+        pipe_dir.mkdir(parents=True, exist_ok=True)
+        keep_dir = out_root / args.size if args.keep_files else None
+        pipe_plan = {"sf": sf, "streams": plan}
+        manifest = loader.LoadManifest(out_root / f"_pipeline_{args.size}.jsonl", args.resume, pipe_plan, args.fresh)
+        changed = [f"{k} {manifest.header[k]} -> {v}" for k, v in pipe_plan.items() if k in manifest.header and manifest.header[k] != v]
+        if changed:
+            manifest.close()
+            raise SystemExit(f"resume: run {manifest.run_id} was planned differently, refusing to load under its labels:\n  " + "\n  ".join(changed) + "\npass --fresh to start a new run")
+        try:
+            ok = run_pipeline(dbgen_bin, dists_path, sf, plan, args.threads, pipe_dir, target, manifest, args.resume, keep_dir)
+        finally:
+            manifest.close()
+            shutil.rmtree(pipe_dir, ignore_errors=True)
+        if not ok:
+            raise SystemExit(1)
+        return
     tmp_dir = out_root / f"tmp_{args.size}"
     tmp_dir.mkdir(parents=True, exist_ok=True)
     final_dir = out_root / args.size
     final_dir.mkdir(parents=True, exist_ok=True)
-    lock = threading.Lock()
+    settings = dataset_settings(args.size, sf, generator_version("dbgen", dbgen_bin, dists_path), plan, args.max_file_size_gb, not args.no_split, args.compress, args.compress_level)
+    jobs = plan_jobs(sf, plan)
+    manifest, todo = reuse_chunks(final_dir, settings, [(t, c) for t, c, _ in jobs], args.threads, not args.no_cache)
     with ThreadPoolExecutor(max_workers=args.threads) as ex:
-        futs = []
-        for s in range(1, streams + 1):
-            futs.append(ex.submit(run_dbgen_stream, dbgen_bin, dists_path, sf, streams, s, tmp_dir))
+        futs = [ex.submit(run_dbgen_table, dbgen_bin, dists_path, sf, t, c, n, tmp_dir, final_dir) for t, c, n in jobs if (t, c) in todo]
         for f in as_completed(futs):
-            pass
-    with ThreadPoolExecutor(max_workers=args.threads) as ex:
-        futs = []
-        for s in range(1, streams + 1):
-            futs.append(ex.submit(move_stream_files, tmp_dir, final_dir, s))
-        for f in as_completed(futs):
-            pass
-    verify_and_split(final_dir, args.max_file_size_gb)
+            f.result()
+    raw = [str(final_dir / t / f"{t}.tbl.{c}") for t, c in sorted(todo)]
+    outputs = verify_and_split(final_dir, args.max_file_size_gb, args.threads, not args.no_split, args.compress, args.compress_level, raw) if raw else {}
+    record_chunks(final_dir, manifest, todo, outputs)
+    if args.updates > 0:
+        cached = manifest.get("updates")
+        if not args.no_cache and cached and cached["sets"] == args.updates and verify_files(final_dir, cached["files"]):
+            print(f"cache: reused {args.updates} update sets")
+        else:
+            updates_dir = generate_updates(dbgen_bin, dists_path, sf, args.updates, tmp_dir / "updates", final_dir)
+            files = [updates_dir / name for name in update_names(args.updates)]
+            manifest["updates"] = {"sets": args.updates, "files": [file_entry(final_dir, p, count_rows(p)) for p in files]}
+            write_manifest(final_dir, manifest)
+        print(str(final_dir / "updates"))
     shutil.rmtree(tmp_dir, ignore_errors=True)
     print(str(final_dir))
 
@@ -0,0 +1,287 @@
+import argparse
+import datetime
+import json
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import starrocks_stream_load as loader
+import tpch_results
+from tpch_checksum import fast_checksum
+from tpch_params import SHIPMODES
+from tpch_sanitize import sanitize_blocks
+
+HERE = Path(__file__).absolute().parent
+
+# Client-side benchmark of the Stream Load path without a cluster: a synthetic
+# lineitem-like dataset is loaded into fake_starrocks.py, which runs as its own
+# process so only the loader's CPU is counted. End-to-end scenarios run
+# starrocks_stream_load.py itself (scheduling, HTTP, sanitize, compression,
+# parse_result, manifest and report); component cases time single pieces in
+# this process.
+
+SCENARIOS = {
+    "sendfile": {"sanitize": False},
+    "sanitize": {"sanitize": True},
+    "chunked": {"sanitize": False, "chunk_mb": 8},
+    "gzip": {"sanitize": True, "compress": "gzip"},
+}
+
+COMPONENTS = ["sanitize_blocks", "load_one", "load_one_sanitize", "parse_result", "scheduling"]
+
+WORDS = ["furiously", "special", "requests", "carefully", "final", "deposits", "blithely", "ironic", "packages", "slyly", "regular", "accounts", "quickly", "express", "pinto", "beans"]
+INSTRUCTIONS = ["DELIVER IN PERSON", "COLLECT COD", "NONE", "TAKE BACK RETURN"]
+
+def cpu_children() -> float:
+    r = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return r.ru_utime + r.ru_stime
+
+# dbgen-shaped lineitem rows, trailing "|" included so sanitize has work.
+def synthetic_rows(rng: random.Random, n: int) -> bytes:
+    base = datetime.date(1992, 1, 1)
+    rows = []
+    for _ in range(n):
+        ship = base + datetime.timedelta(days=rng.randint(0, 2400))
+        commit = ship + datetime.timedelta(days=rng.randint(-60, 60))
+        receipt = ship + datetime.timedelta(days=rng.randint(1, 30))
+        comment = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+        rows.append(
+            f"{rng.randint(1, 6000000)}|{rng.randint(1, 200000)}|{rng.randint(1, 10000)}|{rng.randint(1, 7)}|"
+            f"{rng.randint(1, 50)}|{rng.randint(90000, 10494950) / 100:.2f}|0.0{rng.randint(0, 9)}|0.0{rng.randint(0, 8)}|"
+            f"{rng.choice('ANR')}|{rng.choice('FO')}|{ship}|{commit}|{receipt}|{rng.choice(INSTRUCTIONS)}|{rng.choice(SHIPMODES)}|{comment}|\n"
+        )
+    return "".join(rows).encode("ascii")
+
+# files lineitem files of about mb / files MB each, built by repeating a
+# seeded 4MB block of rows (the loader never looks at the values).
+def make_dataset(root: Path, mb: int, files: int, seed: int = 1) -> int:
+    block = synthetic_rows(random.Random(seed), 30000)
+    per_file = max(1, mb * 1024 * 1024 // files // len(block))
+    tdir = root / "lineitem"
+    tdir.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for i in range(1, files + 1):
+        with open(tdir / f"lineitem.tbl.{i}", "wb") as f:
+            for _ in range(per_file):
+                f.write(block)
+        total += per_file * len(block)
+    return total
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_fake(args):
+    fe_port, be_port, query_port = free_port(), free_port(), free_port()
+    cmd = [
+        sys.executable, str(HERE / "fake_starrocks.py"),
+        "--fe-port", str(fe_port), "--be-port", str(be_port), "--query-port", str(query_port),
+        "--latency-ms", str(args.latency_ms), "--capacity-mb", str(args.capacity_mb),
+        "--fail-rate", str(args.fail_rate), "--max-inflight", str(args.max_inflight),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", fe_port), timeout=1).close()
+            return proc, fe_port
+        except OSError:
+            if proc.poll() is not None or time.time() > deadline:
+                proc.kill()
+                raise SystemExit("fake_starrocks.py did not start")
+            time.sleep(0.05)
+
+def base_config(fe_port: int, data_dir: Path, work: Path, concurrency: int) -> dict:
+    return {
+        "fe_host": "127.0.0.1",
+        "fe_http_port": fe_port,
+        "db": "bench",
+        "user": "bench",
+        "password": "bench",
+        "data_dir": str(data_dir),
+        "concurrency": concurrency,
+        "manifest": str(work / "_load_manifest.jsonl"),
+        "report": str(work / "_load_report.jsonl"),
+        "retry_backoff": 0.1,
+    }
+
+# One starrocks_stream_load.py run; its CPU comes from the child rusage.
+def run_loader(cfg: dict, work: Path, label_prefix: str):
+    cfg = dict(cfg, label_prefix=label_prefix)
+    cfg_path = work / "bench_config.json"
+    cfg_path.write_text(json.dumps(cfg), encoding="utf-8")
+    t0, c0 = time.perf_counter(), cpu_children()
+    with open(work / "load.log", "w", encoding="utf-8") as log:
+        r = subprocess.run([sys.executable, str(HERE / "starrocks_stream_load.py"), "--config", str(cfg_path), "--fresh"], stdout=log, stderr=subprocess.STDOUT)
+    return time.perf_counter() - t0, cpu_children() - c0, r.returncode == 0
+
+def result_row(case: str, nbytes: int, runs: list, ops: int = 0, status: str = "ok") -> dict:
+    sec = tpch_results.describe([s for s, _ in runs])["median"]
+    cpu = tpch_results.describe([c for _, c in runs])["median"]
+    mb = nbytes / (1024 ** 2)
+    return {
+        "case": case,
+        "mb": round(mb, 1),
+        "runs": len(runs),
+        "sec": sec,
+        "cpu_sec": cpu,
+        "mb_s": mb / sec if nbytes and sec > 0 else None,
+        "cpu_s_per_gb": cpu / (nbytes / (1024 ** 3)) if nbytes else None,
+        "us_per_op": cpu / ops * 1e6 if ops else None,
+        "status": status,
+    }
+
+def bench_scenario(name: str, cfg: dict, work: Path, nbytes: int, runs: int) -> dict:
+    samples = []
+    ok = True
+    for i in range(runs):
+        dt, cpu, run_ok = run_loader(dict(cfg, **SCENARIOS[name]), work, f"bench_{name}_{i}_{time.time_ns()}")
+        samples.append((dt, cpu))
+        ok = ok and run_ok
+    return result_row(name, nbytes, samples, status="ok" if ok else "fail")
+
+def timed(fn, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        t0, c0 = time.perf_counter(), time.process_time()
+        fn()
+        samples.append((time.perf_counter() - t0, time.process_time() - c0))
+    return samples
+
+# Component cases run single-threaded here; CPU is this process only.
+def bench_components(names: list, fe_port: int, data_dir: Path, nbytes: int, runs: int) -> list:
+    files = loader.find_files(data_dir / "lineitem")
+    out = []
+    last = {}
+
+    def sanitize():
+        for f in files:
+            with open(f, "rb", buffering=0) as fin:
+                for _ in sanitize_blocks(fin):
+                    pass
+
+    def load_all(sanitize_body: bool):
+        for f in files:
+            last["proc"] = loader.load_one("127.0.0.1", fe_port, "bench", "lineitem", "bench", "bench", f, 600, sanitize_body, label=f"bench_component_{time.time_ns()}")
+            if not loader.parse_result(last["proc"])[0]:
+                last["failed"] = True
+
+    for name in names:
+        if name == "sanitize_blocks":
+            out.append(result_row(name, nbytes, timed(sanitize, runs)))
+        elif name in ("load_one", "load_one_sanitize"):
+            last.pop("failed", None)
+            samples = timed(lambda: load_all(name == "load_one_sanitize"), runs)
+            out.append(result_row(name, nbytes, samples, status="fail" if last.get("failed") else "ok"))
+        elif name == "parse_result":
+            if "proc" not in last:
+                load_all(False)
+            proc, n = last["proc"], 20000
+
+            def parse():
+                for _ in range(n):
+                    loader.parse_result(proc)
+                    loader.classify_result(proc)
+                    loader.parse_server_timings(proc.stdout)
+            out.append(result_row(name, 0, timed(parse, runs), ops=n))
+        elif name == "scheduling":
+            # Per-job setup in main(): line-aligned ranges, label and checksum.
+            jobs = [0]
+
+            def schedule():
+                jobs[0] = 0
+                for f in files:
+                    for offset, length in loader.plan_ranges(f, 8 * 1024 * 1024):
+                        loader.job_label("bench", "0", "lineitem", f.name, offset, length)
+                        fast_checksum(f, offset, length)
+                        jobs[0] += 1
+            samples = timed(schedule, runs)
+            out.append(result_row(name, 0, samples, ops=jobs[0]))
+    return out
+
+def fmt(v, digits: int = 1) -> str:
+    return "" if v is None else f"{v:.{digits}f}"
+
+# Regression: throughput down, or CPU per GB / per operation up, by more than
+# threshold against the saved baseline.
+def compare(base: dict, rows: list, threshold: float) -> list:
+    regressions = []
+    for r in rows:
+        b = base.get(r["case"])
+        if not b:
+            continue
+        if b.get("mb_s") and r["mb_s"] is not None and r["mb_s"] < b["mb_s"] * (1 - threshold):
+            regressions.append(f"{r['case']}: {b['mb_s']:.1f} -> {r['mb_s']:.1f}MB/s")
+        for k in ("cpu_s_per_gb", "us_per_op"):
+            if b.get(k) and r[k] is not None and r[k] > b[k] * (1 + threshold):
+                regressions.append(f"{r['case']}: {k} {b[k]:.2f} -> {r[k]:.2f}")
+    return regressions
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", type=int, default=256)
+    p.add_argument("--files", type=int, default=8)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--scenarios", default=",".join(SCENARIOS))
+    p.add_argument("--components", default=",".join(COMPONENTS))
+    p.add_argument("--latency-ms", type=int, default=0)
+    p.add_argument("--capacity-mb", type=float, default=0.0)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--max-inflight", type=int, default=0)
+    p.add_argument("--workdir", default="")
+    p.add_argument("--save", default="")
+    p.add_argument("--baseline", default="")
+    p.add_argument("--threshold", type=float, default=0.10)
+    args = p.parse_args()
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    components = [c.strip() for c in args.components.split(",") if c.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS] + [c for c in components if c not in COMPONENTS]
+    if unknown:
+        raise SystemExit(f"unknown cases: {','.join(unknown)} (scenarios: {','.join(SCENARIOS)}; components: {','.join(COMPONENTS)})")
+    work = Path(args.workdir).absolute() if args.workdir else Path(tempfile.mkdtemp(prefix="tpch_load_bench_"))
+    data_dir = work / "data"
+    fake = None
+    try:
+        t0 = time.perf_counter()
+        nbytes = make_dataset(data_dir, args.mb, args.files)
+        print(f"dataset: {data_dir} files={args.files} {nbytes / (1024 ** 2):.1f}MB {time.perf_counter() - t0:.1f}s")
+        fake, fe_port = start_fake(args)
+        cfg = base_config(fe_port, data_dir, work, args.concurrency)
+        rows = [bench_scenario(s, cfg, work, nbytes, args.runs) for s in scenarios]
+        rows += bench_components(components, fe_port, data_dir, nbytes, args.runs)
+    finally:
+        if fake is not None:
+            c0 = cpu_children()
+            fake.terminate()
+            fake.wait()
+            print(f"fake_starrocks: cpu={cpu_children() - c0:.1f}s (not counted above)")
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+    print("case,mb,runs,sec,cpu_sec,mb_s,cpu_s_per_gb,us_per_op,status")
+    for r in rows:
+        print(f"{r['case']},{r['mb']},{r['runs']},{fmt(r['sec'], 3)},{fmt(r['cpu_sec'], 3)},{fmt(r['mb_s'])},{fmt(r['cpu_s_per_gb'], 2)},{fmt(r['us_per_op'], 2)},{r['status']}")
+    if args.save:
+        meta = {"mb": args.mb, "files": args.files, "runs": args.runs, "concurrency": args.concurrency, "latency_ms": args.latency_ms, "capacity_mb": args.capacity_mb, "fail_rate": args.fail_rate}
+        Path(args.save).write_text(json.dumps({"meta": meta, "cases": {r["case"]: r for r in rows}}, indent=2), encoding="utf-8")
+    failed = [r["case"] for r in rows if r["status"] != "ok"]
+    if failed:
+        print(f"failed: {','.join(failed)}")
+    regressions = []
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["cases"]
+        regressions = compare(base, rows, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+    if failed or regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
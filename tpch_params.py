@@ -0,0 +1,156 @@
+import datetime
+import random
+import re
+
+# Query parameter substitution following the TPC-H qgen rules (specification
+# 2.4.x "Substitution Parameters"). The queries in tpch_run.Q carry the
+# validation parameters; SUBST lists, per query, the literal text to replace
+# and the parameter it stands for, so the query text itself stays readable.
+
+REGIONS = ["AFRICA", "AMERICA", "ASIA", "EUROPE", "MIDDLE EAST"]
+
+# n_name -> n_regionkey, in n_nationkey order
+NATIONS = [
+    ("ALGERIA", 0), ("ARGENTINA", 1), ("BRAZIL", 1), ("CANADA", 1), ("EGYPT", 4),
+    ("ETHIOPIA", 0), ("FRANCE", 3), ("GERMANY", 3), ("INDIA", 2), ("INDONESIA", 2),
+    ("IRAN", 4), ("IRAQ", 4), ("JAPAN", 2), ("JORDAN", 4), ("KENYA", 0),
+    ("MOROCCO", 0), ("MOZAMBIQUE", 0), ("PERU", 1), ("CHINA", 2), ("ROMANIA", 3),
+    ("SAUDI ARABIA", 4), ("VIETNAM", 2), ("RUSSIA", 3), ("UNITED KINGDOM", 3), ("UNITED STATES", 1),
+]
+
+SEGMENTS = ["AUTOMOBILE", "BUILDING", "FURNITURE", "MACHINERY", "HOUSEHOLD"]
+TYPE_S1 = ["STANDARD", "SMALL", "MEDIUM", "LARGE", "ECONOMY", "PROMO"]
+TYPE_S2 = ["ANODIZED", "BURNISHED", "PLATED", "POLISHED", "BRUSHED"]
+TYPE_S3 = ["TIN", "NICKEL", "BRASS", "STEEL", "COPPER"]
+CONTAINER_S1 = ["SM", "LG", "MED", "JUMBO", "WRAP"]
+CONTAINER_S2 = ["CASE", "BOX", "BAG", "JAR", "PKG", "PACK", "CAN", "DRUM"]
+SHIPMODES = ["REG AIR", "AIR", "RAIL", "SHIP", "TRUCK", "MAIL", "FOB"]
+WORDS1 = ["special", "pending", "unusual", "express"]
+WORDS2 = ["packages", "requests", "accounts", "deposits"]
+
+COLORS = [
+    "almond", "antique", "aquamarine", "azure", "beige", "bisque", "black", "blanched", "blue", "blush",
+    "brown", "burlywood", "burnished", "chartreuse", "chiffon", "chocolate", "coral", "cornflower", "cornsilk", "cream",
+    "cyan", "dark", "deep", "dim", "dodger", "drab", "firebrick", "floral", "forest", "frosted",
+    "gainsboro", "ghost", "goldenrod", "green", "grey", "honeydew", "hot", "indian", "ivory", "khaki",
+    "lace", "lavender", "lawn", "lemon", "light", "lime", "linen", "magenta", "maroon", "medium",
+    "metallic", "midnight", "mint", "misty", "moccasin", "navajo", "navy", "olive", "orange", "orchid",
+    "pale", "papaya", "peach", "peru", "pink", "plum", "powder", "puff", "purple", "red",
+    "rose", "rosy", "royal", "saddle", "salmon", "sandy", "seashell", "sienna", "sky", "slate",
+    "smoke", "snow", "spring", "steel", "tan", "thistle", "tomato", "turquoise", "violet", "wheat",
+    "white", "yellow",
+]
+
+SUBST = {
+    "Q01": [("interval '90' day", "DELTA")],
+    "Q02": [("p_size = 15", "SIZE"), ("'%BRASS'", "TYPE"), ("'EUROPE'", "REGION")],
+    "Q03": [("'BUILDING'", "SEGMENT"), ("date '1995-03-15'", "DATE")],
+    "Q04": [("date '1993-07-01'", "DATE")],
+    "Q05": [("'ASIA'", "REGION"), ("date '1994-01-01'", "DATE")],
+    "Q06": [("date '1994-01-01'", "DATE"), (".06 - 0.01", "DISCOUNT_LO"), (".06 + 0.01", "DISCOUNT_HI"), ("l_quantity < 24", "QUANTITY")],
+    "Q07": [("'FRANCE'", "NATION1"), ("'GERMANY'", "NATION2")],
+    "Q08": [("'BRAZIL'", "NATION"), ("'AMERICA'", "REGION"), ("'ECONOMY ANODIZED STEEL'", "TYPE")],
+    "Q09": [("'%green%'", "COLOR")],
+    "Q10": [("date '1993-10-01'", "DATE")],
+    "Q11": [("'GERMANY'", "NATION"), ("0.000001", "FRACTION")],
+    "Q12": [("('MAIL', 'SHIP')", "SHIPMODES"), ("date '1994-01-01'", "DATE")],
+    "Q13": [("'%special%requests%'", "WORDS")],
+    "Q14": [("date '1995-09-01'", "DATE")],
+    "Q15_SETUP": [("date '1996-01-01'", "DATE"), ("date '1996-04-01'", "DATE_END")],
+    "Q16": [("'Brand#45'", "BRAND"), ("'MEDIUM POLISHED%'", "TYPE"), ("(49, 14, 23, 45, 19, 3, 36, 9)", "SIZES")],
+    "Q17": [("'Brand#23'", "BRAND"), ("'MED BOX'", "CONTAINER")],
+    "Q18": [("sum(l_quantity) > 300", "QUANTITY")],
+    "Q19": [
+        ("'Brand#12'", "BRAND1"), ("'Brand#23'", "BRAND2"), ("'Brand#34'", "BRAND3"),
+        ("l_quantity >= 1 and l_quantity <= 11", "QUANTITY1"),
+        ("l_quantity >= 10 and l_quantity <= 20", "QUANTITY2"),
+        ("l_quantity >= 20 and l_quantity <= 30", "QUANTITY3"),
+    ],
+    "Q20": [("'forest%'", "COLOR"), ("date '1994-01-01'", "DATE"), ("'CANADA'", "NATION")],
+    "Q21": [("'SAUDI ARABIA'", "NATION")],
+    "Q22": [("('13', '31', '23', '29', '30', '18', '17')", "CODES")],
+}
+
+def date_lit(d: datetime.date) -> str:
+    return f"date '{d.isoformat()}'"
+
+def month_start(rng: random.Random, first: tuple, last: tuple) -> datetime.date:
+    months = (last[0] - first[0]) * 12 + last[1] - first[1]
+    m = first[1] - 1 + rng.randint(0, months)
+    return datetime.date(first[0] + m // 12, m % 12 + 1, 1)
+
+def year_start(rng: random.Random) -> datetime.date:
+    return datetime.date(rng.randint(1993, 1997), 1, 1)
+
+def brand(rng: random.Random) -> str:
+    return f"'Brand#{rng.randint(1, 5)}{rng.randint(1, 5)}'"
+
+def add_months(d: datetime.date, n: int) -> datetime.date:
+    m = d.month - 1 + n
+    return datetime.date(d.year + m // 12, m % 12 + 1, d.day)
+
+# One set of parameter values for every query: {qname: {param: sql text}}.
+def generate(rng: random.Random, sf: float = 1) -> dict:
+    nation = lambda: f"'{rng.choice(NATIONS)[0]}'"
+    n1, n2 = rng.sample(NATIONS, 2)
+    n8 = rng.choice(NATIONS)
+    d15 = month_start(rng, (1993, 1), (1997, 10))
+    discount = rng.randint(2, 9) / 100.0
+    q19 = [rng.randint(1, 10), rng.randint(10, 20), rng.randint(20, 30)]
+    return {
+        "Q01": {"DELTA": f"interval '{rng.randint(60, 120)}' day"},
+        "Q02": {"SIZE": f"p_size = {rng.randint(1, 50)}", "TYPE": f"'%{rng.choice(TYPE_S3)}'", "REGION": f"'{rng.choice(REGIONS)}'"},
+        "Q03": {"SEGMENT": f"'{rng.choice(SEGMENTS)}'", "DATE": date_lit(datetime.date(1995, 3, rng.randint(1, 31)))},
+        "Q04": {"DATE": date_lit(month_start(rng, (1993, 1), (1997, 10)))},
+        "Q05": {"REGION": f"'{rng.choice(REGIONS)}'", "DATE": date_lit(year_start(rng))},
+        "Q06": {
+            "DATE": date_lit(year_start(rng)),
+            "DISCOUNT_LO": f"{discount:.2f} - 0.01",
+            "DISCOUNT_HI": f"{discount:.2f} + 0.01",
+            "QUANTITY": f"l_quantity < {rng.randint(24, 25)}",
+        },
+        "Q07": {"NATION1": f"'{n1[0]}'", "NATION2": f"'{n2[0]}'"},
+        "Q08": {
+            "NATION": f"'{n8[0]}'",
+            "REGION": f"'{REGIONS[n8[1]]}'",
+            "TYPE": f"'{rng.choice(TYPE_S1)} {rng.choice(TYPE_S2)} {rng.choice(TYPE_S3)}'",
+        },
+        "Q09": {"COLOR": f"'%{rng.choice(COLORS)}%'"},
+        "Q10": {"DATE": date_lit(month_start(rng, (1993, 2), (1995, 1)))},
+        "Q11": {"NATION": nation(), "FRACTION": f"{0.0001 / sf:.10f}".rstrip("0")},
+        "Q12": {"SHIPMODES": "('{}', '{}')".format(*rng.sample(SHIPMODES, 2)), "DATE": date_lit(year_start(rng))},
+        "Q13": {"WORDS": f"'%{rng.choice(WORDS1)}%{rng.choice(WORDS2)}%'"},
+        "Q14": {"DATE": date_lit(month_start(rng, (1993, 1), (1997, 12)))},
+        "Q15_SETUP": {"DATE": date_lit(d15), "DATE_END": date_lit(add_months(d15, 3))},
+        "Q16": {
+            "BRAND": brand(rng),
+            "TYPE": f"'{rng.choice(TYPE_S1)} {rng.choice(TYPE_S2)}%'",
+            "SIZES": "(" + ", ".join(str(s) for s in rng.sample(range(1, 51), 8)) + ")",
+        },
+        "Q17": {"BRAND": brand(rng), "CONTAINER": f"'{rng.choice(CONTAINER_S1)} {rng.choice(CONTAINER_S2)}'"},
+        "Q18": {"QUANTITY": f"sum(l_quantity) > {rng.randint(312, 315)}"},
+        "Q19": {
+            "BRAND1": brand(rng), "BRAND2": brand(rng), "BRAND3": brand(rng),
+            "QUANTITY1": f"l_quantity >= {q19[0]} and l_quantity <= {q19[0] + 10}",
+            "QUANTITY2": f"l_quantity >= {q19[1]} and l_quantity <= {q19[1] + 10}",
+            "QUANTITY3": f"l_quantity >= {q19[2]} and l_quantity <= {q19[2] + 10}",
+        },
+        "Q20": {"COLOR": f"'{rng.choice(COLORS)}%'", "DATE": date_lit(year_start(rng)), "NATION": nation()},
+        "Q21": {"NATION": nation()},
+        "Q22": {"CODES": "(" + ", ".join(f"'{c}'" for c in rng.sample(range(10, 35), 7)) + ")"},
+    }
+
+# Deterministic per (seed, stream, run): the same seed replays the same
+# parameters, while every stream and every run gets its own draw.
+def params_for(seed: int, stream: int = 0, run: int = 1, sf: float = 1) -> dict:
+    return generate(random.Random(f"{seed}:{stream}:{run}"), sf)
+
+def substitute(qname: str, sql: str, params: dict) -> str:
+    # Single pass so a value that equals another validation literal (Q07
+    # swapping FRANCE and GERMANY) is not replaced again.
+    pairs = SUBST.get(qname)
+    if not params or not pairs:
+        return sql
+    values = {lit: params[qname][name] for lit, name in pairs}
+    pattern = "|".join(re.escape(lit) for lit in sorted(values, key=len, reverse=True))
+    return re.sub(pattern, lambda m: values[m.group(0)], sql)
@@ -0,0 +1,117 @@
+import argparse
+import re
+import time
+from pathlib import Path
+
+from mysql_client import MySQLError, parse_duration
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+COUNT_UNITS = {"": 1, "K": 1e3, "M": 1e6, "B": 1e9}
+
+OPERATOR_RE = re.compile(r"^\s*([A-Z][A-Z0-9_]*) \(plan_node_id=(-?\d+)\)")
+METRIC_RE = re.compile(r"^\s*- ([A-Za-z]+): (.+?)\s*$")
+SCAN_ROWS = ("RawRowsRead", "RowsRead")
+PEAK_MEMORY = ("QueryPeakMemoryUsage", "QueryPeakMemoryUsagePerNode", "QueryAllocatedMemoryUsage")
+
+def parse_bytes(text: str):
+    m = re.match(r"([0-9.]+)\s*([KMGT]?B)\b", text.strip())
+    if not m:
+        return None
+    return int(float(m.group(1)) * SIZE_UNITS[m.group(2)])
+
+def parse_count(text: str):
+    # "600.037902M (600037902)" or "1.234K" or "42"
+    m = re.search(r"\((\d+)\)", text)
+    if m:
+        return int(m.group(1))
+    m = re.match(r"([0-9.]+)\s*([KMB]?)\b", text.strip())
+    if not m:
+        return None
+    return int(float(m.group(1)) * COUNT_UNITS[m.group(2)])
+
+# Reduces a StarRocks query profile (text form, as returned by
+# get_query_profile()) to: total time, peak memory, rows read by scans and
+# OperatorTotalTime per operator (summed over pipelines and fragments).
+def summarize(profile: str) -> dict:
+    total = None
+    peak = None
+    scanned = {}
+    operators = {}
+    current = None
+    for line in profile.splitlines():
+        m = OPERATOR_RE.match(line)
+        if m:
+            current = f"{m.group(1)}#{m.group(2)}"
+            continue
+        m = METRIC_RE.match(line)
+        if not m:
+            continue
+        name, value = m.group(1), m.group(2)
+        if name == "Total" and total is None:
+            total = parse_duration(value)
+        elif name in PEAK_MEMORY:
+            v = parse_bytes(value)
+            if v is not None and (peak is None or v > peak):
+                peak = v
+        elif current and name == "OperatorTotalTime":
+            v = parse_duration(value)
+            if v is not None:
+                operators[current] = operators.get(current, 0.0) + v
+        elif current and name in SCAN_ROWS and "SCAN" in current:
+            # RawRowsRead (before pushed-down predicates) and RowsRead describe
+            # the same scan; keep the larger one.
+            v = parse_count(value)
+            if v is not None and v > scanned.get(current, -1):
+                scanned[current] = v
+    return {"total_sec": total, "peak_memory_bytes": peak, "rows_scanned": sum(scanned.values()), "operators": operators}
+
+PROFILE_WAIT_S = 5.0
+
+# Profile of the previous statement on conn (the session needs
+# enable_profile=true). BEs report profiles asynchronously, so an empty or
+# missing profile is retried for up to wait_s. Returns None if there is none.
+def fetch_profile(conn, wait_s: float = PROFILE_WAIT_S):
+    try:
+        rows = conn.query("select last_query_id()")["rows"]
+        if not rows or not rows[0][0]:
+            return None
+        qid = rows[0][0]
+        deadline = time.perf_counter() + wait_s
+        while True:
+            rows = conn.query(f"select get_query_profile('{qid}')")["rows"]
+            if rows and rows[0][0]:
+                return rows[0][0]
+            if time.perf_counter() >= deadline:
+                return None
+            time.sleep(0.5)
+    except MySQLError:
+        return None
+
+def explain(conn, sql: str, mode: str = "costs") -> str:
+    rows = conn.query(f"explain {mode} {sql}")["rows"]
+    return "\n".join(r[0] or "" for r in rows) + "\n"
+
+def hot_operators(summary: dict, top: int = 3) -> list:
+    ops = summary["operators"]
+    spent = sum(ops.values())
+    ranked = sorted(ops.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return [(name, sec, sec / spent if spent > 0 else 0.0) for name, sec in ranked]
+
+def format_hot(summary: dict, top: int = 3) -> str:
+    return ";".join(f"{name}={sec:.3f}s({share:.0%})" for name, sec, share in hot_operators(summary, top))
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("profiles", nargs="+")
+    p.add_argument("--top", type=int, default=5)
+    args = p.parse_args()
+    for path in args.profiles:
+        s = summarize(Path(path).read_text(encoding="utf-8", errors="replace"))
+        total = "" if s["total_sec"] is None else f"{s['total_sec']:.3f}s"
+        peak = "" if s["peak_memory_bytes"] is None else f"{s['peak_memory_bytes'] / (1024 ** 2):.1f}MB"
+        print(f"{path}: total={total} peak_memory={peak} rows_scanned={s['rows_scanned']}")
+        for name, sec, share in hot_operators(s, args.top):
+            print(f"  {name}: {sec:.3f}s {share:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import json
+import math
+import sys
+from pathlib import Path
+
+# Results of a sequential tpch_run: {qname: {"runs": [run, ...], "warmup": [run, ...]}}
+# with run = {"sec": float, "status": "ok" | "error" | "timeout", "server_sec": float or None}.
+# Warm-up runs are kept for reference but never enter the statistics.
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    v = sorted(values)
+    k = (len(v) - 1) * p / 100.0
+    lo = math.floor(k)
+    hi = min(lo + 1, len(v) - 1)
+    return v[lo] + (v[hi] - v[lo]) * (k - lo)
+
+def describe(values) -> dict:
+    n = len(values)
+    if n == 0:
+        return {"n": 0, "min": None, "median": None, "mean": None, "stddev": None, "p95": None}
+    mean = sum(values) / n
+    var = sum((v - mean) ** 2 for v in values) / (n - 1) if n > 1 else 0.0
+    return {
+        "n": n,
+        "min": min(values),
+        "median": percentile(values, 50),
+        "mean": mean,
+        "stddev": math.sqrt(var),
+        "p95": percentile(values, 95),
+    }
+
+def geomean(values):
+    values = [v for v in values if v and v > 0]
+    if not values:
+        return None
+    return math.exp(sum(math.log(v) for v in values) / len(values))
+
+def ok_times(runs) -> list:
+    return [r["sec"] for r in runs if r["status"] == "ok"]
+
+def query_status(runs) -> str:
+    statuses = {r["status"] for r in runs}
+    for s in ("timeout", "error"):
+        if s in statuses:
+            return s
+    return "ok"
+
+def fmt(v) -> str:
+    return "" if v is None else f"{v:.6f}"
+
+def write_summary(path: Path, results: dict, runs: int):
+    cols = [f"run{i}_sec" for i in range(1, runs + 1)]
+    lines = ["query," + ",".join(cols) + ",avg_sec,min_sec,median_sec,stddev_sec,p95_sec,status"]
+    run_totals = [0.0] * runs
+    run_ok = [True] * runs
+    means = []
+    for qname, r in results.items():
+        cells = []
+        for i in range(runs):
+            run = r["runs"][i] if i < len(r["runs"]) else None
+            if run is None:
+                cells.append("")
+                run_ok[i] = False
+            elif run["status"] != "ok":
+                cells.append(run["status"])
+                run_ok[i] = False
+            else:
+                cells.append(f"{run['sec']:.6f}")
+                run_totals[i] += run["sec"]
+        st = describe(ok_times(r["runs"]))
+        if st["mean"] is not None:
+            means.append(st["mean"])
+        lines.append(f"{qname},{','.join(cells)},{fmt(st['mean'])},{fmt(st['min'])},{fmt(st['median'])},{fmt(st['stddev'])},{fmt(st['p95'])},{query_status(r['runs'])}")
+    # TOTAL: per-run sums over all queries; a run with any failed query has no total.
+    totals = [t if ok else None for t, ok in zip(run_totals, run_ok)]
+    st = describe([t for t in totals if t is not None])
+    status = "ok" if all(run_ok) else "incomplete"
+    lines.append(f"TOTAL,{','.join(fmt(t) for t in totals)},{fmt(st['mean'])},{fmt(st['min'])},{fmt(st['median'])},{fmt(st['stddev'])},{fmt(st['p95'])},{status}")
+    lines.append(f"GEOMEAN{',' * (runs + 1)}{fmt(geomean(means))},,,,,")
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+def save(out_root: Path, results: dict, meta: dict):
+    queries = {}
+    for qname, r in results.items():
+        queries[qname] = dict(r, stats=describe(ok_times(r["runs"])), status=query_status(r["runs"]))
+    means = [q["stats"]["mean"] for q in queries.values() if q["stats"]["mean"] is not None]
+    doc = {"meta": meta, "queries": queries, "geomean_sec": geomean(means)}
+    (out_root / "results.json").write_text(json.dumps(doc, indent=2), encoding="utf-8")
+
+def load(result_dir: Path) -> dict:
+    # results.json, or summary.csv from runs that predate it (time cells only).
+    p = result_dir / "results.json"
+    if p.exists():
+        return json.loads(p.read_text(encoding="utf-8"))["queries"]
+    p = result_dir / "summary.csv"
+    if not p.exists():
+        raise SystemExit(f"no results.json or summary.csv in {result_dir}")
+    queries = {}
+    with open(p, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            qname = row.get("query", "")
+            if not qname.startswith("Q"):
+                continue
+            runs = []
+            for k, v in row.items():
+                if k and k.startswith("run") and k.endswith("_sec") and v:
+                    try:
+                        runs.append({"sec": float(v), "status": "ok", "server_sec": None})
+                    except ValueError:
+                        runs.append({"sec": 0.0, "status": v, "server_sec": None})
+            queries[qname] = {"runs": runs, "warmup": []}
+    return queries
+
+# Regularized incomplete beta I_x(a, b) by continued fraction (Numerical
+# Recipes betai/betacf); used for the Student t distribution.
+def betacf(a, b, x):
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 3e-12:
+            break
+    return h
+
+def betai(a, b, x):
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    bt = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return bt * betacf(a, b, x) / a
+    return 1.0 - bt * betacf(b, a, 1.0 - x) / b
+
+# One-sided Welch t-test: probability of seeing new this much slower than base
+# if both came from distributions with the same mean. None if either side has
+# fewer than two runs.
+def slower_p_value(base, new):
+    na, nb = len(base), len(new)
+    if na < 2 or nb < 2:
+        return None
+    a, b = describe(base), describe(new)
+    se2 = a["stddev"] ** 2 / na + b["stddev"] ** 2 / nb
+    diff = b["mean"] - a["mean"]
+    if se2 == 0:
+        return 0.0 if diff > 0 else 1.0
+    t = diff / math.sqrt(se2)
+    df = se2 ** 2 / ((a["stddev"] ** 2 / na) ** 2 / (na - 1) + (b["stddev"] ** 2 / nb) ** 2 / (nb - 1))
+    tail = 0.5 * betai(df / 2.0, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+def compare(base: dict, new: dict, threshold: float, alpha: float):
+    rows = []
+    for qname in sorted(set(base) | set(new)):
+        b = base.get(qname)
+        n = new.get(qname)
+        if b is None or n is None:
+            rows.append((qname, None, None, None, None, "missing"))
+            continue
+        bt, nt = ok_times(b["runs"]), ok_times(n["runs"])
+        if not nt:
+            rows.append((qname, describe(bt)["mean"], None, None, None, "REGRESSION" if bt else "failed"))
+            continue
+        if not bt:
+            rows.append((qname, None, describe(nt)["mean"], None, None, "fixed"))
+            continue
+        bm, nm = describe(bt)["mean"], describe(nt)["mean"]
+        delta = nm / bm - 1.0 if bm > 0 else 0.0
+        p_slower = slower_p_value(bt, nt)
+        p_faster = slower_p_value(nt, bt)
+        verdict = ""
+        if delta > threshold and (p_slower is None or p_slower < alpha):
+            verdict = "REGRESSION" if p_slower is not None else "slower?"
+        elif delta < -threshold and (p_faster is None or p_faster < alpha):
+            verdict = "faster" if p_faster is not None else "faster?"
+        rows.append((qname, bm, nm, delta, p_slower, verdict))
+    return rows
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.05)
+    p.add_argument("--alpha", type=float, default=0.05)
+    args = p.parse_args()
+    base = load(Path(args.base))
+    new = load(Path(args.new))
+    rows = compare(base, new, args.threshold, args.alpha)
+    print("query,base_mean_sec,new_mean_sec,delta_pct,p_value,verdict")
+    for qname, bm, nm, delta, pv, verdict in rows:
+        print(f"{qname},{fmt(bm)},{fmt(nm)},{'' if delta is None else f'{delta * 100:+.1f}'},{'' if pv is None else f'{pv:.4f}'},{verdict}")
+    gb = geomean([describe(ok_times(q["runs"]))["mean"] for q in base.values()])
+    gn = geomean([describe(ok_times(q["runs"]))["mean"] for q in new.values()])
+    if gb and gn:
+        print(f"geomean: base={gb:.6f}s new={gn:.6f}s delta={(gn / gb - 1) * 100:+.1f}%")
+    regressions = [r[0] for r in rows if r[5] == "REGRESSION"]
+    if regressions:
+        print(f"regressions: {','.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 import argparse
 import json
+import math
+import os
+import threading
 import time
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import mysql_client
+import starrocks_stream_load as loader
+import tpch_params
+import tpch_profile
+import tpch_results
+from tpch_results import percentile
+from tpch_gen import SIZE_TO_SF
+
 Q = {
 "Q01": "select l_returnflag, l_linestatus, sum(l_quantity) as sum_qty, sum(l_extendedprice) as sum_base_price, sum(l_extendedprice * (1 - l_discount)) as sum_disc_price, sum(l_extendedprice * (1 - l_discount) * (1 + l_tax)) as sum_charge, avg(l_quantity) as avg_qty, avg(l_extendedprice) as avg_price, avg(l_discount) as avg_disc, count(*) as count_order from lineitem where l_shipdate <= date '1998-12-01' - interval '90' day group by l_returnflag, l_linestatus order by l_returnflag, l_linestatus",
 "Q02": "select s_acctbal, s_name, n_name, p_partkey, p_mfgr, s_address, s_phone, s_comment from part, supplier, partsupp, nation, region where p_partkey = ps_partkey and s_suppkey = ps_suppkey and p_size = 15 and p_type like '%BRASS' and s_nationkey = n_nationkey and n_regionkey = r_regionkey and r_name = 'EUROPE' and ps_supplycost = ( select min(ps_supplycost) from partsupp, supplier, nation, region where p_partkey = ps_partkey and s_suppkey = ps_suppkey and s_nationkey = n_nationkey and n_regionkey = r_regionkey and r_name = 'EUROPE' ) order by s_acctbal desc, n_name, s_name, p_partkey limit 100",
@@ -30,18 +41,417 @@ Q = {
 "Q22": "select cntrycode, count(*) as numcust, sum(c_acctbal) as totacctbal from ( select substring(c_phone, 1, 2) as cntrycode, c_acctbal from customer where substring(c_phone, 1, 2) in ('13', '31', '23', '29', '30', '18', '17') and c_acctbal > ( select avg(c_acctbal) from customer where c_acctbal > 0.00 and substring(c_phone, 1, 2) in ('13', '31', '23', '29', '30', '18', '17') ) and not exists ( select * from orders where o_custkey = c_custkey ) ) as custsale group by cntrycode order by cntrycode"
 }
 
-def run_mysql(host, port, user, password, db, sql):
-    cmd = ["mysql", "-h", str(host), "-P", str(port), "-u", str(user), "-p" + str(password), "-D", str(db), "--batch", "-e", sql]
+KILL_GRACE_S = 30.0
+
+def kill_query(pool, connection_id, fired):
+    fired.set()
+    try:
+        side = pool.get()
+        side.query(f"kill query {connection_id}")
+        pool.put(side)
+    except (mysql_client.MySQLError, OSError):
+        pass
+
+# Seconds the next query may run: the per-query limit capped by what is left
+# of the suite budget (deadline is a perf_counter() value). None = no limit.
+def query_timeout(per_query_s, deadline):
+    left = None if deadline is None else deadline - time.perf_counter()
+    if per_query_s and (left is None or per_query_s < left):
+        return per_query_s
+    return left
+
+# Runs sql on a pooled connection, streaming the result to out_path. The timer
+# covers only sending the statement and fetching the last row; connecting and
+# authenticating happen before it (or not at all, for a reused connection).
+# With timeout_s the statement is cancelled server-side by KILL QUERY from a
+# side connection when it expires; the socket timeout is only a backstop for
+# an FE that stops answering. With profile_path the query profile is saved
+# there after a successful run. Returns (status, seconds, server_seconds,
+# error) with status "ok", "error" or "timeout".
+def run_query(pool, sql, out_path=None, server_time=False, timeout_s=None, profile_path=None):
+    out = open(out_path, "wb") if out_path else None
+    err = None
+    server_s = None
+    dt = 0.0
+    fired = threading.Event()
+    conn = None
+    if timeout_s is not None and timeout_s <= 0:
+        fired.set()
+        err = "suite time budget exhausted, query not started"
+    else:
+        try:
+            conn = pool.get()
+        except (mysql_client.MySQLError, OSError) as e:
+            err = str(e)
+    if conn is not None:
+        timer = None
+        if timeout_s is not None:
+            timer = threading.Timer(timeout_s, kill_query, (pool, conn.connection_id, fired))
+            timer.daemon = True
+            conn.settimeout(timeout_s + KILL_GRACE_S)
+        t0 = time.perf_counter()
+        if timer is not None:
+            timer.start()
+        try:
+            conn.query(sql, out)
+        except (mysql_client.MySQLError, OSError) as e:
+            err = str(e)
+        dt = time.perf_counter() - t0
+        if timer is not None:
+            timer.cancel()
+            timer.join()
+            if fired.is_set():
+                # A late KILL could hit the next statement on this connection.
+                conn.broken = True
+                err = f"timeout after {timeout_s:.1f}s, query killed" + (f" ({err})" if err else "")
+            else:
+                conn.settimeout(None)
+        if err is None and server_time:
+            server_s = mysql_client.server_query_time(conn)
+        if err is None and profile_path:
+            try:
+                profile = tpch_profile.fetch_profile(conn)
+            except OSError:
+                profile = None
+            if profile:
+                profile_path.write_text(profile, encoding="utf-8")
+        pool.put(conn)
+    if out is not None:
+        if err:
+            out.write((err + "\n").encode("utf-8"))
+        out.close()
+    status = "timeout" if fired.is_set() else "error" if err else "ok"
+    return status, dt, server_s, err
+
+CACHE_SQL = {
+    "cold": [
+        "set use_page_cache = false",
+        "set enable_query_cache = false",
+        "set enable_scan_datacache = false",
+    ],
+    "warm": [
+        "set use_page_cache = true",
+        "set enable_query_cache = true",
+        "set enable_scan_datacache = true",
+        "set enable_populate_datacache = true",
+    ],
+}
+
+# SQL for one execution. With a seed the parameters are drawn for (stream,
+# run) and Q15's view is re-created with that draw under a per-stream name;
+# without one the validation query is used as is.
+def query_text(pool, qname, seed=None, sf=1, stream=0, run=1):
+    if seed is None:
+        return Q[qname]
+    params = tpch_params.params_for(seed, stream, run, sf)
+    sql = tpch_params.substitute(qname, Q[qname], params)
+    if qname == "Q15":
+        view = f"revenue{stream}"
+        setup = tpch_params.substitute("Q15_SETUP", Q["Q15_SETUP"], params)
+        setup = setup.replace("if not exists ", "").replace("revenue0", view)
+        conn = None
+        try:
+            conn = pool.get()
+            conn.query(f"drop view if exists {view}")
+            conn.query(setup)
+        except (mysql_client.MySQLError, OSError):
+            pass
+        if conn is not None:
+            pool.put(conn)
+        sql = sql.replace("revenue0", view)
+    return sql
+
+# Query order per stream, TPC-H specification Appendix A (qgen). Row 0 is the
+# power test stream; throughput stream s uses row s (wrapping after 40).
+PERMUTATIONS = [
+    [14, 2, 9, 20, 6, 17, 18, 8, 21, 13, 3, 22, 16, 4, 11, 15, 1, 10, 19, 5, 7, 12],
+    [21, 3, 18, 5, 11, 7, 6, 20, 17, 12, 16, 15, 13, 10, 2, 8, 14, 19, 9, 22, 1, 4],
+    [6, 17, 14, 16, 19, 10, 9, 2, 15, 8, 5, 22, 12, 7, 13, 18, 1, 4, 20, 3, 11, 21],
+    [8, 5, 4, 6, 17, 7, 1, 18, 22, 14, 9, 10, 15, 11, 20, 2, 21, 19, 13, 16, 12, 3],
+    [5, 21, 14, 19, 15, 17, 12, 6, 4, 9, 8, 16, 11, 2, 10, 18, 1, 13, 7, 22, 3, 20],
+    [21, 15, 4, 6, 7, 16, 19, 18, 14, 22, 11, 13, 3, 1, 2, 5, 8, 20, 12, 17, 10, 9],
+    [10, 3, 15, 13, 6, 8, 9, 7, 4, 11, 22, 18, 12, 1, 5, 16, 2, 14, 19, 20, 17, 21],
+    [18, 8, 20, 21, 2, 4, 22, 17, 1, 11, 9, 19, 3, 13, 5, 7, 10, 16, 6, 14, 15, 12],
+    [19, 1, 15, 17, 5, 8, 9, 12, 14, 7, 4, 3, 20, 16, 6, 22, 10, 13, 2, 21, 18, 11],
+    [8, 13, 2, 20, 17, 3, 6, 21, 18, 11, 19, 10, 15, 4, 22, 1, 7, 12, 9, 14, 5, 16],
+    [6, 15, 18, 17, 12, 1, 7, 2, 22, 13, 21, 10, 14, 9, 3, 16, 20, 19, 11, 4, 8, 5],
+    [15, 14, 18, 17, 10, 20, 16, 11, 1, 8, 4, 22, 5, 12, 3, 9, 21, 2, 13, 6, 19, 7],
+    [1, 7, 16, 17, 18, 22, 12, 6, 8, 9, 11, 4, 2, 5, 20, 21, 13, 10, 19, 3, 14, 15],
+    [21, 17, 7, 3, 1, 10, 12, 22, 9, 16, 6, 11, 2, 4, 5, 14, 8, 20, 13, 18, 15, 19],
+    [2, 9, 5, 4, 18, 1, 20, 15, 16, 17, 7, 21, 13, 14, 19, 8, 22, 11, 10, 3, 12, 6],
+    [16, 9, 17, 8, 14, 11, 10, 12, 6, 21, 7, 3, 15, 5, 22, 20, 1, 13, 19, 2, 4, 18],
+    [1, 3, 6, 5, 2, 16, 14, 22, 17, 20, 4, 9, 10, 11, 15, 8, 12, 19, 18, 13, 7, 21],
+    [3, 16, 5, 11, 21, 9, 2, 15, 10, 18, 17, 7, 8, 19, 14, 13, 1, 4, 22, 20, 6, 12],
+    [14, 4, 13, 5, 21, 11, 8, 6, 3, 17, 2, 20, 1, 19, 10, 9, 12, 18, 15, 7, 22, 16],
+    [4, 12, 22, 14, 5, 15, 16, 2, 8, 10, 17, 9, 21, 7, 3, 6, 13, 18, 11, 20, 19, 1],
+    [16, 15, 14, 13, 4, 22, 18, 19, 7, 1, 12, 17, 5, 10, 20, 3, 9, 21, 11, 2, 6, 8],
+    [20, 14, 21, 12, 15, 17, 4, 19, 13, 10, 11, 1, 16, 5, 18, 7, 8, 22, 9, 6, 3, 2],
+    [16, 14, 13, 2, 21, 10, 11, 4, 1, 22, 18, 12, 19, 5, 7, 8, 6, 3, 15, 20, 9, 17],
+    [18, 15, 9, 14, 12, 2, 8, 11, 22, 21, 16, 1, 6, 17, 5, 10, 19, 4, 20, 13, 3, 7],
+    [7, 3, 10, 14, 13, 21, 18, 6, 20, 4, 9, 8, 22, 15, 2, 1, 5, 12, 19, 17, 11, 16],
+    [18, 1, 13, 7, 16, 10, 14, 2, 19, 5, 21, 11, 22, 15, 8, 17, 20, 3, 4, 12, 6, 9],
+    [13, 2, 22, 5, 11, 21, 20, 14, 7, 10, 4, 9, 19, 18, 6, 3, 1, 8, 15, 12, 17, 16],
+    [14, 17, 21, 8, 2, 9, 6, 4, 5, 13, 22, 7, 15, 3, 1, 18, 16, 11, 10, 12, 20, 19],
+    [10, 22, 1, 12, 13, 18, 21, 20, 2, 14, 16, 7, 15, 3, 4, 17, 5, 19, 6, 8, 9, 11],
+    [10, 8, 9, 18, 12, 6, 1, 5, 20, 11, 17, 22, 16, 3, 13, 2, 15, 21, 14, 19, 7, 4],
+    [7, 17, 22, 5, 3, 10, 13, 18, 9, 1, 14, 15, 21, 19, 16, 12, 8, 6, 11, 20, 4, 2],
+    [2, 9, 21, 3, 4, 7, 1, 11, 16, 5, 20, 19, 18, 8, 17, 13, 10, 12, 15, 6, 14, 22],
+    [15, 12, 8, 4, 22, 13, 16, 17, 18, 3, 7, 5, 6, 1, 9, 11, 21, 10, 14, 20, 19, 2],
+    [15, 16, 2, 11, 17, 7, 5, 14, 20, 4, 21, 3, 10, 9, 12, 8, 13, 6, 18, 19, 22, 1],
+    [1, 13, 11, 3, 4, 21, 6, 14, 15, 22, 18, 9, 7, 5, 10, 20, 12, 16, 17, 8, 19, 2],
+    [14, 17, 22, 20, 8, 16, 5, 10, 1, 13, 2, 21, 12, 9, 4, 18, 3, 7, 6, 19, 15, 11],
+    [9, 17, 7, 4, 5, 13, 21, 18, 11, 3, 22, 1, 6, 16, 20, 14, 15, 10, 8, 2, 12, 19],
+    [13, 14, 5, 22, 19, 11, 9, 6, 18, 15, 8, 10, 7, 4, 17, 16, 3, 1, 12, 2, 21, 20],
+    [20, 5, 4, 14, 11, 1, 6, 16, 8, 22, 7, 3, 2, 12, 21, 19, 17, 13, 10, 15, 18, 9],
+    [3, 7, 14, 15, 6, 5, 21, 20, 18, 10, 4, 16, 19, 1, 13, 9, 8, 17, 11, 12, 22, 2],
+    [13, 15, 17, 1, 22, 11, 3, 4, 7, 20, 14, 21, 9, 8, 2, 18, 16, 6, 10, 12, 5, 19],
+]
+
+def stream_order(stream_id: int) -> list:
+    return [f"Q{n:02d}" for n in PERMUTATIONS[stream_id % len(PERMUTATIONS)]]
+
+# Runs one query stream in its permuted order, one execution per query.
+# Returns [(qname, seconds, status)] in execution order and the stream's elapsed time.
+def run_stream(pool, stream_id, out_dir, server_time=False, per_query_s=None, deadline=None, seed=None, sf=1):
+    results = []
     t0 = time.perf_counter()
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    t1 = time.perf_counter()
-    return p, (t1 - t0)
+    for qname in stream_order(stream_id):
+        q_dir = out_dir / qname
+        q_dir.mkdir(parents=True, exist_ok=True)
+        sql = query_text(pool, qname, seed, sf, stream_id)
+        if seed is not None:
+            (q_dir / f"{qname}_run1.sql").write_text(sql + "\n", encoding="utf-8")
+        status, dt, server_s, err = run_query(pool, sql, q_dir / f"{qname}_run1.txt", server_time, query_timeout(per_query_s, deadline))
+        results.append((qname, dt, status, server_s))
+    return results, time.perf_counter() - t0
+
+# A stream as a tpch_results run set (one run per query): summary.csv and
+# results.json in the same format as the sequential test, so power and
+# throughput streams can be compared with tpch_results.py too.
+def write_stream_results(out_dir, results, meta):
+    model = {qname: {"runs": [{"sec": dt, "status": status, "server_sec": server_s}], "warmup": []} for qname, dt, status, server_s in results}
+    tpch_results.write_summary(out_dir / "summary.csv", model, 1)
+    tpch_results.save(out_dir, model, meta)
+
+DELETE_BATCH = 10000
+DELETE_LIMIT_CONFIG = "max_allowed_in_element_num_of_delete"
+
+# Keys per RF2 DELETE statement. The tables use the duplicate key model, whose
+# DELETE takes only AND-ed key predicates (no OR-ed ranges, no IN (SELECT ...)),
+# and the FE caps the IN list at DELETE_LIMIT_CONFIG (10000 by default). Use
+# the cluster's cap so raising it turns RF2 into one statement per table.
+def delete_batch(pool):
+    conn = pool.get()
+    try:
+        res = conn.query(f"admin show frontend config like '{DELETE_LIMIT_CONFIG}'")
+    except (mysql_client.MySQLError, OSError):
+        res = None
+    pool.put(conn)
+    if res and res["rows"]:
+        cols = [c.lower() for c in res["columns"]]
+        if "value" in cols:
+            try:
+                return max(1, int(res["rows"][0][cols.index("value")]))
+            except (TypeError, ValueError):
+                pass
+    return DELETE_BATCH
+
+# RF1: Stream Load the new orders and lineitems of update set n (written by
+# tpch_gen.py --updates). Returns (ok, seconds, rows, error).
+def run_rf1(target, updates_dir, n):
+    rows = 0
+    t0 = time.perf_counter()
+    for table in ("orders", "lineitem"):
+        path = updates_dir / f"{table}.tbl.u{n}"
+        label = f"rf1_{target['run_id']}_{n}_{table}"
+        proc = loader.load_one(target["fe_host"], target["fe_port"], target["db"], table, target["user"], target["password"], path, target["timeout"], False, label=label)
+        ok, out, loaded, filtered, total = loader.parse_result(proc)
+        rows += loaded
+        if not ok:
+            return False, time.perf_counter() - t0, rows, f"{table}: {out.strip()[:500]}"
+    return True, time.perf_counter() - t0, rows, None
+
+# RF2: delete the orders listed in delete.<n> and their lineitems, in batches
+# of up to batch keys per statement.
+def run_rf2(pool, updates_dir, n, batch=DELETE_BATCH):
+    keys = [line.strip() for line in (updates_dir / f"delete.{n}").read_text(encoding="utf-8").splitlines() if line.strip()]
+    conn = pool.get()
+    t0 = time.perf_counter()
+    try:
+        for i in range(0, len(keys), batch):
+            part = ",".join(keys[i:i + batch])
+            conn.query(f"delete from orders where o_orderkey in ({part})")
+            conn.query(f"delete from lineitem where l_orderkey in ({part})")
+    except (mysql_client.MySQLError, OSError) as e:
+        pool.put(conn)
+        return False, time.perf_counter() - t0, len(keys), str(e)
+    pool.put(conn)
+    return True, time.perf_counter() - t0, len(keys), None
+
+def run_refresh(pool, refresh, n, phase, log, functions=("RF1", "RF2")):
+    for name in functions:
+        if name == "RF1":
+            ok, dt, rows, err = run_rf1(refresh, refresh["dir"], n)
+        else:
+            ok, dt, rows, err = run_rf2(pool, refresh["dir"], n, refresh["rf2_batch"])
+        log.append((phase, n, name, dt, rows, ok))
+        print(f"{phase} {name} set {n}: {dt:.3f}s rows={rows}" + ("" if ok else f" ERROR {err}"))
+
+# Refresh stream of the throughput test: RF1 then RF2 for each update set, one
+# pair per query stream, running next to the query streams.
+def run_refresh_stream(pool, refresh, sets, log):
+    for n in sets:
+        run_refresh(pool, refresh, n, "throughput", log)
+
+# Power@Size = 3600 * SF / geometric mean of the power-test intervals (the 22
+# queries, plus RF1 and RF2 when refresh is on), with intervals shorter than
+# 1/1000 of the longest raised to that bound (TPC-H 5.4.1.4).
+def power_size(sf, times):
+    floor = max(times) / 1000.0
+    times = [max(t, floor, 1e-6) for t in times]
+    return 3600.0 * sf / math.exp(sum(math.log(t) for t in times) / len(times))
+
+def throughput_size(sf, streams, ts):
+    return streams * 22 * 3600.0 / ts * sf
+
+def run_throughput(pool, out_root, sf, streams, server_time=False, refresh=None, per_query_s=None, deadline=None, seed=None):
+    refresh_log = []
+    print(f"power test: stream 00 order={','.join(stream_order(0))}")
+    t0 = time.perf_counter()
+    if refresh:
+        run_refresh(pool, refresh, 1, "power", refresh_log, ("RF1",))
+    power, power_s = run_stream(pool, 0, out_root / "power", server_time, per_query_s, deadline, seed, sf)
+    if refresh:
+        run_refresh(pool, refresh, 1, "power", refresh_log, ("RF2",))
+    power_s = time.perf_counter() - t0
+    meta = {"started": time.strftime("%Y-%m-%d %H:%M:%S"), "sf": sf, "streams": streams, "refresh": bool(refresh), "seed": seed}
+    write_stream_results(out_root / "power", power, dict(meta, test="power", stream=0))
+    print(f"throughput test: {streams} streams" + (" + refresh stream" if refresh else ""))
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=streams + 1) as ex:
+        futs = [ex.submit(run_stream, pool, s, out_root / f"stream{s:02d}", server_time, per_query_s, deadline, seed, sf) for s in range(1, streams + 1)]
+        if refresh:
+            rf = ex.submit(run_refresh_stream, pool, refresh, range(2, streams + 2), refresh_log)
+        stream_results = [fu.result() for fu in futs]
+        if refresh:
+            rf.result()
+    ts = time.perf_counter() - t0
+    lines = ["stream,position,query,sec,status"]
+    for s, (results, elapsed) in enumerate([(power, power_s)] + stream_results):
+        if s > 0:
+            write_stream_results(out_root / f"stream{s:02d}", results, dict(meta, test="throughput", stream=s))
+            print(f"stream {s:02d}: {elapsed:.3f}s")
+        for i, (qname, dt, status, _) in enumerate(results, 1):
+            lines.append(f"{s},{i},{qname},{dt:.6f},{status}")
+    (out_root / "streams.csv").write_text("\n".join(lines), encoding="utf-8")
+    if refresh:
+        lines = ["phase,set,function,sec,rows,status"]
+        lines += [f"{phase},{n},{name},{dt:.6f},{rows},{'ok' if ok else 'err'}" for phase, n, name, dt, rows, ok in refresh_log]
+        (out_root / "refresh.csv").write_text("\n".join(lines), encoding="utf-8")
+    valid = all(status == "ok" for results, _ in [(power, power_s)] + stream_results for _, _, status, _ in results)
+    valid = valid and all(entry[5] for entry in refresh_log)
+    p = power_size(sf, [dt for _, dt, _, _ in power] + [dt for phase, _, _, dt, _, _ in refresh_log if phase == "power"])
+    t = throughput_size(sf, streams, ts)
+    qphh = math.sqrt(p * t)
+    query_times = [dt for results, _ in stream_results for _, dt, _, _ in results]
+    metrics = [
+        ("sf", sf),
+        ("streams", streams),
+        ("refresh", "true" if refresh else "false"),
+        ("power_test_sec", f"{power_s:.6f}"),
+        ("throughput_test_sec", f"{ts:.6f}"),
+        ("throughput_mean_query_sec", f"{sum(query_times) / len(query_times):.6f}"),
+        ("power_size", f"{p:.1f}"),
+        ("throughput_size", f"{t:.1f}"),
+        ("qphh_size", f"{qphh:.1f}"),
+        ("valid", "true" if valid else "false"),
+    ]
+    (out_root / "qphh.csv").write_text("metric,value\n" + "\n".join(f"{k},{v}" for k, v in metrics), encoding="utf-8")
+    print(f"Power@{sf}={p:.1f} Throughput@{sf}={t:.1f} QphH@{sf}={qphh:.1f}" + ("" if valid else " (INVALID: some queries failed)"))
+
+def sweep_levels(spec: str, max_concurrency: int) -> list:
+    if spec:
+        return [int(x) for x in spec.split(",") if x.strip()]
+    levels = []
+    n = 1
+    while n < max_concurrency:
+        levels.append(n)
+        n *= 2
+    return levels + [max_concurrency]
+
+# Closed-loop load at a fixed concurrency: each worker runs the query mix
+# back to back (starting at a different offset) until duration_s has passed.
+def sweep_level(pool, queries, concurrency, duration_s, per_query_s=None, seed=None, sf=1):
+    deadline = time.perf_counter() + duration_s
+    def worker(w):
+        lat = []
+        errors = 0
+        i = w
+        while time.perf_counter() < deadline:
+            sql = query_text(pool, queries[i % len(queries)], seed, sf, f"sweep{w}", i)
+            status, dt, _, _ = run_query(pool, sql, os.devnull, False, per_query_s)
+            if status == "ok":
+                lat.append(dt)
+            else:
+                errors += 1
+            i += 1
+        return lat, errors
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = [dt for r, _ in results for dt in r]
+    return lat, sum(e for _, e in results), elapsed
+
+# The saturation point is the last level whose QPS still improved on the
+# previous level by at least min_gain; beyond it latency grows for little or
+# no extra throughput.
+def run_sweep(pool, out_root, queries, levels, duration_s, min_gain, per_query_s=None, seed=None, sf=1):
+    lines = ["concurrency,queries,errors,qps,p50_sec,p95_sec,p99_sec,mean_sec"]
+    rows = []
+    for c in levels:
+        lat, errors, elapsed = sweep_level(pool, queries, c, duration_s, per_query_s, seed, sf)
+        qps = len(lat) / elapsed if elapsed > 0 else 0.0
+        p50, p95, p99 = percentile(lat, 50), percentile(lat, 95), percentile(lat, 99)
+        mean = sum(lat) / len(lat) if lat else 0.0
+        rows.append((c, qps))
+        lines.append(f"{c},{len(lat)},{errors},{qps:.3f},{p50:.6f},{p95:.6f},{p99:.6f},{mean:.6f}")
+        print(f"concurrency={c} queries={len(lat)} errors={errors} qps={qps:.2f} p50={p50:.3f}s p95={p95:.3f}s p99={p99:.3f}s")
+    saturation = rows[0][0]
+    for (c0, q0), (c1, q1) in zip(rows, rows[1:]):
+        if q0 <= 0 or (q1 - q0) / q0 < min_gain:
+            break
+        saturation = c1
+    (out_root / "sweep.csv").write_text("\n".join(lines), encoding="utf-8")
+    best = max(rows, key=lambda r: r[1])
+    print(f"saturation at concurrency={saturation} (peak qps={best[1]:.2f} at concurrency={best[0]})")
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--config", required=True)
     ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--warmup", type=int, default=0)
     ap.add_argument("--outdir", default="./tpch_results")
+    ap.add_argument("--server-time", action="store_true")
+    ap.add_argument("--streams", type=int, default=0)
+    ap.add_argument("--size", choices=list(SIZE_TO_SF.keys()))
+    ap.add_argument("--sf", type=float)
+    ap.add_argument("--refresh", action="store_true")
+    ap.add_argument("--updates-dir", default="")
+    ap.add_argument("--rf2-batch", type=int, default=0)
+    ap.add_argument("--sweep", action="store_true")
+    ap.add_argument("--queries", default="")
+    ap.add_argument("--levels", default="")
+    ap.add_argument("--max-concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=60.0)
+    ap.add_argument("--min-gain", type=float, default=0.1)
+    ap.add_argument("--query-timeout", type=float, default=0)
+    ap.add_argument("--suite-timeout", type=float, default=0)
+    ap.add_argument("--profile", action="store_true")
+    ap.add_argument("--explain", choices=["costs", "analyze"])
+    ap.add_argument("--params", choices=["validation", "random"], default="validation")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--cache", choices=["default", "warm", "cold"], default="default")
     args = ap.parse_args()
     cfg = json.load(open(args.config, "r", encoding="utf-8"))
     host = cfg.get("fe_host") or cfg.get("fe_host_name")
@@ -49,42 +459,125 @@ def main():
     user = cfg.get("user") or cfg.get("username")
     password = cfg.get("password") or ""
     db = cfg.get("db") or cfg.get("database")
+    query_timeout_s = args.query_timeout or float(cfg.get("query_timeout", 0)) or None
+    suite_timeout_s = args.suite_timeout or float(cfg.get("suite_timeout", 0)) or None
+    deadline = time.perf_counter() + suite_timeout_s if suite_timeout_s else None
+    init_sql = ["set enable_profile = true"] if args.server_time or args.profile else []
+    init_sql += CACHE_SQL.get(args.cache, [])
+    if args.cache == "warm" and args.warmup == 0:
+        args.warmup = 1
+    seed = None
+    if args.params == "random":
+        seed = args.seed if args.seed is not None else int(time.time())
+        print(f"random parameters: seed={seed}")
+    size = args.size or cfg.get("size") or cfg.get("schema_size")
+    sf = args.sf or cfg.get("sf")
+    if not sf and size:
+        if size not in SIZE_TO_SF:
+            raise SystemExit(f"unknown size {size} (known: {','.join(SIZE_TO_SF)}); pass --sf for other scale factors")
+        sf = SIZE_TO_SF[size]
+    if not sf and (seed is not None or args.streams > 0):
+        raise SystemExit("random parameters and the throughput test need the scale factor: pass --size or --sf (or schema_size/sf in config)")
+    if sf and float(sf) == int(float(sf)):
+        sf = int(float(sf))
+    pool = mysql_client.Pool(host, port, user, password, db, init_sql=init_sql)
     out_root = Path(args.outdir).absolute()
     out_root.mkdir(parents=True, exist_ok=True)
-    summary_lines = ["query,run1_sec,run2_sec,run3_sec,avg_sec"]
-    sum_runs = [0.0, 0.0, 0.0]
-    sum_total = 0.0
+    server_lines = ["query," + ",".join(f"run{i}_server_sec" for i in range(1, args.runs + 1))]
+    profile_lines = ["query,run,total_sec,peak_memory_bytes,rows_scanned,hot_operators"]
     if "Q15_SETUP" in Q:
-        run_mysql(host, port, user, password, db, Q["Q15_SETUP"])
+        run_query(pool, Q["Q15_SETUP"])
+    if args.sweep:
+        queries = [q.strip().upper() for q in args.queries.split(",") if q.strip()] or [k for k in Q.keys() if not k.endswith("_SETUP")]
+        unknown = [q for q in queries if q not in Q]
+        if unknown:
+            raise SystemExit(f"unknown queries: {','.join(unknown)}")
+        run_sweep(pool, out_root, queries, sweep_levels(args.levels, args.max_concurrency), args.duration, args.min_gain, query_timeout_s, seed, sf)
+        pool.close()
+        return
+    if args.streams > 0:
+        refresh = None
+        if args.refresh:
+            updates_dir = Path(args.updates_dir or Path(cfg.get("data_dir", ".")) / "updates")
+            if not (updates_dir / f"delete.{args.streams + 1}").exists():
+                raise SystemExit(f"refresh needs {args.streams + 1} update sets in {updates_dir}: run tpch_gen.py --updates {args.streams + 1}")
+            refresh = {
+                "dir": updates_dir,
+                "fe_host": host,
+                "fe_port": int(cfg.get("fe_http_port") or 8030),
+                "db": db,
+                "user": user,
+                "password": password,
+                "timeout": int(cfg.get("timeout", 3600)),
+                "run_id": time.strftime("%Y%m%d%H%M%S"),
+                "rf2_batch": args.rf2_batch or int(cfg.get("rf2_batch", 0)) or delete_batch(pool),
+            }
+            print(f"refresh: RF1 labels rf1_{refresh['run_id']}_<set>_<table>, RF2 {refresh['rf2_batch']} keys per DELETE")
+        run_throughput(pool, out_root, sf, args.streams, args.server_time, refresh, query_timeout_s, deadline, seed)
+        pool.close()
+        return
+    results = {}
+    started = time.strftime("%Y-%m-%d %H:%M:%S")
     for qname in [k for k in Q.keys() if not k.endswith("_SETUP")]:
-        times = []
-        had_error = False
         q_dir = out_root / qname
         q_dir.mkdir(parents=True, exist_ok=True)
+        if args.explain:
+            conn = None
+            try:
+                conn = pool.get()
+                (q_dir / f"{qname}_explain_{args.explain}.txt").write_text(tpch_profile.explain(conn, query_text(pool, qname, seed, sf), args.explain), encoding="utf-8")
+            except (mysql_client.MySQLError, OSError) as e:
+                (q_dir / f"{qname}_explain_{args.explain}.txt").write_text(str(e) + "\n", encoding="utf-8")
+            if conn is not None:
+                pool.put(conn)
+        r = results[qname] = {"runs": [], "warmup": []}
+        # warm up with the parameters of the first measured run, so it finds
+        # the same data cached
+        for i in range(1, args.warmup + 1):
+            sql = query_text(pool, qname, seed, sf, 0, 1)
+            status, dt, server_s, err = run_query(pool, sql, q_dir / f"{qname}_warmup{i}.txt", args.server_time, query_timeout(query_timeout_s, deadline))
+            r["warmup"].append({"sec": dt, "status": status, "server_sec": server_s})
         for i in range(1, args.runs + 1):
-            p, dt = run_mysql(host, port, user, password, db, Q[qname])
-            times.append(dt)
-            (q_dir / f"{qname}_run{i}.txt").write_text((p.stdout or "") + (p.stderr or ""), encoding="utf-8")
-            if p.returncode != 0:
-                had_error = True
-        total = sum(times)
-        t1 = f"{times[0]:.6f}" if len(times) > 0 else ""
-        t2 = f"{times[1]:.6f}" if len(times) > 1 else ""
-        t3 = f"{times[2]:.6f}" if len(times) > 2 else ""
-        avg = (total / len(times)) if len(times) > 0 else 0.0
-        summary_lines.append(f"{'err' if had_error else qname},{t1},{t2},{t3},{avg:.6f}")
-        if len(times) > 0:
-            sum_runs[0] += times[0]
-        if len(times) > 1:
-            sum_runs[1] += times[1]
-        if len(times) > 2:
-            sum_runs[2] += times[2]
-        sum_total += total
-    avg_total = (sum_runs[0] + sum_runs[1] + sum_runs[2]) / 3.0
-    summary_lines.append(
-        f"TOTAL,{sum_runs[0]:.6f},{sum_runs[1]:.6f},{sum_runs[2]:.6f},{avg_total:.6f}"
-    )
-    (out_root / "summary.csv").write_text("\n".join(summary_lines), encoding="utf-8")
+            profile_path = q_dir / f"{qname}_run{i}.profile.txt" if args.profile else None
+            sql = query_text(pool, qname, seed, sf, 0, i)
+            if seed is not None:
+                (q_dir / f"{qname}_run{i}.sql").write_text(sql + "\n", encoding="utf-8")
+            status, dt, server_s, err = run_query(pool, sql, q_dir / f"{qname}_run{i}.txt", args.server_time, query_timeout(query_timeout_s, deadline), profile_path)
+            if profile_path and profile_path.exists():
+                ps = tpch_profile.summarize(profile_path.read_text(encoding="utf-8"))
+                total = "" if ps["total_sec"] is None else f"{ps['total_sec']:.6f}"
+                peak = "" if ps["peak_memory_bytes"] is None else str(ps["peak_memory_bytes"])
+                hot = tpch_profile.format_hot(ps)
+                profile_lines.append(f"{qname},{i},{total},{peak},{ps['rows_scanned']},{hot}")
+                peak_mb = "?" if ps["peak_memory_bytes"] is None else f"{ps['peak_memory_bytes'] / (1024 ** 2):.1f}MB"
+                print(f"{qname} run{i}: peak_memory={peak_mb} rows_scanned={ps['rows_scanned']} hot={hot}")
+            r["runs"].append({"sec": dt, "status": status, "server_sec": server_s})
+            if status != "ok":
+                print(f"{qname} run{i}: {err}")
+        if args.server_time:
+            server_lines.append(qname + "," + ",".join("" if x["server_sec"] is None else f"{x['server_sec']:.6f}" for x in r["runs"]))
+        st = tpch_results.describe(tpch_results.ok_times(r["runs"]))
+        if st["n"]:
+            print(f"{qname}: n={st['n']} min={st['min']:.3f}s median={st['median']:.3f}s mean={st['mean']:.3f}s stddev={st['stddev']:.3f}s p95={st['p95']:.3f}s")
+    tpch_results.write_summary(out_root / "summary.csv", results, args.runs)
+    meta = {
+        "started": started,
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "fe_host": host,
+        "db": db,
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "query_timeout": query_timeout_s,
+        "params": args.params,
+        "seed": seed,
+        "cache": args.cache,
+    }
+    tpch_results.save(out_root, results, meta)
+    if args.server_time:
+        (out_root / "summary_server.csv").write_text("\n".join(server_lines), encoding="utf-8")
+    if args.profile:
+        (out_root / "profile_summary.csv").write_text("\n".join(profile_lines), encoding="utf-8")
+    pool.close()
 
 if __name__ == "__main__":
     main()
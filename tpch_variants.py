@@ -0,0 +1,132 @@
+import argparse
+import json
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import mysql_client
+import tpch_results
+from starrocks_schema import VARIANTS
+
+HERE = Path(__file__).absolute().parent
+
+# Runs the whole cycle per schema variant (generate DDL, create tables, load,
+# refresh materialized views, tpch_run) into <outdir>/<variant>/ and then
+# tabulates per-query speedups of every variant against the baseline.
+
+def sql_statements(text: str) -> list:
+    lines = [l for l in text.splitlines() if not l.startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";\n") if s.strip().rstrip(";")]
+
+def step(cmd: list, log_path: Path, what: str):
+    t0 = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        r = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT)
+    if r.returncode != 0:
+        raise SystemExit(f"{what} failed (exit {r.returncode}), see {log_path}")
+    return time.perf_counter() - t0
+
+def apply_schema(conn, sql_path: Path):
+    for stmt in sql_statements(sql_path.read_text(encoding="utf-8")):
+        conn.query(stmt.rstrip(";"))
+
+def refresh_mvs(conn, db: str, variant: dict) -> float:
+    t0 = time.perf_counter()
+    for name, _, _ in variant.get("mvs", []):
+        conn.query(f"refresh materialized view `{db}`.`{name}` with sync mode")
+    return time.perf_counter() - t0
+
+def run_variant(name: str, args, cfg: dict, v_dir: Path):
+    host = cfg.get("fe_host") or cfg.get("fe_host_name")
+    port = int(cfg.get("fe_query_port") or cfg.get("fe_port") or 9030)
+    user = cfg.get("user") or cfg.get("username")
+    password = cfg.get("password") or ""
+    db = cfg.get("db") or cfg.get("database")
+    py = sys.executable
+    sql_path = v_dir / "schema.sql"
+    with open(sql_path, "w", encoding="utf-8") as f:
+        r = subprocess.run([py, str(HERE / "starrocks_schema.py"), "--config", args.config, "--variant", name] + shlex.split(args.schema_args), stdout=f)
+    if r.returncode != 0:
+        raise SystemExit(f"{name}: starrocks_schema.py failed (exit {r.returncode})")
+    conn = mysql_client.Connection(host, port, user, password)
+    try:
+        apply_schema(conn, sql_path)
+    finally:
+        conn.close()
+    print(f"{name}: schema applied, loading")
+    load_s = step([py, str(HERE / "starrocks_stream_load.py"), "--config", args.config, "--fresh"] + shlex.split(args.load_args), v_dir / "load.log", f"{name}: load")
+    conn = mysql_client.Connection(host, port, user, password, db)
+    try:
+        refresh_s = refresh_mvs(conn, db, VARIANTS[name])
+    finally:
+        conn.close()
+    print(f"{name}: loaded in {load_s:.1f}s, materialized views refreshed in {refresh_s:.1f}s, running queries")
+    run_s = step([py, str(HERE / "tpch_run.py"), "--config", args.config, "--outdir", str(v_dir), "--runs", str(args.runs), "--warmup", str(args.warmup)] + shlex.split(args.run_args), v_dir / "run.log", f"{name}: tpch_run")
+    info = {"variant": name, "definition": VARIANTS[name], "load_sec": load_s, "mv_refresh_sec": refresh_s, "run_sec": run_s}
+    (v_dir / "variant.json").write_text(json.dumps(info, indent=2), encoding="utf-8")
+
+# One row per query: the baseline mean, then mean, speedup (baseline mean /
+# variant mean) and tpch_results.compare verdict for every other variant.
+def tabulate(out_root: Path, names: list, baseline: str, threshold: float, alpha: float) -> list:
+    results = {n: tpch_results.load(out_root / n) for n in names}
+    base = results[baseline]
+    others = [n for n in names if n != baseline]
+    verdicts = {n: {row[0]: row[5] for row in tpch_results.compare(base, results[n], threshold, alpha)} for n in others}
+    def mean(r):
+        return tpch_results.describe(tpch_results.ok_times(r["runs"]))["mean"] if r else None
+    lines = [",".join([f"query,{baseline}_mean_sec"] + [f"{n}_mean_sec,{n}_speedup,{n}_verdict" for n in others])]
+    qnames = sorted(set().union(*[set(r) for r in results.values()]))
+    for q in qnames:
+        bm = mean(base.get(q))
+        cells = [q, tpch_results.fmt(bm)]
+        for n in others:
+            m = mean(results[n].get(q))
+            speedup = f"{bm / m:.3f}" if bm and m else ""
+            cells += [tpch_results.fmt(m), speedup, verdicts[n].get(q, "")]
+        lines.append(",".join(cells))
+    gb = tpch_results.geomean([mean(r) for r in base.values()])
+    cells = ["GEOMEAN", tpch_results.fmt(gb)]
+    for n in others:
+        g = tpch_results.geomean([mean(r) for r in results[n].values()])
+        cells += [tpch_results.fmt(g), f"{gb / g:.3f}" if gb and g else "", ""]
+    lines.append(",".join(cells))
+    return lines
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--config", required=True)
+    p.add_argument("--variants", default=",".join(VARIANTS.keys()))
+    p.add_argument("--baseline", default="baseline")
+    p.add_argument("--outdir", default="./tpch_variants")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--warmup", type=int, default=1)
+    p.add_argument("--schema-args", default="")
+    p.add_argument("--load-args", default="")
+    p.add_argument("--run-args", default="")
+    p.add_argument("--resume", action="store_true")
+    p.add_argument("--threshold", type=float, default=0.05)
+    p.add_argument("--alpha", type=float, default=0.05)
+    args = p.parse_args()
+    cfg = json.load(open(args.config, "r", encoding="utf-8"))
+    names = [n.strip() for n in args.variants.split(",") if n.strip()]
+    if args.baseline not in names:
+        names.insert(0, args.baseline)
+    unknown = [n for n in names if n not in VARIANTS]
+    if unknown:
+        raise SystemExit(f"unknown variants: {','.join(unknown)} (known: {','.join(VARIANTS)})")
+    out_root = Path(args.outdir).absolute()
+    for name in names:
+        v_dir = out_root / name
+        if args.resume and (v_dir / "results.json").exists():
+            print(f"{name}: results exist, skipped")
+            continue
+        v_dir.mkdir(parents=True, exist_ok=True)
+        run_variant(name, args, cfg, v_dir)
+    lines = tabulate(out_root, names, args.baseline, args.threshold, args.alpha)
+    (out_root / "variants.csv").write_text("\n".join(lines), encoding="utf-8")
+    print("\n".join(lines))
+
+if __name__ == "__main__":
+    main()